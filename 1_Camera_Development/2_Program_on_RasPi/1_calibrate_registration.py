@@ -0,0 +1,34 @@
+# One-off RGB -> NoIR co-registration: estimates the warp from a calibration pair and stores remap tables
+# Date: October 2026
+#
+# python3 1_calibrate_registration.py /home/pi/images/rgb/<date>/rgb_<time>.jpg /home/pi/images/nir/<date>/nir_<time>.jpg
+
+import argparse
+
+import cv2
+import numpy as np
+
+from Helpers.registration import RemapCache, calibrate_pair
+
+# Remap tables, one file per camera pair and resolution
+registration_folder = "/home/pi/images/registration"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the RGB -> NoIR warp")
+    parser.add_argument("rgb", help="RGB image of the calibration pair")
+    parser.add_argument("nir", help="NoIR image taken at the same time")
+    parser.add_argument("--folder", default=registration_folder)
+    args = parser.parse_args()
+
+    rgb = cv2.imread(args.rgb)
+    nir = cv2.imread(args.nir)
+    cache = RemapCache(args.folder)
+    homography = calibrate_pair(rgb, nir, "rgb_to_nir", cache)
+    np.set_printoptions(precision=4, suppress=True)
+    print(f"Homography:\n{homography}")
+    print(f"Remap tables saved to {cache.path('rgb_to_nir', (nir.shape[1], nir.shape[0]))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Long-lived RGB/NoIR capture service: keeps both cameras configured between triggers
+# Date: October 2026
+#
+# Start once at boot:   python3 1_capture_daemon.py
+# Trigger from cron:    python3 1_capture_daemon.py --trigger
+# Capture and extract:  python3 1_capture_daemon.py --trigger --extract --out /home/pi/MScamera/ndvi_live.json
+# Run from a schedule:  python3 1_capture_daemon.py --schedule /home/pi/MScamera/schedule.txt
+
+import argparse
+import json
+import os
+
+from Helpers.archive_writer import ArchiveWriter
+from Helpers.camera import FakeCamera, PiCamera2Backend
+from Helpers.capture_service import CaptureService, request_capture, send_request
+from Helpers.encoders import load_encoder_config
+from Helpers.exposure_cache import ExposureCache
+from Helpers.image_store import ImageStore
+from Helpers.registration import FrameAligner, RemapCache
+from Helpers.plot_layouts import load_layouts
+from Helpers.vi_extractor import extract_ndvi, layout_folder, nir_window
+
+# Service settings
+base_folder = "/home/pi/images"
+socket_path = "/tmp/agicam_capture.sock"
+settle_time = 2  # Seconds for the cameras to adjust, at service start and before each scheduled capture
+storage_quota = 20 * 1024 ** 3  # Bytes of images kept on the SD card # !!! change
+sensor = "IOT11"  # Sensor name, selects its entry in <base_folder>/encoders.json # !!! change
+# Remap the rgb frame onto the nir grid before extraction (1_calibrate_registration.py); extract_live reads the nir
+# frame only, so leave it off unless the extractor combines both cameras, every capture pays for the remap
+align_rgb = False  # !!! change
+# Plots extracted by --extract: the first layout of the sensor's layout file, its crop taken on the NoIR frame
+layout = load_layouts(os.path.join(layout_folder, f"{sensor}.json"))[0]
+
+
+def extract_live(frames: dict, timestamp: str) -> dict:
+    """
+    Extracts the plot ndvi of the layout straight from the captured NoIR frame
+    :param frames: dict - Captured frames by camera name
+    :param timestamp: str - Capture timestamp
+    :return: dict - Plot ID -> ndvi statistics
+    """
+    return extract_ndvi(frames["nir"], timestamp, nir_window(layout.crop), layout.polygons, layout.plot_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AGIcam capture service")
+    parser.add_argument("--trigger", action="store_true", help="ask the running service for one capture")
+    parser.add_argument("--extract", action="store_true", help="with --trigger, also extract the plot ndvi")
+    parser.add_argument("--no-save", action="store_true", help="with --trigger, do not archive the images")
+    parser.add_argument("--burst", type=int, default=1, help="with --trigger, frames per camera fused into one")
+    parser.add_argument("--fuse", default="mean", choices=["mean", "sharpest"], help="burst fusion method")
+    parser.add_argument("--out", help="with --trigger, write the extracted results to this json file")
+    parser.add_argument("--stop", action="store_true", help="ask the running service to exit")
+    parser.add_argument("--schedule", help="capture at the HH:MM times listed in this file instead of serving")
+    parser.add_argument("--fake", action="store_true", help="serve synthetic frames instead of the cameras")
+    parser.add_argument("--socket", default=socket_path)
+    args = parser.parse_args()
+
+    if args.trigger:
+        reply = request_capture(args.socket, save=not args.no_save, extract=args.extract, burst=args.burst,
+                                fuse=args.fuse)
+        if not reply["ok"]:
+            print(f"Capture failed: {reply['error']}")
+            return
+        print(f"Images Captured: {reply['paths']} ({reply['latency_ms']} ms)")
+        if args.out and reply.get("results") is not None:
+            with open(args.out, "w") as f:
+                json.dump(reply["results"], f, indent=6)
+        return
+    if args.stop:
+        print(send_request(args.socket, {"cmd": "stop"}))
+        return
+
+    if args.fake:
+        cameras = {"rgb": FakeCamera(0), "nir": FakeCamera(1)}
+    else:
+        cameras = {"rgb": PiCamera2Backend(0), "nir": PiCamera2Backend(1)}
+    store = ImageStore(os.path.join(base_folder, "index.sqlite"), storage_quota)
+    exposure_cache = ExposureCache(os.path.join(base_folder, "exposure_cache.json"))
+    encoders = load_encoder_config(os.path.join(base_folder, "encoders.json"), sensor)
+    service = CaptureService(cameras, base_folder, settle_time, extractor=extract_live, archiver=ArchiveWriter(),
+                             store=store, exposure_cache=exposure_cache,
+                             aligner=FrameAligner(RemapCache(os.path.join(base_folder, "registration")))
+                             if align_rgb else None,
+                             archive_settings=encoders["archive"])
+    service.start()
+    print(f"Capture service ready: {service}, settle: {service.settle_report}")
+    try:
+        if args.schedule:
+            service.run_schedule(args.schedule)
+        else:
+            service.serve_socket(args.socket)
+    finally:
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,30 @@
 # Author: Worasit Sangjan
 # Date: 8 Febuary 2025
 
-import time
 import os
+import json
 from datetime import datetime
-from picamera2 import Picamera2
+from Helpers.camera import PiCamera2Backend
+from Helpers.encoders import load_encoder_config, write_frame
+from Helpers.exposure_cache import ExposureCache, settle_cameras
+from Helpers.image_store import ImageStore
+from Helpers.multi_capture import MultiCameraCapture
 
 # Set base directories
 base_folder = "/home/pi/images"
 rgb_folder = os.path.join(base_folder, "rgb")
 nir_folder = os.path.join(base_folder, "nir")
 
+# Index of stored images, the oldest uploaded ones are removed beyond the quota
+store = ImageStore(os.path.join(base_folder, "index.sqlite"), quota_bytes=20 * 1024 ** 3) # !!! change
+
+# Image format of the archived frames
+encoders = load_encoder_config(os.path.join(base_folder, "encoders.json"), sensor="IOT11") # !!! change
+
 # Get current date and time
-current_date = datetime.now().strftime("%Y-%m-%d")
-current_time = datetime.now().strftime("%H%M%S")
+now = datetime.now()
+current_date = now.strftime("%Y-%m-%d")
+current_time = now.strftime("%H%M%S")
 
 # Create separate folders for rgb and noir images (by date)
 rgb_save_folder = os.path.join(rgb_folder, current_date)
@@ -22,38 +33,37 @@ nir_save_folder = os.path.join(nir_folder, current_date)
 os.makedirs(rgb_save_folder, exist_ok=True)
 os.makedirs(nir_save_folder, exist_ok=True)
 
-# Initialize cameras
-picam0 = Picamera2(0) # rgb camera
-picam1 = Picamera2(1) # noir camera
-
-# Confuigure cameras
-config0 = picam0.create_still_configuration()
-config1 = picam1.create_still_configuration()
-
-picam0.configure(config0)
-picam1.configure(config1)
-
-# Set lens position for focus control
-picam0.set_controls({"LensPosition": 0.1})  # Focus for RGB camera
-picam1.set_controls({"LensPosition": 0.1})  # Focus for NIR camera
+# Initialize cameras, lens position 0.1 for focus control
+cameras = MultiCameraCapture({"rgb": PiCamera2Backend(0, lens_position=0.1),   # rgb camera
+                              "nir": PiCamera2Backend(1, lens_position=0.1)})  # noir camera
 
 # Start cameras
-picam0.start()
-picam1.start()
-time.sleep(2) # Allow cameras to adjust
+cameras.start()
+# Allow cameras to adjust: start from the exposure saved for this time of day and capture as soon as
+# AE/AWB have converged (at most 2 seconds)
+exposure_cache = ExposureCache(os.path.join(base_folder, "exposure_cache.json"))
+settle = settle_cameras(cameras.cameras, exposure_cache, now, timeout=2)
 
-# Define file paths
-img_rgb_path = os.path.join(rgb_save_folder, f"rgb_{current_time}.jpg")
-img_nir_path = os.path.join(nir_save_folder, f"nir_{current_time}.jpg")
+# Define file paths, the extension is set by the archive format
+img_rgb_path = os.path.join(rgb_save_folder, f"rgb_{current_time}")
+img_nir_path = os.path.join(nir_save_folder, f"nir_{current_time}")
+meta_path = os.path.join(rgb_save_folder, f"meta_{current_time}.json")
 
-# Capture and save images
-picam0.capture_file(img_rgb_path)
-picam1.capture_file(img_nir_path)
+# Capture both cameras at the same instant, then save images
+capture = cameras.capture()
+img_rgb_path = write_frame(img_rgb_path, capture["frames"]["rgb"], encoders["archive"])
+img_nir_path = write_frame(img_nir_path, capture["frames"]["nir"], encoders["archive"])
+with open(meta_path, "w") as f:
+    json.dump(dict(capture["metadata"], settle=settle), f, indent=2)
+store.register(img_rgb_path, "rgb", now)
+store.register(img_nir_path, "nir", now)
 
 print(f"Images Captured:")
 print(f"RGB Image: {img_rgb_path}")
 print(f"NIR Image: {img_nir_path}")
+print(f"RGB/NIR skew: {capture['metadata']['rgb_nir_skew_ms']} ms")
+print(f"Settle time: {settle}")
 
 # Stop cameras
-picam0.stop()
-picam1.stop()
+cameras.stop()
+store.close()
@@ -4,10 +4,9 @@
 import os
 import time
 from datetime import datetime
-import picamera
-from picamera import PiCamera
-import cv2
-import numpy as np
+from Helpers.camera import PiCameraStereoBackend, SideBySideCamera
+from Helpers.encoders import load_encoder_config, read_frame_file, write_frame
+from Helpers.image_store import ImageStore
 
 # Photo session settings
 total_photos = 5             # Number of images to take
@@ -20,53 +19,39 @@ cam_height = 624              # Cam sensor height settings
 # Final image capture settings
 scale_ratio = 2
 
-# Camera resolution height must be dividable by 16, and width by 32
-cam_width = int((cam_width+31)/32)*32
-cam_height = int((cam_height+15)/16)*16
+# Index of stored images, the oldest uploaded ones are removed beyond the quota
+store = ImageStore('/media/pi/IOT11/index.sqlite', quota_bytes=20 * 1024 ** 3) # !!! change
 
-# Buffer for captured image settings
-img_width = int (cam_width * scale_ratio)
-img_height = int (cam_height * scale_ratio)
-capture = np.zeros((img_height, img_width, 4), dtype=np.uint8)
+# Image formats of the archive and of the upload copy, e.g. lossless png archive and jpeg upload
+encoders = load_encoder_config('/media/pi/IOT11/encoders.json', sensor='IOT11') # !!! change
 
-# Initialize the camera
-camera = PiCamera(stereo_mode='side-by-side', stereo_decimate=False)
-camera.resolution=(cam_width, cam_height)
-camera.framerate = 20
-camera.hflip = False
+# Initialize the camera pair in side-by-side stereo mode, mounted upside down in the enclosure
+camera = SideBySideCamera(PiCameraStereoBackend((cam_width, cam_height), scale_ratio, framerate=20), rotate_180=True)
+camera.start()
 
 # Lets start taking photos! 
-counter = 0
 t2 = datetime.now()
 print ("Starting photo sequence")
-for frame in camera.capture_continuous(capture, format="bgra", use_video_port=True, resize=(img_width,img_height)):
-    t1 = datetime.now()
-    cntdwn_timer = countdown - int ((t1-t2).total_seconds())
-    
-    # If cowntdown is zero - let's record next image
-    if cntdwn_timer == -1:
-      counter += 1
-      filename = '/media/pi/IOT11/image/'+str(t2.strftime("%d-%m-%Y_%H-%M-%S"))+'_'+str(counter) + '.png'
-      img_rotate_180 = cv2.rotate(frame, cv2.ROTATE_180)
-      cv2.imwrite(filename, img_rotate_180)
-      print (' ['+str(counter)+' of '+str(total_photos)+'] '+filename)
-      t2 = datetime.now()
-      time.sleep(1)
-      cntdwn_timer = 0      # To avoid "-1" timer display 
-      next
-    
-    # Break the program when receiving all images
-    if counter == total_photos:
-      break
+for counter in range(1, total_photos + 1):
+    # Record the next image once the countdown is over
+    time.sleep(max(0.0, countdown + 1 - (datetime.now() - t2).total_seconds()))
+    frame, _ = camera.capture_frame()
+    filename = '/media/pi/IOT11/image/'+str(t2.strftime("%d-%m-%Y_%H-%M-%S"))+'_'+str(counter)
+    filename = write_frame(filename, frame, encoders['archive'])
+    store.register(filename, 'stereo', t2)
+    print (' ['+str(counter)+' of '+str(total_photos)+'] '+filename)
+    t2 = datetime.now()
+camera.stop()
 
 print ("Photo sequence finished")
 
-src_dir = '/media/pi/IOT11/image'
-up_img = [img for img in os.listdir(src_dir) if img.startswith(t2.strftime("%d-%m-%Y_%H")) and img.endswith('3.png')]
+up_img = [img for img in store.frames_in_hour(t2, camera='stereo') if os.path.splitext(img)[0].endswith('3')]
 
 for img in up_img:
-    image = cv2.imread(os.path.join(src_dir, img))
-    filename = '/media/pi/IOT11/img_upload/' + str(t2.strftime("%d-%m-%Y_%H-%M-%S"))+'.png'
-    cv2.imwrite(filename, image)
+    image = read_frame_file(img)
+    filename = '/media/pi/IOT11/img_upload/' + str(t2.strftime("%d-%m-%Y_%H-%M-%S"))
+    filename = write_frame(filename, image, encoders['upload'])
+    store.register(filename, 'upload', t2)
+store.close()
 
 print('Finished')
\ No newline at end of file
@@ -0,0 +1,42 @@
+# Measures the per-statistic error of every pyramid level against the full crop on a calibration set of frames,
+# for the 'auto' resolution of 2_extract_ndvi.py
+# Date: October 2026
+#
+# python3 2_calibrate_resolution.py /media/pi/IOT11/image/15-05-2026_*.png /media/pi/IOT11/image/20-06-2026_*.png
+# Pick frames across the season and the day (early canopy, full canopy, low sun); rerun after a layout change.
+
+import argparse
+import os
+
+import numpy as np
+
+from Helpers.multi_resolution import choose_level, level_errors, pyramid_levels, save_calibration
+from Helpers.plot_layouts import load_layouts
+from Helpers.segmentation import Segmenter
+from Helpers.vi_extractor import prepare_crop
+
+layout_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Layouts", "IOT11.json")  # !!! change
+tolerance = {"mean": 0.01, "median": 0.01, "p95": 0.02, "p90": 0.02, "p85": 0.02}  # Same as 2_extract_ndvi.py
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the extraction pyramid level")
+    parser.add_argument("frames", nargs="+", help="calibration frames")
+    parser.add_argument("--output", default="/home/pi/MScamera/resolution.json")
+    parser.add_argument("--no-segmentation", action="store_true", help="when 2_extract_ndvi.py has segmenter = None")
+    args = parser.parse_args()
+
+    layout = load_layouts(layout_file)[0]
+    frames = [prepare_crop(path, layout.crop) for path in args.frames]
+    segmenter = None if args.no_segmentation else Segmenter("otsu")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        errors = level_errors(frames, layout, pyramid_levels, segmenter=segmenter)
+    save_calibration(args.output, layout, errors)
+    for factor, stats in errors.items():
+        print(f"level 1/{factor}: " + ", ".join(f"{name} {error}" for name, error in stats.items()))
+    print(f"Calibration of {len(frames)} frames saved to {args.output}; "
+          f"'auto' uses level 1/{choose_level(errors, tolerance)} at the default tolerance")
+
+
+if __name__ == "__main__":
+    main()
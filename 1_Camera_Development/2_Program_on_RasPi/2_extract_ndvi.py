@@ -1,99 +1,206 @@
 # Author: Worasit Sangjan
 # Date: 8 Febuary 2022
 
-import os
-from pathlib import Path
-import time
 from datetime import datetime
-import cv2 
-import numpy as np
-from statistics import mean
+import hashlib
 import json
+import os
+from Helpers.backfill import frame_timestamp, iter_archive
+from Helpers.daily_rollup import DailyRollups, choose_upload
+from Helpers.drift import DriftTracker
+from Helpers.encoders import decodes_reduced
+from Helpers.extraction_manifest import ExtractionManifest
+from Helpers.fixed_point import fixed_ndvi_table
+from Helpers.frame_extraction import FrameExtractor
+from Helpers.image_store import ImageStore, file_sha1
+from Helpers.multi_resolution import choose_level, load_calibration
+from Helpers.plot_layouts import MaskCache, load_layouts
+from Helpers.quality_gate import QualityGate
+from Helpers.result_codec import encode_payload
+from Helpers.segmentation import Segmenter
+from Helpers.upload_queue import UploadQueue
+from Helpers.vi_engine import vi_names
+from Helpers.vi_extractor import index_version, prepare_crop, read_frame
+from Helpers.vi_lut import LUTEngine, ndvi_table
 
 
 t2 = datetime.now()
-# Create a list of data in directory
-in_path = '/media/pi/IOT11/image'
-in_data = [img for img in os.listdir(in_path) if img.startswith(t2.strftime("%d-%m-%Y_%H"))]
+# Incremental mode: set to the image folder to extract every frame there that is new, changed, or was extracted
+# with another layout or index version, whenever it was captured, instead of this hour's frames. Results are kept
+# per frame in the manifest and appended to ndvi_frames.jsonl; re-running on an unchanged folder only scans it.
+incremental_folder = None  # !!! change, e.g. '/media/pi/IOT11/image'
+
+# Plot layouts of this sensor: the first one feeds ndvi.json and vi.json, any further layouts (other trials in
+# the same view) are added under 'layouts'. Compiled masks are cached per layout version and crop size.
+# Further layouts get the ndvi at the same pyramid level, drift-aligned when they share the first layout's crop;
+# segmentation, the fixed-point path and memory_budget apply to the first layout only.
+layouts = load_layouts(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Layouts', 'IOT11.json')) # !!! change
+layout = layouts[0]
+masks = MaskCache('/home/pi/MScamera/masks')
+
+# Keeps the plot masks on the plots when the mount sags or the camera moves; None skips the alignment, and then a
+# pyramid level > 1 decodes JPEG frames straight at that level instead of at full resolution (single layout only)
+tracker = DriftTracker('/home/pi/MScamera/drift', sensor='IOT11') # !!! change
+# Frame the plot polygons were drawn on, the tracker's reference; when None the first frame that passes the quality
+# gate becomes the reference, and frames are not aligned before that
+reference_frame = None  # !!! change, e.g. '/media/pi/IOT11/image/01-06-2026_10-00-00_1.png'
+if tracker and reference_frame and not tracker.has_reference:
+    tracker.set_reference(prepare_crop(reference_frame, layout.crop))
+
+# Vegetation indices by table lookup on the 8-bit bands, tables cached on disk (built on the first run)
+lut_folder = '/home/pi/MScamera/lut'
+engine = LUTEngine(vi_names, lut_folder)
+ndvi_lut = ndvi_table(lut_folder)  # Same values as the float64 ndvi formula
+# Integer ndvi path for boards with weak floating point: int16 fixed-point values (step 1/1024) and per-plot
+# statistics accumulated in integers, within 0.001 of the float64 path for every plot whose 'clipped' share is 0
+# (values above 31.999, e.g. inf where red = 0, are clipped; see Helpers/fixed_point.py)
+fixed_point = False  # !!! change
+ndvi_fixed = fixed_ndvi_table() if fixed_point else None
+# Bytes the extraction of a frame may allocate besides the frame itself; set e.g. 16 * 1024 ** 2 to summarize the
+# plots from band-pair counts instead of full-size index images (the ndvi and all indices)
+memory_budget = None  # !!! change
+# Vegetation/soil segmentation, e.g. Segmenter('otsu'): statistics over canopy pixels only, plus the canopy cover of
+# every plot. The threshold is computed once per frame and shared by all indices; None keeps every pixel > 0 like
+# the original extraction. Segmentation needs the full-size index images, it cannot be combined with memory_budget.
+segmenter = None  # !!! change
+# Frame-quality gate, e.g. QualityGate(): scored on a reduced-resolution decode of the crop, so blurred, over- or
+# underexposed and fogged frames are rejected before the full decode and any index work, and listed with their
+# reasons under 'rejected'; None extracts every frame like the original extraction
+gate = None  # !!! change
+# Pyramid level of the extraction: 1 (full crop), 2, 4 or 8, or 'auto' for the coarsest level whose errors,
+# measured by 2_calibrate_resolution.py, stay within resolution_tolerance; the level is stored with every frame
+resolution = 1  # !!! change
+resolution_tolerance = {'mean': 0.01, 'median': 0.01, 'p95': 0.02, 'p90': 0.02, 'p85': 0.02}  # !!! change
+if resolution == 'auto':
+    level_errors = load_calibration('/home/pi/MScamera/resolution.json', layout)
+    level = choose_level(level_errors, resolution_tolerance) if level_errors else 1
+else:
+    level = resolution
+# The extraction of one frame, shared with the job runner's extract stage (Helpers/field_chain.py)
+extractor = FrameExtractor(layouts, masks, engine, ndvi_lut, tracker, segmenter, level, memory_budget, ndvi_fixed)
+# Every extracted frame is added to daily per-plot rollups of all indices (pixel count, integer sums, min/max and
+# histogram). Uplink bytes per day: with a budget the rollup of every finished day is queued once, then each
+# session's per-frame payloads as long as they fit, the rest stays on the device; None sends only the payloads
+link_budget = None  # !!! change, e.g. 512 * 1024
+# The session payload is the ndvi.json content, smaller once encoded than the original ndvi.json. vi.json (every
+# index with its per-plot histograms) more than doubles it, so it stays on the device unless this is set; the daily
+# rollups sent under a link budget already carry the histograms of every index
+upload_vi = False  # !!! change
+
+
+def extract_frame(file, timestamp: str) -> dict:
+    """
+    Extracts one frame with every layout
+    :param file: str - Image path
+    :param timestamp: str - Timestamp stored with every plot
+    :return: dict - "quality" report, and for a frame that passed the gate "ndvi" plot statistics of the first
+                    layout, "vi" all indices, "drift" report, and "layouts" with the ndvi of any further layouts
+    """
+    # JPEG is scored from the path, decoded at reduced resolution, and the full decode waits for a pass; any other
+    # format is decoded in full by the gate too, so it is decoded once and the array is shared with the extraction
+    if gate and not decodes_reduced(file):
+        file = read_frame(file)
+    quality = gate.check(file, layout.crop) if gate else {'passed': True, 'reasons': []}
+    if not quality['passed']:
+        return {'quality': quality}
+    return extractor.extract(file, timestamp, quality)
 
-# Image size
-i_w = 1280
-i_h = 1248
 
-rep = []
 replicate = ['rep1', 'rep2', 'rep3', 'rep4', 'rep5']
 
 print('start')
-# Loop to extract the vi
-for file in in_data:
-    img = cv2.imread(os.path.join(in_path, file)) # Read the image 
-    img = img[100:900, i_w:2496] # Resize the image
-    
-    # Solit the color band
-    b, g, r = cv2.split(img)
-    # Calculate the ndvi
-    ndvi = ((1.664*(b.astype(float))) / (0.953*(r.astype(float)))) - 1
-    # Create black image for masking
-    blank = np.zeros(ndvi.shape[:2], dtype='uint8')
-    
-    # Mask location on the image
-    plot = [[(280, 190), (400, 190), (330, 300), (160, 300)], # !!! change
-            [(500, 190), (650, 190), (640, 300), (460, 300)], # !!! change
-            [(735, 190), (885, 190), (930, 300), (750, 300)], # !!! change
-            [(980, 190), (1105, 190), (1200, 285), (1020, 285)]] # !!! change
-    var = ['vr1_1', 'vr2_1', 'vr3_1', 'vr4_1']
-    nd = []
- 
-    for pl in plot:
-        # Mask the plot in left side
-        pl_m = cv2.fillPoly(blank, np.array([pl]), 255)
-        m = cv2.bitwise_and(ndvi, ndvi, mask=pl_m)
-        m[m <= 0] = np.nan # Replace zero value to nan
-        mean_m = round(np.nanmean(m), 5)
-        median_m = round(np.nanmedian(m), 5)
-        std_m = round(np.nanstd(m), 5)
-        max_m = round(np.nanmax(m), 5)
-        p95_m = round(np.nanpercentile(m, 95), 5)
-        p90_m = round(np.nanpercentile(m, 90), 5)
-        p85_m = round(np.nanpercentile(m, 85), 5)
-        timestamp = t2.strftime("%d-%m-%Y_%H-%M-%S")
-        # Make dictionary for ndvi of one plot
-        data = [timestamp, mean_m, median_m, std_m, max_m, p95_m, p90_m, p85_m]
-        header = ['timestamp', 'mean', 'median', 'std', 'max', 'p95', 'p90', 'p85']
-        dict_plot = {i:j for i, j in zip(header, data)}
-        # Combine ndvi data of all plots in lllllist datatype
-        nd.append(dict_plot)
+rollups = DailyRollups('/home/pi/MScamera/rollups.sqlite')
+# A layout edit, a segmentation, gate or arithmetic change makes every frame stale: extracted again in incremental
+# mode, and its rollup contribution replaced in both modes
+settings = repr(segmenter) + repr(gate) + str(level) + (' fixed' if fixed_point else '') + \
+    ('' if tracker else ' no drift')
+settings = hashlib.sha1(settings.encode()).hexdigest()[:8]
+layout_key = '+'.join([each.digest for each in layouts] + [settings])
+if incremental_folder:
+    # Frames are keyed by their path in the folder; an index change makes every frame stale too
+    manifest = ExtractionManifest('/home/pi/MScamera/manifest.sqlite')
+    hashes = manifest.scan(incremental_folder, iter_archive(incremental_folder))
+    pending = manifest.pending(hashes, layout_key, index_version)
+    # Appended before the manifest records the frame: after a crash a frame may appear twice, the last line wins
+    with open('/home/pi/MScamera/ndvi_frames.jsonl', 'a') as frames_file:
+        for name in pending:
+            captured = frame_timestamp(os.path.join(incremental_folder, name))
+            result = extract_frame(os.path.join(incremental_folder, name), captured.strftime("%d-%m-%Y_%H-%M-%S"))
+            result['frame'] = name
+            frames_file.write(json.dumps(result, separators=(',', ':')) + '\n')
+            frames_file.flush()
+            manifest.record(name, hashes[name], layout_key, index_version, captured, result)
+            rollups.add(result, hashes[name], layout_key)
+    # The latest frames for the Node-RED payload; a few more are read since some may have been rejected
+    results = list(manifest.results(layout_key, latest=4 * len(replicate)).values()) if pending else []
+    paths = {result['frame']: os.path.join(incremental_folder, result['frame']) for result in results}
+    manifest.close()
+    print(f'{len(pending)} new or stale frames of {len(hashes)}')
+else:
+    # Look up this hour's images in the image index
+    store = ImageStore('/media/pi/IOT11/index.sqlite', quota_bytes=20 * 1024 ** 3) # !!! change
+    in_data = store.frames_in_hour(t2, camera='stereo')
+    store.close()
+    # Loop to extract the vi
+    timestamp = t2.strftime("%d-%m-%Y_%H-%M-%S")
+    results = []
+    paths = {}  # Frame name -> image path, marked uploaded in the image store once its results are on the server
+    for file in in_data:
+        results.append(extract_frame(file, timestamp))
+        results[-1]['frame'] = os.path.basename(file)
+        paths[results[-1]['frame']] = file
+        rollups.add(results[-1], file_sha1(file), layout_key)
+
+# The Node-RED payload keeps its replicate keys: this hour's frames, or the latest frames of an incremental run
+# (left untouched when an incremental run found nothing new)
+if results or not incremental_folder:
+    rejected = [{'frame': result['frame'], 'reasons': result['quality']['reasons']}
+                for result in results if not result['quality']['passed']]
+    results = [result for result in results if result['quality']['passed']][-len(replicate):]
+    for frame in rejected:
+        print(f"Rejected {frame['frame']}: {', '.join(frame['reasons'])}")
     # Match each ndvi dict with their plot's name
-    ndvi_data = dict(zip(var, nd))
-    # Combine ndvi of all images
-    rep.append(ndvi_data)
-# Match each ndvi dict with their plot's name
-final_data = dict(zip(replicate, rep))
-json_file = open('/home/pi/MScamera/ndvi.json', 'w')
-json.dump(final_data, json_file, indent=6)
-json_file.close()
-print('finish')        
-
-        
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    final_data = dict(zip(replicate, [result['ndvi'] for result in results]))
+    final_data['drift'] = [result['drift'] for result in results]
+    final_data['frames'] = [result['frame'] for result in results]
+    final_data['quality'] = [result['quality'] for result in results]
+    final_data['levels'] = [result['level'] for result in results]
+    final_data['rejected'] = rejected
+    if results and 'layouts' in results[0]:
+        final_data['layouts'] = dict(zip(replicate, [result['layouts'] for result in results]))
+    json_file = open('/home/pi/MScamera/ndvi.json', 'w')
+    json.dump(final_data, json_file, indent=6)
+    json_file.close()
+    vi_data = dict(zip(replicate, [result['vi'] for result in results]))
+    with open('/home/pi/MScamera/vi.json', 'w') as json_file:
+        json.dump(vi_data, json_file, separators=(',', ':'))
+    detail_bytes = len(encode_payload(final_data)) if results or rejected else 0
+    if upload_vi and detail_bytes:
+        detail_bytes += len(encode_payload(vi_data))
+else:
+    detail_bytes = 0
+
+# Compact copies for the metered link, sent by 4_upload_results.py whenever the link is up
+day = t2.strftime('%Y-%m-%d')
+days = rollups.dirty_days(before=day) if link_budget else []
+rollup_data = rollups.payload(days)
+rollup_bytes = len(encode_payload(rollup_data)) if days else 0
+upload = choose_upload(detail_bytes, rollup_bytes, rollups.spent(day), link_budget)
+if upload:
+    queue = UploadQueue('/home/pi/MScamera/upload_queue.sqlite')
+    if 'rollup' in upload:
+        queue.put('rollup', rollup_data)
+        rollups.mark_queued(days)
+        rollups.spend(day, rollup_bytes)
+    if 'detail' in upload:
+        # 4_upload_results.py marks these frames uploaded in the image store once the server acknowledged them
+        frames = [paths[name] for name in final_data['frames'] + [frame['frame'] for frame in rejected]]
+        queue.put('ndvi', final_data, frames)
+        if upload_vi:
+            queue.put('vi', vi_data)
+        rollups.spend(day, detail_bytes)
+    queue.close()
+if detail_bytes and 'detail' not in upload:
+    print(f"Link budget of {link_budget} bytes used up today, this session stays on the device")
+rollups.close()
+print('finish')
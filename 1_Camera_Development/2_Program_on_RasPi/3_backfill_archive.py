@@ -0,0 +1,39 @@
+# Re-extracts every vegetation index of a whole image archive, e.g. after the plot polygons changed
+# Date: October 2026
+#
+# Stereo archive:   python3 3_backfill_archive.py /media/pi/IOT11/image /media/pi/IOT11/backfill
+# Service archive:  python3 3_backfill_archive.py /home/pi/images/nir /home/pi/images/backfill --camera nir
+# An interrupted run continues where it stopped when started again with the same output folder.
+
+import argparse
+import os
+
+from Helpers.backfill import run_backfill
+from Helpers.vi_extractor import layout_folder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AGIcam archive backfill")
+    parser.add_argument("archive", help="archive folder, walked recursively")
+    parser.add_argument("output", help="folder of the result part files and progress log")
+    parser.add_argument("--sensor", default="IOT11", help="sensor name stored with every row")  # !!! change
+    parser.add_argument("--camera", default="stereo", choices=["stereo", "nir"], help="frame layout of the archive")
+    parser.add_argument("--workers", type=int, help="worker processes, all cores by default")
+    parser.add_argument("--format", default="csv", choices=["csv", "parquet"], help="parquet needs pyarrow")
+    parser.add_argument("--lut", default="/home/pi/MScamera/lut", help="cache folder of the index lookup tables")
+    parser.add_argument("--part-frames", type=int, default=200, help="frames per output part file")
+    parser.add_argument("--layout", help="plot layout file, Layouts/<sensor>.json by default; its first layout is "
+                                         "extracted")
+    args = parser.parse_args()
+
+    layout_path = args.layout or os.path.join(layout_folder, f"{args.sensor}.json")
+    summary = run_backfill(args.archive, args.output, args.sensor, args.camera, args.workers, args.format, args.lut,
+                           args.part_frames, layout_path=layout_path)
+    print(f"Processed {summary['frames']} frames in {summary['seconds']} s ({summary['fps']} frames/s), "
+          f"{summary['skipped']} already done, {len(summary['failed'])} failed")
+    for frame, error in summary["failed"].items():
+        print(f"  {frame}: {error}")
+
+
+if __name__ == "__main__":
+    main()
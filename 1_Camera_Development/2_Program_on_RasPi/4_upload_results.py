@@ -0,0 +1,47 @@
+# Uploads the result payloads queued by 2_extract_ndvi.py, in batches with retry and backoff
+# Date: October 2026
+#
+# Once, e.g. from cron after the extraction:  python3 4_upload_results.py http://<server>:1880/agicam
+# As a service that waits out link outages:   python3 4_upload_results.py http://<server>:1880/agicam --loop
+# Payloads stay queued until the server answered 2xx, so nothing is lost while the link is down. The frames of an
+# acknowledged session are then marked uploaded in the image store, which evicts them first when it is full.
+
+import argparse
+import os
+import threading
+
+from Helpers.image_store import ImageStore
+from Helpers.upload_queue import UploadQueue, Uploader
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AGIcam result uploader")
+    parser.add_argument("url", help="HTTP endpoint receiving the batches")
+    parser.add_argument("--queue", default="/home/pi/MScamera/upload_queue.sqlite", help="upload queue database")
+    parser.add_argument("--index", default="/media/pi/IOT11/index.sqlite", help="image store index")  # !!! change
+    parser.add_argument("--sensor", default="IOT11", help="sensor name sent with every batch")  # !!! change
+    parser.add_argument("--batch-size", type=int, default=50, help="records per HTTP request")
+    parser.add_argument("--loop", action="store_true", help="keep running and retry with backoff")
+    args = parser.parse_args()
+
+    queue = UploadQueue(args.queue)
+    # Only marks frames, the quota is enforced by the scripts that register them
+    store = ImageStore(args.index, quota_bytes=20 * 1024 ** 3) if os.path.exists(args.index) else None
+    uploader = Uploader(queue, args.url, args.sensor, args.batch_size, store=store)
+    if args.loop:
+        stop = threading.Event()
+        try:
+            uploader.run(stop)
+        except KeyboardInterrupt:
+            stop.set()
+    else:
+        uploader.drain()  # A failed run leaves the records for the next one
+    print(f"Uploaded {uploader.stats['records']} records in {uploader.stats['batches']} batches "
+          f"({uploader.stats['bytes']} bytes), {queue.depth()} still queued")
+    queue.close()
+    if store is not None:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Runs the capture -> quality -> extract -> upload chain as one on-device job runner instead of separate cron jobs
+# Date: October 2026
+#
+# On the sensor (see 0_crontab_docs.md):  python3 5_run_pipeline.py --schedule /home/pi/MScamera/schedule.txt
+# One capture, e.g. from cron:           python3 5_run_pipeline.py --once
+# On a laptop, simulated camera:         python3 5_run_pipeline.py --fake --once --count 5 --folder /tmp/agicam
+# Queue depth and per-stage latency:     python3 5_run_pipeline.py --status
+# Every job is stored in <folder>/jobs.sqlite before it runs: a chain cut by a reboot continues at the next start.
+
+import argparse
+import os
+import threading
+from datetime import datetime
+
+from Helpers.camera import FakeCamera, PiCameraStereoBackend
+from Helpers.capture_service import next_scheduled_time, read_schedule
+from Helpers.field_chain import FieldChain, chain_stages
+from Helpers.job_runner import JobRunner
+from Helpers.quality_gate import QualityGate
+from Helpers.segmentation import Segmenter
+
+sensor = 'IOT11'  # !!! change
+layout_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Layouts', 'IOT11.json')  # !!! change
+storage_quota = 20 * 1024 ** 3  # !!! change
+# Budgets of the stages running at once: cores, and watts above the idle board (solar/battery sites)
+cpu_budget = 3.0  # !!! change
+power_budget = 6.0  # !!! change, None for mains power
+# Uplink bytes per day and vi records, as link_budget and upload_vi in 2_extract_ndvi.py
+link_budget = None  # !!! change, e.g. 512 * 1024
+upload_vi = False  # !!! change
+
+
+def print_status(runner: JobRunner) -> None:
+    """
+    Prints the queue depth and latency of every stage
+    :param runner: JobRunner - Runner of the chain
+    :return: None
+    """
+    print(f"{'stage':<10}{'pending':>9}{'running':>9}{'done':>7}{'failed':>8}{'retries':>9}"
+          f"{'wait ms':>16}{'run ms':>16}{'chain ms':>18}")
+    for name, stage in runner.metrics().items():
+        latency = [f"{stage[key]['mean']:.0f} / {stage[key]['p95']:.0f}" if key in stage else '-'
+                   for key in ('wait_ms', 'run_ms', 'chain_ms')]
+        print(f"{name:<10}{stage['pending']:>9}{stage['running']:>9}{stage['done']:>7}{stage['failed']:>8}"
+              f"{stage['retries']:>9}{latency[0]:>16}{latency[1]:>16}{latency[2]:>18}")
+    print("latency as mean / p95; chain ms is the time from the capture job to the end of the stage")
+
+
+def schedule_captures(runner: JobRunner, times: list, stop: threading.Event) -> None:
+    """
+    Submits a capture job at every scheduled time until stopped, pruning the job history on the way
+    :param runner: JobRunner - Runner of the chain
+    :param times: list[str] - HH:MM capture times
+    :param stop: threading.Event - Set to stop
+    :return: None
+    """
+    while not stop.is_set():
+        when = next_scheduled_time(times, datetime.now())
+        if stop.wait(max(0.0, (when - datetime.now()).total_seconds())):
+            return
+        runner.submit('capture', {'scheduled': when.strftime('%d-%m-%Y_%H-%M-%S')})
+        runner.prune()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AGIcam on-device pipeline")
+    parser.add_argument("--schedule", help="file of HH:MM capture times, runs until stopped")
+    parser.add_argument("--once", action="store_true", help="capture now, run the chain to the end and exit")
+    parser.add_argument("--count", type=int, default=1, help="captures of a --once run")
+    parser.add_argument("--interval", type=float, default=0.0, help="seconds between the captures of a --once run")
+    parser.add_argument("--fake", action="store_true", help="simulated camera, to run the chain without hardware")
+    parser.add_argument("--folder", default="/home/pi/MScamera", help="results, caches and the job queue")
+    parser.add_argument("--images", help="stereo frame archive, <folder>/image with --fake")
+    parser.add_argument("--url", help="ingest endpoint; frame results are only queued when not given")
+    parser.add_argument("--status", action="store_true", help="print the queue depth and stage latency and exit")
+    parser.add_argument("--cpu", type=float, default=cpu_budget, help="cores the running stages may use")
+    parser.add_argument("--power", type=float, default=power_budget, help="watts the running stages may draw")
+    args = parser.parse_args()
+    image_folder = args.images or (os.path.join(args.folder, 'image') if args.fake else '/media/pi/IOT11/image')
+
+    if args.status:
+        runner = JobRunner(os.path.join(args.folder, 'jobs.sqlite'), chain_stages())
+        print_status(runner)
+        runner.close()
+        return
+    if not args.schedule and not args.once:
+        parser.error("one of --schedule or --once is required")
+
+    camera = FakeCamera(0, resolution=(2560, 1248), startup_delay=0.0) if args.fake else PiCameraStereoBackend()
+    camera.start()
+    chain = FieldChain(camera, args.folder, image_folder, layout_file, sensor, args.url, storage_quota,
+                       segmenter=Segmenter('otsu'), gate=QualityGate(),  # !!! change
+                       link_budget=link_budget, upload_vi=upload_vi)
+    runner = JobRunner(os.path.join(args.folder, 'jobs.sqlite'), chain_stages(chain), args.cpu, args.power)
+    print(f"{runner.recover()} interrupted jobs resumed")
+    try:
+        if args.once:
+            for number in range(args.count):
+                runner.submit('capture', {}, delay=number * args.interval)
+            drained = runner.run_until_idle()
+            print_status(runner)
+            if not drained:
+                print("Jobs still pending")
+        else:
+            stop = threading.Event()
+            scheduler = threading.Thread(target=schedule_captures,
+                                         args=(runner, read_schedule(args.schedule), stop), daemon=True)
+            scheduler.start()
+            try:
+                runner.run(stop)
+            except KeyboardInterrupt:
+                stop.set()
+                runner.run(stop)  # Finishes the running jobs; pending ones wait in the queue for the next start
+        runner.prune()
+    finally:
+        runner.close()
+        chain.close()
+        camera.stop()
+
+
+if __name__ == "__main__":
+    main()
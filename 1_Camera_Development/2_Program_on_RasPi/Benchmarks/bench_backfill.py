@@ -0,0 +1,56 @@
+# Archive backfill throughput against the number of worker processes on a synthetic stereo archive (resuming
+# an interrupted run is checked in tests/test_backfill.py)
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_backfill.py
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DataStructures.encoder_settings import EncoderSettings
+from Helpers.backfill import run_backfill
+from Helpers.camera import synthetic_field_frame
+from Helpers.encoders import write_frame
+
+days = 2
+frames_per_day = 12
+
+
+def synthetic_archive(folder: str) -> int:
+    """Stereo frames named like 1_capture_dual_img_original.py names them, a few distinct frames reused"""
+    rng = np.random.default_rng(0)
+    frames = [synthetic_field_frame((2560, 1248), rng) for _ in range(4)]
+    start = datetime(2026, 5, 1, 8)
+    count = 0
+    for day in range(days):
+        for hour in range(frames_per_day):
+            when = start + timedelta(days=day, hours=hour)
+            name = f"{when.strftime('%d-%m-%Y_%H-%M-%S')}_{hour % 5 + 1}"
+            write_frame(os.path.join(folder, name), frames[count % len(frames)], EncoderSettings("jpeg", quality=95))
+            count += 1
+    return count
+
+
+def main():
+    cores = os.cpu_count()
+    with tempfile.TemporaryDirectory() as folder:
+        archive = os.path.join(folder, "image")
+        os.makedirs(archive)
+        count = synthetic_archive(archive)
+        print(f"{count} synthetic 2560x1248 frames, {cores} cores")
+
+        baseline = None
+        for workers in sorted({1, 2, 4, cores}):
+            summary = run_backfill(archive, os.path.join(folder, f"out{workers}"), "bench", workers=workers,
+                                   part_frames=8, report_every=0)
+            baseline = baseline or summary["fps"]
+            print(f"{workers} workers: {summary['fps']:6.2f} frames/s, speedup {summary['fps'] / baseline:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Burst fusion cost against burst length and resolution, and the per-plot ndvi spread it buys
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_burst_fusion.py
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.burst import FrameRing, fuse_mean, select_sharpest
+from Helpers.camera import synthetic_field_frame
+from Helpers.vi_extractor import extract_ndvi, stereo_crop
+
+resolutions = [(1280, 624), (1640, 1232), (2560, 1248), (3280, 2464)]
+burst_lengths = [2, 4, 8, 16]
+noise_sigma = 8  # Sensor noise in grey levels
+sessions = 12
+
+
+def fill_ring(ring: FrameRing, base: np.ndarray, rng: np.random.Generator) -> FrameRing:
+    """Pushes a burst of noisy copies of the base frame, one frame of temporaries at a time"""
+    ring.clear()
+    for _ in range(len(ring.buffer)):
+        noise = rng.normal(0, noise_sigma, size=base.shape).astype(np.float32)
+        ring.push(np.clip(base + noise, 0, 255).astype(np.uint8))
+    return ring
+
+
+def timed(func, *args) -> float:
+    t0 = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'resolution':>12} {'k':>3} {'mean ms':>9} {'sharpest ms':>12}")
+    for resolution in resolutions:
+        base = synthetic_field_frame(resolution, rng)
+        for k in burst_lengths:
+            ring = fill_ring(FrameRing(k, base.shape), base, rng)
+            out = np.empty_like(base)
+            mean_ms = min(timed(fuse_mean, ring.frames(), out) for _ in range(3))
+            sharp_ms = min(timed(select_sharpest, ring.frames()) for _ in range(3))
+            print(f"{resolution[0]:>6}x{resolution[1]:<5} {k:>3} {mean_ms:>9.1f} {sharp_ms:>12.1f}")
+
+    # Spread of the per-plot mean ndvi between sessions of an unchanged scene
+    base = synthetic_field_frame((2560, 1248), rng)
+    print(f"\nPer-plot mean ndvi spread over {sessions} sessions, noise sigma {noise_sigma}")
+    for k in (1, 4, 8):
+        means = []
+        ring = FrameRing(k, base.shape)
+        for _ in range(sessions):
+            frames = fill_ring(ring, base, rng).frames()
+            fused = frames[0] if k == 1 else fuse_mean(frames)
+            results = extract_ndvi(fused, "bench", crop=stereo_crop)
+            means.append([stats["mean"] for stats in results.values()])
+        print(f"  k={k:<2} std of plot means: {np.std(means, axis=0).mean():.5f}")
+
+
+if __name__ == "__main__":
+    main()
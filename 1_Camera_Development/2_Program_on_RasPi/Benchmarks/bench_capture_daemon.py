@@ -0,0 +1,70 @@
+# Cold start per cron session vs. trigger of the warm capture service, on synthetic cameras
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_capture_daemon.py
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.camera import FakeCamera
+from Helpers.capture_service import CaptureService, request_capture, send_request
+
+resolution = (1640, 1232)
+startup_delay = 0.3  # Simulated Picamera2 create + configure + start per camera
+settle_time = 0.5    # Stand-in for the fixed time.sleep(2) of 1_capture_dual_img.py
+sessions = 5
+
+
+def make_cameras() -> dict:
+    return {"rgb": FakeCamera(0, resolution, startup_delay), "nir": FakeCamera(1, resolution, startup_delay)}
+
+
+def cold_session(out_dir: str) -> float:
+    t0 = time.perf_counter()
+    service = CaptureService(make_cameras(), out_dir, settle_time)
+    service.start()
+    service.capture(save=True)
+    service.stop()
+    return time.perf_counter() - t0
+
+
+def main():
+    with tempfile.TemporaryDirectory() as out_dir:
+        cold = [cold_session(out_dir) for _ in range(sessions)]
+
+        socket_path = os.path.join(out_dir, "capture.sock")
+        service = CaptureService(make_cameras(), out_dir, settle_time)
+        service.start()
+        server = threading.Thread(target=service.serve_socket, args=(socket_path,))
+        server.start()
+        while not os.path.exists(socket_path):
+            time.sleep(0.01)
+
+        warm, warm_saved, frame_ms = [], [], []
+        for _ in range(sessions):
+            t0 = time.perf_counter()
+            reply = request_capture(socket_path, save=False)
+            warm.append(time.perf_counter() - t0)
+            frame_ms.append(reply["latency_ms"])
+            t0 = time.perf_counter()
+            request_capture(socket_path, save=True)
+            warm_saved.append(time.perf_counter() - t0)
+        send_request(socket_path, {"cmd": "stop"})
+        server.join()
+        service.stop()
+
+    print(f"Resolution {resolution}, {sessions} sessions, 2 cameras")
+    print(f"Cold start per session (start + settle + capture + save): {np.median(cold) * 1000:9.1f} ms")
+    print(f"Warm trigger, arrays only:                                {np.median(warm) * 1000:9.1f} ms")
+    print(f"  of which trigger-to-frame inside the service:           {np.median(frame_ms):9.1f} ms")
+    print(f"Warm trigger, saved to disk:                              {np.median(warm_saved) * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Daily per-plot rollups: the cost of adding a day of hourly sessions frame by frame, and the uplink bytes of a day
+# of per-session payloads against one rollup payload (order, grouping and accuracy of the rollups are checked in
+# tests/test_daily_rollup.py)
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_daily_rollup.py
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.daily_rollup import DailyRollups
+from Helpers.result_codec import encode_payload
+from Helpers.vi_extractor import extract_indices, prepare_crop
+from Helpers.vi_lut import LUTEngine
+
+sessions = 24  # Hourly sessions of one day
+frames_per_session = 5
+replicate = ['rep1', 'rep2', 'rep3', 'rep4', 'rep5']
+
+
+def main():
+    engine = LUTEngine()
+    frames = []
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for number in range(sessions * frames_per_session):
+            img = prepare_crop(synthetic_field_frame((2560, 1248), np.random.default_rng(number)))
+            timestamp = f"01-06-2026_{number // frames_per_session:02d}-00-00"
+            frames.append({"frame": f"frame_{number:03d}.png", "vi": extract_indices(img, timestamp, engine)})
+
+    with tempfile.TemporaryDirectory() as folder:
+        rollups = DailyRollups(os.path.join(folder, "rollups.sqlite"))
+        t0 = time.perf_counter()
+        for result in frames:
+            rollups.add(result, result["frame"], "layout")
+        add_ms = (time.perf_counter() - t0) * 1000 / len(frames)
+        print(f"{len(frames)} frames of {sessions} sessions added frame by frame: {add_ms:.1f} ms per frame")
+        t0 = time.perf_counter()
+        rollups.add(dict(frames[0], vi=frames[1]["vi"]), frames[0]["frame"], "edited layout")
+        print(f"One frame re-extracted, its day rebuilt: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+        detail = 0
+        for session in range(sessions):
+            results = frames[session * frames_per_session:(session + 1) * frames_per_session]
+            vi_data = dict(zip(replicate, [result["vi"] for result in results]))
+            ndvi_data = dict(zip(replicate, [result["vi"]["ndvi"] for result in results]))
+            detail += len(encode_payload(ndvi_data)) + len(encode_payload(vi_data))
+        rollup_bytes = len(encode_payload(rollups.payload(["2026-06-01"])))
+        print(f"uplink per day: {detail} B of per-session payloads, {rollup_bytes} B of rollups "
+              f"({detail / rollup_bytes:.0f}x less)")
+        rollups.close()
+
+
+if __name__ == "__main__":
+    main()
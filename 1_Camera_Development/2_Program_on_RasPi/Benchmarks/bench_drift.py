@@ -0,0 +1,43 @@
+# Day-to-day drift estimation on a synthetic season of slowly sagging camera: accuracy, cost and shift reuse
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_drift.py
+
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.drift import DriftTracker, shift_image
+
+crop_size = (1216, 800)  # NoIR crop of 2_extract_ndvi.py
+# (dx, dy) of the camera per session: steady days, a slow sag, then a wind knock
+season = [(0, 0), (0.2, 0.1), (0.3, 0.1), (1.5, 2.0), (3.0, 4.1), (3.1, 4.0), (12.0, -6.5), (12.2, -6.4)]
+
+
+def main():
+    rng = np.random.default_rng(1)
+    noise = rng.integers(0, 256, size=(crop_size[1] // 8, crop_size[0] // 8), dtype=np.uint8)
+    grey = cv2.GaussianBlur(cv2.resize(noise, crop_size, interpolation=cv2.INTER_CUBIC), (5, 5), 0)
+    reference = cv2.merge([grey, grey, grey])
+
+    with tempfile.TemporaryDirectory() as folder:
+        tracker = DriftTracker(folder, "bench", warn_drift=10.0)
+        tracker.set_reference(reference)
+        print(f"{'true dx, dy':>14} {'estimated dx, dy':>18} {'error px':>9} {'ms':>6} {'reused':>7} {'flag':>5}")
+        for dx, dy in season:
+            frame = shift_image(reference, dx, dy)
+            t0 = time.perf_counter()
+            _, report = tracker.align(frame)
+            ms = (time.perf_counter() - t0) * 1000
+            error = np.hypot(report["dx"] - dx, report["dy"] - dy)
+            print(f"{dx:>6.1f}, {dy:>6.1f} {report['dx']:>8.2f}, {report['dy']:>7.2f} {error:>9.2f} {ms:>6.1f} "
+                  f"{report['reused']!s:>7} {report['maintenance']!s:>5}")
+
+
+if __name__ == "__main__":
+    main()
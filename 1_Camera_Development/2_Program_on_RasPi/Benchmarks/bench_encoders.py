@@ -0,0 +1,60 @@
+# Encode time, decode time and bytes per frame of every archive/upload format at the capture resolutions
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_encoders.py
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DataStructures.encoder_settings import EncoderSettings
+from Helpers.camera import synthetic_field_frame
+from Helpers.encoders import decode_frame, encode_frame
+
+# Single camera full sensor, single camera half sensor and the side-by-side stereo frame
+resolutions = [(1640, 1232), (2560, 1248), (3280, 2464)]
+settings = [EncoderSettings("png", compression=1),
+            EncoderSettings("png", compression=3),
+            EncoderSettings("png", compression=6),
+            EncoderSettings("jpeg", quality=95),
+            EncoderSettings("jpeg", quality=85),
+            EncoderSettings("jpeg", quality=70),
+            EncoderSettings("webp", quality=90),
+            EncoderSettings("webp", quality=75),
+            EncoderSettings("npy")]
+repeats = 3
+
+
+def label(setting: EncoderSettings) -> str:
+    if setting.format == "png":
+        return f"png  compression {setting.compression}"
+    if setting.format == "npy":
+        return "npy  raw"
+    return f"{setting.format:<4} quality {setting.quality}"
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for resolution in resolutions:
+        frame = synthetic_field_frame(resolution, rng)
+        print(f"\n{resolution[0]}x{resolution[1]} ({frame.nbytes / 1e6:.1f} MB raw)")
+        print(f"{'format':<22}{'encode ms':>10}{'decode ms':>10}{'KB/frame':>10}{'PSNR dB':>9}")
+        for setting in settings:
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                data = encode_frame(frame, setting)
+            encode_ms = (time.perf_counter() - t0) * 1000 / repeats
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                decoded = decode_frame(data, setting.format)
+            decode_ms = (time.perf_counter() - t0) * 1000 / repeats
+            mse = np.mean((decoded.astype(np.float32) - frame.astype(np.float32)) ** 2)
+            psnr = "lossless" if mse == 0 else f"{10 * np.log10(255 ** 2 / mse):.1f}"
+            print(f"{label(setting):<22}{encode_ms:>10.1f}{decode_ms:>10.1f}{len(data) / 1024:>10.0f}{psnr:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Incremental extraction manifest: cost of a run over an unchanged image folder (scan only) vs. the first run
+# (hashing every frame), and which frames a new frame, an overwritten frame, a layout edit and an index version
+# bump make pending
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_extraction_manifest.py
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DataStructures.encoder_settings import EncoderSettings
+from Helpers.backfill import frame_timestamp, iter_archive
+from Helpers.camera import synthetic_field_frame
+from Helpers.encoders import encode_frame
+from Helpers.extraction_manifest import ExtractionManifest
+
+frame_count = 300
+layout = "66fe3662023628d3"
+
+
+def write_archive(folder: str, count: int, start: int = 0) -> None:
+    """Distinct full-size JPEG frames named like 1_capture_dual_img_original.py names them"""
+    data = encode_frame(synthetic_field_frame((2560, 1248), np.random.default_rng(0)), EncoderSettings("jpeg", 95))
+    for frame in range(start, start + count):
+        when = datetime(2026, 5, 1, 8) + timedelta(minutes=10 * frame)
+        with open(os.path.join(folder, f"{when.strftime('%d-%m-%Y_%H-%M-%S')}_{frame % 5 + 1}.jpg"), "wb") as f:
+            f.write(data + frame.to_bytes(4, "little"))  # Bytes after the JPEG end marker make every file distinct
+
+
+def run(manifest: ExtractionManifest, folder: str, version: int = 1, key: str = layout) -> tuple:
+    """One incremental run with the extraction itself left out: scan, pending, record"""
+    t0 = time.perf_counter()
+    hashes = manifest.scan(folder, iter_archive(folder))
+    pending = manifest.pending(hashes, key, version)
+    for frame in pending:
+        manifest.record(frame, hashes[frame], key, version, frame_timestamp(os.path.join(folder, frame)), {})
+    return pending, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        folder = os.path.join(root, "image")
+        os.makedirs(folder)
+        write_archive(folder, frame_count)
+        manifest = ExtractionManifest(os.path.join(root, "manifest.sqlite"))
+        size_mb = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder)) / 1024 ** 2
+        print(f"{frame_count} frames, {size_mb:.0f} MB")
+
+        t0 = time.perf_counter()
+        for _, _, files in os.walk(folder):
+            for name in files:
+                os.stat(os.path.join(folder, name))
+        walk_ms = (time.perf_counter() - t0) * 1000
+        pending, first_ms = run(manifest, folder)
+        print(f"First run:      {len(pending):>4} pending  {first_ms:8.1f} ms  (hashes every frame)")
+        pending, again_ms = run(manifest, folder)
+        print(f"Unchanged:      {len(pending):>4} pending  {again_ms:8.1f} ms  (directory walk and stat alone "
+              f"{walk_ms:.1f} ms)")
+
+        write_archive(folder, 5, start=frame_count)
+        pending, ms = run(manifest, folder)
+        print(f"5 new frames:   {len(pending):>4} pending  {ms:8.1f} ms")
+
+        overwritten = sorted(os.listdir(folder))[0]
+        with open(os.path.join(folder, overwritten), "ab") as f:
+            f.write(b"\0")
+        pending, ms = run(manifest, folder)
+        print(f"1 overwritten:  {len(pending):>4} pending  {ms:8.1f} ms  ({pending == [overwritten]})")
+
+        pending, ms = run(manifest, folder, key="c96c2836d179724b")
+        print(f"Layout edited:  {len(pending):>4} pending  {ms:8.1f} ms")
+        pending, ms = run(manifest, folder, version=2)
+        print(f"Index version:  {len(pending):>4} pending  {ms:8.1f} ms")
+        manifest.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Fixed-point (int16 table, integer statistics) vs. float64 ndvi extraction: throughput and peak traced memory at
+# the crop sizes of the IOT11 layout (the error bound of the fixed-point path is checked in tests/test_fixed_point.py)
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_fixed_point.py
+
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.fixed_point import fixed_ndvi_table, fixed_plot_stats, lookup_fixed
+from Helpers.multi_resolution import reduce_image
+from Helpers.plot_layouts import load_layouts
+from Helpers.vi_extractor import compute_ndvi, extract_plot_stats, layout_file, prepare_crop
+from Helpers.vi_lut import lookup_ndvi, ndvi_table
+
+repeats = 10
+
+
+def main():
+    layout = load_layouts(layout_file)[0]
+    fixed_table, float_table = fixed_ndvi_table(), ndvi_table()
+
+    paths = {"float64 formula": lambda img, plots: extract_plot_stats(compute_ndvi(img), "t", *plots),
+             "float64 table": lambda img, plots: extract_plot_stats(lookup_ndvi(img, float_table), "t", *plots),
+             "fixed point": lambda img, plots: fixed_plot_stats(lookup_fixed(img, fixed_table), "t", *plots)}
+    frame = synthetic_field_frame((2560, 1248), np.random.default_rng(0))
+    print(f"{'crop':<12}{'path':<18}{'ms/frame':>10}{'Mpx/s':>8}{'peak MB':>9}")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for factor in (1, 2):
+            img = reduce_image(prepare_crop(frame, layout.crop), factor)
+            scaled = layout.scaled(factor)
+            plots = (scaled.polygons, scaled.plot_ids)
+            for name, run in paths.items():
+                run(img, plots)  # Builds the cached plot groups
+                t0 = time.perf_counter()
+                for _ in range(repeats):
+                    run(img, plots)
+                seconds = (time.perf_counter() - t0) / repeats
+                tracemalloc.start()
+                run(img, plots)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                size = f"{img.shape[1]}x{img.shape[0]}"
+                print(f"{size:<12}{name:<18}{seconds * 1000:>10.1f}"
+                      f"{img.shape[0] * img.shape[1] / seconds / 1e6:>8.1f}{peak / 1024 ** 2:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Capture-to-ndvi latency: encode/decode round trip through disk vs. in-memory frames with background archiving (the
+# in-memory results are checked against a lossless file in tests/test_archive_writer.py)
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_inmemory_pipeline.py
+
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.archive_writer import ArchiveWriter
+from Helpers.camera import synthetic_field_frame
+from Helpers.vi_extractor import extract_ndvi, stereo_crop
+
+resolution = (2560, 1248)  # Side-by-side stereo frame of 1_capture_dual_img_original.py
+runs = 5
+
+
+def main():
+    frame = synthetic_field_frame(resolution, np.random.default_rng(0))
+    with tempfile.TemporaryDirectory() as out_dir:
+        for ext in ("png", "jpg"):
+            times = []
+            for i in range(runs):
+                path = os.path.join(out_dir, f"frame_{i}.{ext}")
+                t0 = time.perf_counter()
+                cv2.imwrite(path, frame)
+                extract_ndvi(path, "bench", crop=stereo_crop)
+                times.append(time.perf_counter() - t0)
+            print(f"{f'Write {ext} + read back + extract:':<44}{np.median(times) * 1000:8.1f} ms")
+
+        times = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            extract_ndvi(frame, "bench", crop=stereo_crop)
+            times.append(time.perf_counter() - t0)
+        print(f"{'In-memory extract, no archiving:':<44}{np.median(times) * 1000:8.1f} ms")
+
+        # On a single core the background encode competes with the extraction; the CM3+ has four
+        archiver = ArchiveWriter()
+        times = []
+        for i in range(runs):
+            t0 = time.perf_counter()
+            archiver.submit(os.path.join(out_dir, f"archive_{i}.png"), frame)
+            extract_ndvi(frame, "bench", crop=stereo_crop)
+            times.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        archiver.close()
+        print(f"{'In-memory extract, archive in background:':<44}{np.median(times) * 1000:8.1f} ms")
+        print(f"  archive queue drained {(time.perf_counter() - t0) * 1000:.1f} ms after the last result, "
+              f"{archiver.written} frames written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# On-device job runner: per-stage latency of the capture -> quality -> extract -> upload chain on the simulated camera
+# with 30% of the stage runs failing, and the wall time and chain latency of the same captures under a one-core
+# budget, the default budgets and a tight power budget (retries, power-cut recovery and exactly-once extraction are
+# checked in tests/test_field_chain.py)
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_job_runner.py
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.camera import FakeCamera
+from Helpers.field_chain import FieldChain, chain_stages
+from Helpers.job_runner import JobRunner
+from Helpers.quality_gate import QualityGate
+from Helpers.segmentation import Segmenter
+from Helpers.vi_extractor import layout_file
+
+captures = 8
+
+
+def flaky(fn, rate: float, rng: random.Random):
+    """Wraps a stage function so that it fails at the given rate, like a busy SD card or a dropped link"""
+    def run(payload):
+        if rng.random() < rate:
+            raise OSError("injected failure")
+        return fn(payload)
+    return run
+
+
+def run_chain(folder: str, cpu: float, power: float, failure_rate: float = 0.0) -> tuple:
+    """Captures and processes the frames in a fresh folder; returns (runner metrics, wall seconds)"""
+    camera = FakeCamera(0, resolution=(2560, 1248), startup_delay=0.0, frame_latency=0.2)
+    camera.start()
+    chain = FieldChain(camera, folder, os.path.join(folder, "image"), layout_file, "IOT11",
+                       segmenter=Segmenter("otsu"), gate=QualityGate())
+    stages = chain_stages(chain)
+    rng = random.Random(0)
+    for stage in stages:
+        stage.fn = flaky(stage.fn, failure_rate, rng) if failure_rate else stage.fn
+    db_path = os.path.join(folder, "jobs.sqlite")
+    runner = JobRunner(db_path, stages, cpu, power, base_delay=0.05, max_delay=0.5)
+    t0 = time.perf_counter()
+    for _ in range(captures):
+        runner.submit("capture", {})
+    if not runner.run_until_idle(timeout=300):
+        print("the queue did not drain within 300 s")
+    seconds = time.perf_counter() - t0
+    metrics = runner.metrics()
+    runner.close()
+    chain.close()
+    camera.stop()
+    return metrics, seconds
+
+
+def print_metrics(metrics: dict) -> None:
+    print(f"{'stage':<10}{'done':>6}{'failed':>8}{'retries':>9}{'wait ms':>14}{'run ms':>14}{'chain ms':>16}")
+    for name, stage in metrics.items():
+        latency = [f"{stage[key]['mean']:.0f} / {stage[key]['p95']:.0f}" for key in ("wait_ms", "run_ms", "chain_ms")]
+        print(f"{name:<10}{stage['done']:>6}{stage['failed']:>8}{stage['retries']:>9}{latency[0]:>14}"
+              f"{latency[1]:>14}{latency[2]:>16}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        metrics, seconds = run_chain(os.path.join(folder, "flaky"), 3.0, 6.0, failure_rate=0.3)
+        retries = sum(stage["retries"] for stage in metrics.values())
+        print(f"{captures} chains with 30% of the stage runs failing: {retries} retries, {seconds:.1f} s")
+        print_metrics(metrics)
+        print()
+
+        print(f"{'budget':<24}{'wall s':>8}{'chain ms mean':>15}{'chain ms p95':>14}")
+        for label, cpu, power in (("1 core", 1.0, None), ("3 cores, 6 W", 3.0, 6.0), ("3 cores, 2 W", 3.0, 2.0)):
+            metrics, seconds = run_chain(os.path.join(folder, label.replace(" ", "")), cpu, power)
+            chain_ms = metrics["upload"]["chain_ms"]
+            print(f"{label:<24}{seconds:>8.1f}{chain_ms['mean']:>15.0f}{chain_ms['p95']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
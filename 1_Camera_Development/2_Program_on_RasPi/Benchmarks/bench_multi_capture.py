@@ -0,0 +1,68 @@
+# Sequential vs. barrier-synchronized capture on synthetic cameras with artificial latency
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_multi_capture.py
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.camera import FakeCamera, SideBySideCamera
+from Helpers.multi_capture import MultiCameraCapture
+
+resolution = (1640, 1232)
+frame_latency = 0.08   # Seconds from trigger to frame, similar to a still capture on the Pi
+latency_jitter = 0.02
+captures = 10
+
+
+def make_cameras(n: int) -> dict:
+    return {f"cam{i}": FakeCamera(i, resolution, 0.0, frame_latency, latency_jitter) for i in range(n)}
+
+
+def sequential(cameras: dict) -> tuple:
+    """The capture_file one after the other pattern of 1_capture_dual_img.py"""
+    for camera in cameras.values():
+        camera.start()
+    walls, skews = [], []
+    for _ in range(captures):
+        t0 = time.perf_counter()
+        stamps = [camera.capture_frame()[1] for camera in cameras.values()]
+        walls.append((time.perf_counter() - t0) * 1000)
+        skews.append((max(stamps) - min(stamps)) / 1e6)
+    for camera in cameras.values():
+        camera.stop()
+    return np.median(walls), np.median(skews)
+
+
+def concurrent(cameras: dict) -> tuple:
+    capturer = MultiCameraCapture(cameras)
+    capturer.start()
+    metadata = [capturer.capture()["metadata"] for _ in range(captures)]
+    capturer.stop()
+    return np.median([m["wall_ms"] for m in metadata]), np.median([m["skew_ms"] for m in metadata])
+
+
+def main():
+    print(f"Frame latency {frame_latency * 1000:.0f} ms + up to {latency_jitter * 1000:.0f} ms jitter, "
+          f"median of {captures} captures")
+    print(f"{'cameras':>8} {'seq wall ms':>12} {'seq skew ms':>12} {'par wall ms':>12} {'par skew ms':>12}")
+    for n in (2, 4, 8):
+        seq_wall, seq_skew = sequential(make_cameras(n))
+        par_wall, par_skew = concurrent(make_cameras(n))
+        print(f"{n:>8} {seq_wall:>12.1f} {seq_skew:>12.1f} {par_wall:>12.1f} {par_skew:>12.1f}")
+
+    stereo = SideBySideCamera(FakeCamera(0, (2 * resolution[0], resolution[1]), 0.0, frame_latency))
+    capturer = MultiCameraCapture({"stereo": stereo})
+    capturer.start()
+    capture = capturer.capture()
+    capturer.stop()
+    print(f"Side-by-side stereo: views {list(capture['frames'])}, "
+          f"RGB/NIR skew {capture['metadata']['rgb_nir_skew_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Multi-resolution extraction: speed and per-statistic error of every pyramid level against the full crop, from a
+# decoded frame and from a reduced-resolution JPEG decode, and the level the 'auto' mode picks. Two synthetic
+# scenes: independent pixel noise (averaging removes it, so spreads shrink at coarse levels) and a spatially
+# correlated canopy texture closer to real imagery
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_multi_resolution.py
+
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.multi_resolution import choose_level, extract_level, level_errors, pyramid_levels, read_level
+from Helpers.plot_layouts import load_layouts
+from Helpers.vi_extractor import prepare_crop, read_frame
+
+repeats = 5
+layout_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Layouts", "IOT11.json")
+tolerances = {"strict": {"mean": 0.01, "median": 0.01, "p95": 0.02, "p90": 0.02, "p85": 0.02},
+              "loose": {"mean": 0.05, "median": 0.05, "p95": 0.1, "p90": 0.1, "p85": 0.1}}
+
+
+def textured_frame(seed: int) -> np.ndarray:
+    """synthetic_field_frame with its pixel noise replaced by leaf-sized shading and colour texture"""
+    rng = np.random.default_rng(seed)
+    frame = cv2.GaussianBlur(synthetic_field_frame((2560, 1248), rng), (0, 0), 3).astype(np.float32)
+    shading = cv2.GaussianBlur(rng.normal(0, 1, frame.shape[:2]).astype(np.float32), (0, 0), 6)
+    colour = cv2.GaussianBlur(rng.normal(0, 1, frame.shape).astype(np.float32), (0, 0), 6)
+    frame *= 1 + (shading * (0.2 / shading.std()))[..., None]
+    frame += colour * (8 / colour.std())
+    return np.clip(frame, 1, 255).astype(np.uint8)
+
+
+def main():
+    layout = load_layouts(layout_file)[0]
+    scenes = {"pixel noise": [synthetic_field_frame((2560, 1248), np.random.default_rng(seed)) for seed in range(3)],
+              "texture": [textured_frame(seed) for seed in range(3)]}
+    with tempfile.TemporaryDirectory() as folder, np.errstate(divide="ignore", invalid="ignore"):
+        path = os.path.join(folder, "frame.jpg")
+        cv2.imwrite(path, scenes["texture"][0], [cv2.IMWRITE_JPEG_QUALITY, 95])
+        print(f"{'level':<8}{'extract ms':>12}{'decode+extract ms':>19}{'reduced decode+extract ms':>27}")
+        img = prepare_crop(scenes["texture"][0], layout.crop)
+        for factor in pyramid_levels:
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                extract_level(img, "t", layout, factor)
+            extract_ms = (time.perf_counter() - t0) * 1000 / repeats
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                extract_level(prepare_crop(read_frame(path), layout.crop), "t", layout, factor)
+            decode_ms = (time.perf_counter() - t0) * 1000 / repeats
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                extract_level(read_level(path, layout.crop, factor), "t", layout, factor, reduced=True)
+            reduced_ms = (time.perf_counter() - t0) * 1000 / repeats
+            print(f"1/{factor:<6}{extract_ms:>12.1f}{decode_ms:>19.1f}{reduced_ms:>27.1f}")
+
+        for scene, frames in scenes.items():
+            errors = level_errors([prepare_crop(frame, layout.crop) for frame in frames], layout)
+            print(f"\n{scene}: largest error against the full crop")
+            print(f"{'level':<8}" + "".join(f"{name:>9}" for name in errors[1]))
+            for factor, stats in errors.items():
+                print(f"1/{factor:<6}" + "".join(f"{error:>9.4f}" for error in stats.values()))
+            for name, tolerance in tolerances.items():
+                print(f"auto level, {name} tolerance {tolerance}: 1/{choose_level(errors, tolerance)}")
+
+
+if __name__ == "__main__":
+    main()
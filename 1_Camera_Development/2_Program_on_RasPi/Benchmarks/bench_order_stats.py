@@ -0,0 +1,63 @@
+# Plot summary (mean, median, std, max, p95, p90, p85) from separate np.nan* calls vs. one partition and one
+# moment pass, at realistic plot sizes (agreement with the np.nan* calls: tests/test_order_stats.py)
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_order_stats.py
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.order_stats import summarize
+
+# Pixels per plot: a small plot at half resolution, the current plots, a plot spanning a full bed
+plot_sizes = [5000, 20000, 80000]
+repeats = 20
+stats = ["mean", "median", "std", "max", "p95", "p90", "p85"]
+
+
+def nan_calls(m: np.ndarray) -> list:
+    """The original per-plot statistics"""
+    m = m.copy()
+    m[m <= 0] = np.nan
+    with np.errstate(invalid="ignore"):
+        return [round(np.nanmean(m), 5), round(np.nanmedian(m), 5), round(np.nanstd(m), 5), round(np.nanmax(m), 5),
+                round(np.nanpercentile(m, 95), 5), round(np.nanpercentile(m, 90), 5), round(np.nanpercentile(m, 85), 5)]
+
+
+def kernel(m: np.ndarray) -> list:
+    summary = summarize(m)
+    return [round(float(summary[name]), 5) for name in stats]
+
+
+def plot_values(size: int, rng: np.random.Generator) -> np.ndarray:
+    """ndvi-like values with a share of soil (<= 0), NaN and inf (red = 0) pixels, and many ties from 8-bit bands"""
+    b = rng.integers(0, 256, size)
+    r = rng.integers(0, 256, size)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = (1.664 * b) / (0.953 * r) - 1
+    values[rng.random(size) < 0.01] = np.nan
+    return values
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'plot pixels':<13}{'np.nan* ms':>11}{'kernel ms':>11}{'speedup':>9}")
+    for size in plot_sizes:
+        samples = [plot_values(size, rng) for _ in range(repeats)]
+        t0 = time.perf_counter()
+        for m in samples:
+            nan_calls(m)
+        slow_ms = (time.perf_counter() - t0) * 1000 / repeats
+        t0 = time.perf_counter()
+        for m in samples:
+            kernel(m)
+        fast_ms = (time.perf_counter() - t0) * 1000 / repeats
+        print(f"{size:<13}{slow_ms:>11.2f}{fast_ms:>11.2f}{slow_ms / fast_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Label-image plot statistics vs. a reference per-polygon implementation (fillPoly + bitwise_and + np.nan*
+# per plot, one fresh mask per plot): cost as the plots per frame grow (agreement: tests/test_plot_labels.py)
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_plot_labels.py
+
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.plot_labels import grid_layout, plot_groups
+from Helpers.vi_extractor import compute_ndvi, extract_plot_stats, histogram_specs, stat_header, stereo_crop
+
+repeats = 5
+
+
+def reference_stats(ndvi: np.ndarray, polygons: list, names: list) -> dict:
+    """Per-polygon extraction of the original script, with a fresh mask per plot"""
+    nd = []
+    for pl in polygons:
+        blank = np.zeros(ndvi.shape[:2], dtype='uint8')
+        pl_m = cv2.fillPoly(blank, np.array([pl]), 255)
+        m = cv2.bitwise_and(ndvi, ndvi, mask=pl_m)
+        m[m <= 0] = np.nan
+        data = ["t", round(np.nanmean(m), 5), round(np.nanmedian(m), 5), round(np.nanstd(m), 5),
+                round(np.nanmax(m), 5), round(np.nanpercentile(m, 95), 5), round(np.nanpercentile(m, 90), 5),
+                round(np.nanpercentile(m, 85), 5)]
+        nd.append(dict(zip(stat_header, data)))
+    return dict(zip(names, nd))
+
+
+def main():
+    top, bottom, left, right = stereo_crop
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frame = synthetic_field_frame((2560, 1248), np.random.default_rng(0))
+        ndvi = compute_ndvi(frame[top:bottom, left:right])
+        print(f"{'plots':<8}{'reference ms':>14}{'label first ms':>16}{'label cached ms':>17}{'+ histogram ms':>16}")
+        for count in (4, 40, 160):
+            polygons, names = grid_layout(count, ndvi.shape)
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                reference_stats(ndvi, polygons, names)
+            reference_ms = (time.perf_counter() - t0) * 1000 / repeats
+            t0 = time.perf_counter()
+            extract_plot_stats(ndvi, "t", polygons, names)  # Rasterizes the layout
+            first_ms = (time.perf_counter() - t0) * 1000
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                extract_plot_stats(ndvi, "t", polygons, names)
+            cached_ms = (time.perf_counter() - t0) * 1000 / repeats
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                extract_plot_stats(ndvi, "t", polygons, names, histogram_specs["ndvi"])
+            histogram_ms = (time.perf_counter() - t0) * 1000 / repeats
+            pixels = len(plot_groups(polygons, ndvi.shape).index)
+            print(f"{count:<8}{reference_ms:>14.1f}{first_ms:>16.1f}{cached_ms:>17.1f}{histogram_ms:>16.1f}"
+                  f"   ({pixels} plot pixels)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Plot layout files with a compiled mask cache: startup cost of rasterizing a layout vs. loading its cached masks,
+# and several layouts extracted from one frame (cache and results are checked in tests/test_plot_layouts.py)
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_plot_layouts.py
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DataStructures.plot_layout import PlotLayout
+from Helpers.camera import synthetic_field_frame
+from Helpers.plot_labels import PlotGroups, grid_layout
+from Helpers.plot_layouts import MaskCache, load_layouts
+from Helpers.vi_extractor import extract_layouts, layout_file, prepare_crop
+
+repeats = 5
+
+
+def main():
+    layout = load_layouts(layout_file)[0]
+    frame = synthetic_field_frame((2560, 1248), np.random.default_rng(0))
+    img = prepare_crop(frame, layout.crop)
+    shape = img.shape[:2]
+
+    with tempfile.TemporaryDirectory() as folder:
+        print(f"{'plots':<8}{'rasterize ms':>14}{'cache load ms':>15}{'file kB':>9}")
+        for count in (4, 40, 160):
+            polygons, names = grid_layout(count, shape) if count != len(layout.plot_ids) else \
+                (layout.polygons, layout.plot_ids)
+            trial = PlotLayout(f"grid{count}", layout.crop, names, polygons, layout.sensor)
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                PlotGroups(trial.polygons, shape)
+            rasterize_ms = (time.perf_counter() - t0) * 1000 / repeats
+            MaskCache(folder).groups(trial, shape)  # Compiles and stores the masks
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                MaskCache(folder).groups(trial, shape)  # A fresh cache, like a new run on the Pi
+            load_ms = (time.perf_counter() - t0) * 1000 / repeats
+            size_kb = os.path.getsize(MaskCache(folder).path(trial, shape)) / 1024
+            print(f"{count:<8}{rasterize_ms:>14.1f}{load_ms:>15.1f}{size_kb:>9.0f}")
+
+        print()
+        polygons, names = grid_layout(40, shape)
+        second = PlotLayout("grid40", layout.crop, names, polygons, layout.sensor)
+        masks = MaskCache(folder)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            extract_layouts(frame, "t", [layout, second], masks)  # Compiles the second layout's masks
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                extract_layouts(frame, "t", [layout, second], masks)
+            together_ms = (time.perf_counter() - t0) * 1000 / repeats
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                extract_layouts(frame, "t", [layout], masks)
+                extract_layouts(frame, "t", [second], masks)
+            apart_ms = (time.perf_counter() - t0) * 1000 / repeats
+        print(f"Two layouts per frame: {together_ms:.1f} ms together, {apart_ms:.1f} ms one at a time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Frame-quality gate: verdicts on synthetic frames degraded by blur, exposure errors and fog, and its cost as a
+# fraction of a full extraction, scoring either the decoded frame or a reduced-resolution JPEG decode; a PNG archive
+# has no reduced decode, so its frame is decoded once and shared by the gate and the extraction
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_quality_gate.py
+
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.quality_gate import QualityGate
+from Helpers.vi_engine import VIEngine, vi_names
+from Helpers.vi_extractor import compute_ndvi, extract_indices, extract_plot_stats, prepare_crop, read_frame, \
+    stereo_crop
+
+repeats = 10
+degradations = {"clean": lambda f: f,
+                "slight blur": lambda f: cv2.GaussianBlur(f, (0, 0), 3),
+                "heavy blur": lambda f: cv2.GaussianBlur(f, (0, 0), 8),
+                "overexposed": lambda f: np.clip(f.astype(np.int16) * 3, 0, 255).astype(np.uint8),
+                "near darkness": lambda f: (f * 0.05).astype(np.uint8),
+                "light haze": lambda f: (f * 0.7 + 60).astype(np.uint8),
+                "fog": lambda f: (f * 0.35 + 130).astype(np.uint8)}
+
+
+def extract(frame, engine: VIEngine) -> None:
+    """Decode, crop, ndvi and every index of one frame, as 2_extract_ndvi.py does"""
+    img = prepare_crop(read_frame(frame))
+    extract_plot_stats(compute_ndvi(img), "t")
+    extract_indices(img, "t", engine)
+
+
+def gate_and_extract(gate: QualityGate, path: str, engine: VIEngine) -> None:
+    """A PNG frame decoded once, scored and extracted from the same array, as 2_extract_ndvi.py does"""
+    frame = read_frame(path)
+    if gate.check(frame, stereo_crop)["passed"]:
+        extract(frame, engine)
+
+
+def main():
+    gate = QualityGate()
+    frame = synthetic_field_frame((2560, 1248), np.random.default_rng(0))
+    print(f"{'frame':<16}{'verdict':<10}{'sharpness':>10}{'brightness':>11}{'haze':>7}{'saturation':>11}  reasons")
+    for name, degrade in degradations.items():
+        report = gate.check(degrade(frame), stereo_crop)
+        print(f"{name:<16}{'pass' if report['passed'] else 'reject':<10}{report['sharpness']:>10.3f}"
+              f"{report['brightness']:>11.3f}{report['haze']:>7.3f}{report['saturation']:>11.3f}  "
+              f"{', '.join(report['reasons'])}")
+
+    engine = VIEngine(vi_names)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "frame.jpg")
+        cv2.imwrite(path, frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        png = os.path.join(folder, "frame.png")
+        cv2.imwrite(png, frame, [cv2.IMWRITE_PNG_COMPRESSION, 3])  # The default archive format
+        timings = {}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for label, run in [("full extraction", lambda: extract(path, engine)),
+                               ("gate, decoded frame", lambda: gate.check(frame, stereo_crop)),
+                               ("gate, reduced decode", lambda: gate.check(path, stereo_crop)),
+                               ("PNG extraction", lambda: extract(png, engine)),
+                               ("PNG gate, extra decode", lambda: gate.check(png, stereo_crop)),
+                               ("PNG gate + extraction", lambda: gate_and_extract(gate, png, engine))]:
+                t0 = time.perf_counter()
+                for _ in range(repeats):
+                    run()
+                timings[label] = (time.perf_counter() - t0) * 1000 / repeats
+    print(f"\n{'step':<24}{'ms per frame':>14}{'of extraction':>15}")
+    for label, ms in timings.items():
+        extraction = timings["PNG extraction" if label.startswith("PNG") else "full extraction"]
+        print(f"{label:<24}{ms:>14.2f}{ms / extraction * 100:>14.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# RGB -> NoIR co-registration on a synthetic rotated pair: calibration cost, and the per-frame cost of a cached
+# remap vs. estimating the warp on every frame (the warp accuracy is checked in tests/test_registration.py)
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_registration.py
+
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.registration import RemapCache, apply_remap, calibrate_pair, estimate_homography
+
+size = (1640, 1232)
+
+
+def textured_scene(rng: np.random.Generator) -> np.ndarray:
+    """Blurred random texture with enough corners for feature matching"""
+    noise = rng.integers(0, 256, size=(size[1] // 8, size[0] // 8), dtype=np.uint8)
+    grey = cv2.GaussianBlur(cv2.resize(noise, size, interpolation=cv2.INTER_CUBIC), (5, 5), 0)
+    return cv2.merge([grey, (grey * 0.8).astype(np.uint8), (255 - grey)])
+
+
+def known_warp(angle: float, shift: tuple) -> np.ndarray:
+    rotation = cv2.getRotationMatrix2D((size[0] / 2, size[1] / 2), angle, 1.0)
+    rotation[:, 2] += shift
+    return np.vstack([rotation, [0, 0, 1]])
+
+
+def main():
+    rng = np.random.default_rng(0)
+    rgb = textured_scene(rng)
+    with tempfile.TemporaryDirectory() as folder:
+        cache = RemapCache(folder)
+        nir = cv2.warpPerspective(rgb, known_warp(-2.0, (25, 14)), size)
+        t0 = time.perf_counter()
+        calibrate_pair(rgb, nir, "rgb_to_nir", cache)
+        calibrate_ms = (time.perf_counter() - t0) * 1000
+        maps = cache.load("rgb_to_nir", size)
+        t0 = time.perf_counter()
+        for _ in range(10):
+            apply_remap(rgb, maps)
+        remap_ms = (time.perf_counter() - t0) * 100
+        t0 = time.perf_counter()
+        for _ in range(3):
+            cv2.warpPerspective(rgb, estimate_homography(rgb, nir), size)
+        estimate_ms = (time.perf_counter() - t0) * 1000 / 3
+    print(f"Calibration at {size[0]}x{size[1]}: {calibrate_ms:.0f} ms once; per frame: cached remap "
+          f"{remap_ms:.1f} ms, estimate + warp {estimate_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Vegetation/soil segmentation: canopy cover and vegetation-only ndvi against the known crop rows of synthetic
+# frames, and the added cost per frame over the current extraction (ndvi plus every index). The synthetic frames are
+# NoIR views, where excess green separates canopy poorly; it is meant for RGB frames
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_segmentation.py
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.plot_labels import grouped_stats, plot_groups
+from Helpers.segmentation import Segmenter
+from Helpers.vi_engine import VIEngine, vi_names
+from Helpers.vi_extractor import compute_ndvi, extract_indices, extract_plot_stats, plot_polygons, prepare_crop, \
+    segment_frame, stereo_crop
+
+repeats = 5
+resolution = (2560, 1248)
+
+
+def crop_rows() -> np.ndarray:
+    """Crop-row columns of synthetic_field_frame inside the crop window"""
+    columns = np.arange(resolution[0]) // (resolution[0] // 16) % 2 == 1
+    return columns[stereo_crop[2]:stereo_crop[3]]
+
+
+def main():
+    engine = VIEngine(vi_names)
+    segmenters = {"otsu": Segmenter("otsu"), "fixed 1.5": Segmenter("fixed", 1.5), "exg": Segmenter("exg")}
+    frames = [prepare_crop(synthetic_field_frame(resolution, np.random.default_rng(seed))) for seed in range(3)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ndvi = compute_ndvi(frames[0])
+        groups = plot_groups(plot_polygons, ndvi.shape)
+        truth = groups.gather(np.broadcast_to(crop_rows(), ndvi.shape))
+        exact = grouped_stats(groups.gather(ndvi), groups.plot_ids, groups.count, vegetation=truth)
+        plain = extract_plot_stats(ndvi, "t")
+        print(f"{'method':<12}{'threshold':>10}{'cover error':>13}{'mean error':>12}   (no segmentation: mean error "
+              f"{max(abs(plain[name]['mean'] - exact['mean'][plot]) for plot, name in enumerate(plain)):.3f})")
+        for name, segmenter in segmenters.items():
+            segmentation = segment_frame(ndvi, frames[0], segmenter)
+            stats = extract_plot_stats(ndvi, "t", segmentation=segmentation)
+            cover_error = max(abs(plot["cover"] - exact["cover"][i]) for i, plot in enumerate(stats.values()))
+            mean_error = max(abs(plot["mean"] - exact["mean"][i]) for i, plot in enumerate(stats.values()))
+            print(f"{name:<12}{segmentation[1]:>10.3f}{cover_error:>13.4f}{mean_error:>12.4f}")
+
+        print(f"\n{'method':<12}{'ms per frame':>14}{'added':>9}")
+        baseline = None
+        for name, segmenter in [("none", None)] + list(segmenters.items()):
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                for img in frames:
+                    ndvi = compute_ndvi(img)
+                    segmentation = segment_frame(ndvi, img, segmenter) if segmenter else None
+                    extract_plot_stats(ndvi, "t", segmentation=segmentation)
+                    extract_indices(img, "t", engine, segmentation=segmentation)
+            ms = (time.perf_counter() - t0) * 1000 / (repeats * len(frames))
+            baseline = baseline or ms
+            print(f"{name:<12}{ms:>14.1f}{(ms / baseline - 1) * 100:>8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# AE/AWB settle time: fixed sleep vs. convergence polling, cold and from the exposure cache, on synthetic cameras
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_settle.py
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.camera import FakeCamera
+from Helpers.exposure_cache import ExposureCache, settle_cameras
+
+fixed_settle_ms = 2000  # time.sleep(2) of the capture scripts
+sessions = 4
+
+
+def session(cache: ExposureCache, when: datetime) -> dict:
+    cameras = {"rgb": FakeCamera(0, (320, 240), 0.0), "nir": FakeCamera(1, (320, 240), 0.0)}
+    for camera in cameras.values():
+        camera.start()
+    report = settle_cameras(cameras, cache, when, timeout=fixed_settle_ms / 1000)
+    for camera in cameras.values():
+        camera.stop()
+    return report
+
+
+def main():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ExposureCache(os.path.join(cache_dir, "exposure_cache.json"))
+        print(f"Fixed sleep: {fixed_settle_ms} ms per session")
+        for i in range(sessions):
+            report = session(ExposureCache(cache.path), datetime.now())
+            settle_ms = max(r["settle_ms"] for r in report.values())
+            print(f"Session {i + 1}: from cache {report['rgb']['from_cache']!s:>5}, "
+                  f"converged {all(r['converged'] for r in report.values())!s:>5}, settle {settle_ms:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Tiled vs. untiled ndvi extraction on a Camera V2 full resolution frame: the peak memory (RSS and tracemalloc)
+# of each mode, measured in a fresh process (tiled results are checked in tests/test_tiled_extraction.py)
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_tiled_extraction.py
+
+import ctypes
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.plot_labels import grid_layout
+from Helpers.vi_extractor import extract_ndvi
+
+resolution = (3280, 2464)
+crop = (0, resolution[1], 0, resolution[0])  # The whole frame, plots spread over all of it
+budgets = [None, 64 * 1024 ** 2, 16 * 1024 ** 2, 8 * 1024 ** 2, 6 * 1024 ** 2]
+
+
+def read_status(field: str) -> int:
+    """Current (VmRSS) or peak (VmHWM) resident memory of this process in bytes, 0 where /proc is missing"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def reset_peak() -> None:
+    """Returns freed heap memory to the OS and restarts the VmHWM peak at the current RSS (Linux)"""
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except OSError:
+        pass
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def measure(budget, queue) -> None:
+    frame = synthetic_field_frame(resolution, np.random.default_rng(0))
+    polygons, names = grid_layout(40, (crop[1], crop[3]))
+    extract_ndvi(frame, "t", crop, polygons, names, memory_budget=budget)  # Builds the cached plot layout
+    reset_peak()
+    before = read_status("VmRSS")
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        extract_ndvi(frame, "t", crop, polygons, names, memory_budget=budget)
+    seconds = time.perf_counter() - t0
+    _, traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    queue.put((seconds, traced, read_status("VmHWM") - before))
+
+
+def main():
+    context = multiprocessing.get_context("fork")
+    print(f"{resolution[0]}x{resolution[1]} frame, 40 plots")
+    print(f"{'mode':<18}{'ms':>8}{'peak RSS MB':>13}{'traced MB':>11}  (memory above the loaded frame)")
+    for budget in budgets:
+        queue = context.Queue()
+        process = context.Process(target=measure, args=(budget, queue))
+        process.start()
+        seconds, traced, rss = queue.get()
+        process.join()
+        mode = "untiled" if budget is None else f"tiled {budget / 1024 ** 2:g} MB"
+        print(f"{mode:<18}{seconds * 1000:>8.0f}{rss / 1024 ** 2:>13.1f}{traced / 1024 ** 2:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Compact result payloads and the store-and-forward upload queue: bytes per session of every encoding, and
+# throughput of the batched uploader against a local HTTP receiver that is down for the first requests (round trips
+# and delivery are checked in tests/test_upload_queue.py)
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_upload_queue.py
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.result_codec import decode_payload, encode_payload, fold_tables, msgpack
+from Helpers.upload_queue import UploadQueue, Uploader, unpack_batch
+from Helpers.vi_extractor import compute_ndvi, extract_indices, extract_plot_stats, prepare_crop
+
+sessions = 100
+outage_requests = 3  # Requests refused before the link comes back
+
+
+class Receiver(BaseHTTPRequestHandler):
+    """Stand-in for the server endpoint: decodes every batch, answers 503 while the link is 'down'"""
+    received = {}  # (sensor, record id) -> (kind, payload)
+    refuse = 0
+    requests = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        Receiver.requests += 1
+        if Receiver.refuse > 0:
+            Receiver.refuse -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        for record_id, kind, data in unpack_batch(body):
+            Receiver.received[(self.headers["X-Sensor"], record_id)] = (kind, decode_payload(data))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def session_payloads() -> tuple:
+    """The ndvi.json and vi.json content of one hourly session of five frames"""
+    ndvi, vi = {}, {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for rep in range(5):
+            img = prepare_crop(synthetic_field_frame((2560, 1248), np.random.default_rng(rep)))
+            ndvi[f"rep{rep + 1}"] = extract_plot_stats(compute_ndvi(img), "15-05-2026_12-00-00")
+            vi[f"rep{rep + 1}"] = extract_indices(img, "15-05-2026_12-00-00")
+    ndvi["drift"] = [{"drift": 0.4, "maintenance": False} for _ in range(5)]
+    return ndvi, vi
+
+
+def main():
+    ndvi, vi = session_payloads()
+    print(f"{'encoding':<28}{'ndvi.json B':>13}{'vi.json B':>12}")
+    encodings = [("json indent=6", lambda p: json.dumps(p, indent=6).encode()),
+                 ("json compact", lambda p: json.dumps(p, separators=(",", ":")).encode()),
+                 ("json compact, folded", lambda p: json.dumps(fold_tables(p), separators=(",", ":")).encode()),
+                 ("json folded + zlib", lambda p: encode_payload(p, use_msgpack=False))]
+    if msgpack is not None:
+        encodings.append(("msgpack folded + zlib", encode_payload))
+    for name, encode in encodings:
+        print(f"{name:<28}{len(encode(ndvi)):>13}{len(encode(vi)):>12}")
+    if msgpack is None:
+        print("msgpack not installed, JSON fallback used")
+    session = len(encode_payload(ndvi))
+    print(f"Session upload: {session} B by default, {session + len(encode_payload(vi))} B with upload_vi, against "
+          f"{len(json.dumps(ndvi, indent=6))} B of ndvi.json with indent=6")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Receiver)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/agicam"
+    with tempfile.TemporaryDirectory() as folder:
+        queue = UploadQueue(os.path.join(folder, "queue.sqlite"))
+        t0 = time.perf_counter()
+        for _ in range(sessions):
+            queue.put("ndvi", ndvi)
+            queue.put("vi", vi)
+        put_ms = (time.perf_counter() - t0) * 1000 / (2 * sessions)
+        print(f"\n{2 * sessions} records queued, {queue.queued_bytes() / 1024:.0f} kB, {put_ms:.2f} ms per put")
+
+        Receiver.refuse = outage_requests
+        uploader = Uploader(queue, url, "bench", batch_size=50, base_delay=0.05, max_delay=1.0)
+        t0 = time.perf_counter()
+        while not uploader.drain():
+            time.sleep(max(0.0, uploader.next_attempt - time.monotonic()))
+        seconds = time.perf_counter() - t0
+        queue.close()
+    server.shutdown()
+
+    print(f"Uploaded {uploader.stats['records']} records in {uploader.stats['batches']} batches after "
+          f"{uploader.stats['failures']} refused requests: {seconds:.2f} s, "
+          f"{uploader.stats['records'] / seconds:.0f} records/s, {uploader.stats['bytes'] / seconds / 1024:.0f} kB/s")
+    print(f"Bytes per session on the wire: {uploader.stats['bytes'] / sessions:.0f}")
+
+
+if __name__ == "__main__":
+    main()
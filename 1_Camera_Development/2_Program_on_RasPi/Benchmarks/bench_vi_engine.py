@@ -0,0 +1,65 @@
+# Vegetation index engine vs. the per-index float64 path (cv2.split copies, one formula at a time); the engine's
+# values are checked against the float64 formulas in tests/test_vi_engine.py
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_vi_engine.py
+
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.vi_engine import VIEngine, nir_gain, red_gain, vi_names
+from Helpers.vi_extractor import stereo_crop
+
+repeats = 5
+
+
+def per_index(img: np.ndarray, name: str) -> np.ndarray:
+    """The way compute_ndvi works, extended to every index: split, cast to float64, evaluate"""
+    b, g, r = cv2.split(img)
+    nir = nir_gain * b.astype(float) / 255
+    red = red_gain * r.astype(float) / 255
+    green = g.astype(float) / 255
+    b, g = b.astype(float), g.astype(float)
+    formulas = {"ndvi": lambda: nir / red - 1,
+                "sr": lambda: nir / red,
+                "gndvi": lambda: (nir - green) / (nir + green),
+                "gndvi0": lambda: (b - g) / (b + g),
+                "cigreen": lambda: nir / green - 1,
+                "cigreen0": lambda: b / g - 1,
+                "evi2": lambda: 2.5 * (nir - red) / (nir + 2.4 * red + 1),
+                "rdvi": lambda: (nir - red) / np.sqrt(nir + red),
+                "savi": lambda: 1.5 * (nir - red) / (nir + red + 0.5)}
+    return formulas[name]()
+
+
+def timed(function) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - t0) * 1000 / repeats
+
+
+def main():
+    top, bottom, left, right = stereo_crop
+    img = synthetic_field_frame((2560, 1248), np.random.default_rng(0))[top:bottom, left:right]
+    print(f"Crop {img.shape[1]}x{img.shape[0]}, {repeats} repeats")
+    print(f"{'indices':<10}{'per-index ms':>14}{'engine ms':>11}{'speedup':>9}")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for names in (["ndvi"], ["ndvi", "gndvi", "savi"], vi_names):
+            engine = VIEngine(names)
+            slow_ms = timed(lambda: [per_index(img, name) for name in names])
+            fast_ms = timed(lambda: engine.cube(img))
+            print(f"{len(names):<10}{slow_ms:>14.1f}{fast_ms:>11.1f}{slow_ms / fast_ms:>8.1f}x")
+
+        engine = VIEngine(vi_names, block_rows=img.shape[0])
+        print(f"All indices without strips (whole-crop intermediates): {timed(lambda: engine.cube(img)):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Lookup-table vs. arithmetic index computation at Pi camera resolutions (the lookups are checked against the
+# arithmetic paths in tests/test_vi_lut.py)
+# Run from 2_Program_on_RasPi:  python3 Benchmarks/bench_vi_lut.py
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Helpers and DataStructures are imported from 2_Program_on_RasPi, also when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Benchmarks.bench_vi_engine import per_index
+from Helpers.camera import synthetic_field_frame
+from Helpers.vi_engine import VIEngine, vi_names
+from Helpers.vi_extractor import compute_ndvi
+from Helpers.vi_lut import LUTEngine, lookup_ndvi, ndvi_table
+
+# Stereo crop of the side-by-side frame, one camera at half and at full sensor resolution
+resolutions = [(1216, 800), (1640, 1232), (3280, 2464)]
+repeats = 5
+
+
+def timed(function) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - t0) * 1000 / repeats
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        t0 = time.perf_counter()
+        lut = LUTEngine(vi_names, folder)
+        table = ndvi_table(folder)
+        build_ms = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        LUTEngine(vi_names, folder)
+        ndvi_table(folder)
+        load_ms = (time.perf_counter() - t0) * 1000
+    print(f"Tables for {len(vi_names)} indices + float64 ndvi: built in {build_ms:.0f} ms, "
+          f"loaded from the disk cache in {load_ms:.0f} ms")
+    engine = VIEngine(vi_names)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for resolution in resolutions:
+            img = synthetic_field_frame(resolution, np.random.default_rng(0))
+            print(f"\n{resolution[0]}x{resolution[1]}")
+            float64_ms = timed(lambda: [per_index(img, name) for name in vi_names])
+            engine_ms = timed(lambda: engine.cube(img))
+            lut_ms = timed(lambda: lut.cube(img))
+            print(f"  all indices: float64 per index {float64_ms:7.1f} ms, float32 engine {engine_ms:6.1f} ms, "
+                  f"LUT {lut_ms:6.1f} ms")
+            ndvi_ms = timed(lambda: compute_ndvi(img))
+            lookup_ms = timed(lambda: lookup_ndvi(img, table))
+            print(f"  ndvi (float64): arithmetic {ndvi_ms:6.1f} ms, LUT {lookup_ms:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
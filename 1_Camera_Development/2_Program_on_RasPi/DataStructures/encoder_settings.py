@@ -0,0 +1,19 @@
+class EncoderSettings:
+    """
+    Image format and its tuning for one output (archive or upload copy) of one sensor
+    """
+    def __init__(self, format: str = "png", quality: int = 90, compression: int = 3):
+        self.format: str = format  # "png", "jpeg", "webp" or "npy"
+        self.quality: int = quality  # jpeg 0-100, webp 1-100 (above 100 is lossless)
+        self.compression: int = compression  # png zlib level 0-9
+
+    def __repr__(self):
+        return f"EncoderSettings(format={self.format}, quality={self.quality}, compression={self.compression})"
+
+    @classmethod
+    def from_dict(cls, values: dict):
+        """
+        :param values: dict - {"format": ..., "quality": ..., "compression": ...}, missing keys take defaults
+        :return: EncoderSettings - Settings object
+        """
+        return cls(**values)
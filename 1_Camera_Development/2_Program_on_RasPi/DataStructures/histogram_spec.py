@@ -0,0 +1,53 @@
+import numpy as np
+
+
+class HistogramSpec:
+    """
+    Fixed bins of one vegetation index: bins equal bins over [low, high) plus one overflow bin for values >= high
+    """
+    def __init__(self, low: float, high: float, bins: int = 128):
+        self.low: float = low
+        self.high: float = high
+        self.bins: int = bins
+
+    def __repr__(self):
+        return f"HistogramSpec(low={self.low}, high={self.high}, bins={self.bins})"
+
+    def bin_of(self, values: np.ndarray) -> np.ndarray:
+        """
+        :param values: np.ndarray - Index values, values below low are counted in the first bin
+        :return: np.ndarray - int64 bin of every value, bins for the overflow bin
+        """
+        position = (values - self.low) * (self.bins / (self.high - self.low))
+        return np.clip(position, 0, self.bins).astype(np.int64)
+
+    def to_dict(self, counts: np.ndarray) -> dict:
+        """
+        :param counts: np.ndarray - bins + 1 counts, overflow last
+        :return: dict - {"low", "high", "counts"} as stored per plot in the output json
+        """
+        return {"low": self.low, "high": self.high, "counts": [int(count) for count in counts]}
+
+    def percentile(self, counts: np.ndarray, percentile: float) -> float:
+        """
+        Estimates a percentile assuming the values are spread evenly inside each bin; the error is at most one bin
+        width, and a percentile falling into the overflow bin is reported as the upper edge. The same estimate as
+        histogram_percentile of the analysis code (4_Data_Analysis/.../Helpers/histogram_stats.py)
+        :param counts: np.ndarray - bins + 1 counts, overflow last
+        :param percentile: float - Percentile in 0-100
+        :return: float - Estimated value, NaN when the counts are all zero
+        """
+        cumulative = np.cumsum(counts)
+        total = cumulative[-1]
+        if total == 0:
+            return float("nan")
+        target = percentile / 100 * total
+        # The first bin whose pixels pass the target, so empty bins are never chosen: p0 is the lower edge of the
+        # first non-empty bin, not low; p100 reaches the end of the last non-empty bin
+        index = int(np.searchsorted(cumulative, target, side="right"))
+        if index == len(cumulative):
+            index = int(np.searchsorted(cumulative, target))
+        if index >= self.bins:
+            return self.high
+        before = cumulative[index - 1] if index > 0 else 0
+        return float(self.low + (index + (target - before) / counts[index]) * (self.high - self.low) / self.bins)
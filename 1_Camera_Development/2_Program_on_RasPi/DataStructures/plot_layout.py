@@ -0,0 +1,57 @@
+import hashlib
+import json
+
+
+class PlotLayout:
+    """
+    Plot polygons, plot IDs and crop window of one trial seen by one sensor
+    """
+    def __init__(self, name: str, crop: tuple, plot_ids: list, polygons: list, sensor: str = "", version: int = 1):
+        if len(plot_ids) != len(polygons):
+            raise ValueError(f"Layout {name} has {len(plot_ids)} plot IDs for {len(polygons)} polygons")
+        self.name: str = name
+        self.crop: tuple = tuple(crop)  # (top, bottom, left, right) in the full frame
+        self.plot_ids: list = list(plot_ids)
+        self.polygons: list = [[tuple(point) for point in polygon] for polygon in polygons]
+        self.sensor: str = sensor
+        self.version: int = version
+
+    def __repr__(self):
+        return (f"PlotLayout(name={self.name}, sensor={self.sensor}, version={self.version}, crop={self.crop}, "
+                f"plots={len(self.plot_ids)}, digest={self.digest})")
+
+    @property
+    def digest(self) -> str:
+        """
+        :return: str - Hash of the crop, plot IDs and polygons; any change to them gives a new digest
+        """
+        content = json.dumps({"crop": self.crop, "plot_ids": self.plot_ids, "polygons": self.polygons},
+                             sort_keys=True)
+        return hashlib.sha1(content.encode()).hexdigest()[:16]
+
+    def scaled(self, factor: int):
+        """
+        :param factor: int - Downsampling factor of the crop, e.g. 2 for half resolution
+        :return: PlotLayout - The same plots on the crop reduced by factor, with its own digest
+        """
+        polygons = [[(round(x / factor), round(y / factor)) for x, y in polygon] for polygon in self.polygons]
+        return PlotLayout(self.name, self.crop, self.plot_ids, polygons, self.sensor, self.version)
+
+    @classmethod
+    def from_dict(cls, values: dict, sensor: str = "", version: int = 1):
+        """
+        :param values: dict - {"name": ..., "crop": [top, bottom, left, right], "plots": {plot ID: [[x, y], ...]}}
+        :param sensor: str - Sensor the layout belongs to
+        :param version: int - Version of the layout file
+        :return: PlotLayout - Layout object
+        """
+        return cls(values["name"], values["crop"], list(values["plots"]), list(values["plots"].values()), sensor,
+                   version)
+
+    def to_dict(self) -> dict:
+        """
+        :return: dict - The layout in the layout file format
+        """
+        return {"name": self.name, "crop": list(self.crop),
+                "plots": {plot_id: [list(point) for point in polygon]
+                          for plot_id, polygon in zip(self.plot_ids, self.polygons)}}
@@ -0,0 +1,126 @@
+import math
+
+import numpy as np
+
+from DataStructures.histogram_spec import HistogramSpec
+
+# Plot statistics are rounded to 5 decimals (see plot_dicts), so sums in units of 1e-5 are integers
+unit = 10 ** 5
+
+
+class PlotRollup:
+    """
+    Mergeable aggregate of one index over one plot across many frames, e.g. a day: pixel count, sum and sum of
+    squares as integers (in units of 1e-5 and 1e-10) rebuilt from the 5-decimal frame mean and std, min, max and
+    the fixed-bin histogram as percentile sketch. Adding and merging only add integers and take min/max, so the
+    same frames give the same aggregate in any order or grouping. The sums are those of the rounded frame
+    statistics, not of the pixels: the mean is within 0.5e-5 of the mean of all pixels, the std can differ from
+    the pixel std by a few 1e-5. Frames whose mean or std is not finite (a pixel with red = 0 makes the ndvi inf)
+    are counted under skipped and left out of the aggregate.
+    """
+    def __init__(self, low: float, high: float, counts: list, frames: int = 0, total: int = 0, squares: int = 0,
+                 minimum: float = math.inf, maximum: float = -math.inf, skipped: int = 0):
+        self.low: float = low
+        self.high: float = high
+        self.counts: np.ndarray = np.asarray(counts, dtype=np.int64)  # Histogram, overflow bin last
+        self.frames: int = frames  # Frames with valid pixels in this plot
+        self.total: int = total  # Sum of the pixel values, in units of 1 / unit
+        self.squares: int = squares  # Sum of the squared pixel values, in units of 1 / unit ** 2
+        self.minimum: float = minimum
+        self.maximum: float = maximum
+        self.skipped: int = skipped  # Frames left out since their statistics were not finite
+
+    def __repr__(self):
+        return (f"PlotRollup(frames={self.frames}, count={self.count}, mean={self.mean}, std={self.std}, "
+                f"skipped={self.skipped})")
+
+    @property
+    def count(self) -> int:
+        """
+        :return: int - Valid pixels counted
+        """
+        return int(self.counts.sum())
+
+    @property
+    def mean(self) -> float:
+        """
+        :return: float - Mean of all the pixels, NaN when empty
+        """
+        return self.total / (self.count * unit) if self.count else math.nan
+
+    @property
+    def std(self) -> float:
+        """
+        :return: float - Standard deviation of all the pixels, NaN when empty
+        """
+        count = self.count
+        return math.sqrt(count * self.squares - self.total ** 2) / (count * unit) if count else math.nan
+
+    @classmethod
+    def empty(cls, histogram: dict):
+        """
+        :param histogram: dict - {"low", "high", "counts"} of a plot, gives the bins
+        :return: PlotRollup - Aggregate of no frames with those bins
+        """
+        return cls(histogram["low"], histogram["high"], np.zeros(len(histogram["counts"]), dtype=np.int64))
+
+    def add(self, stats: dict) -> None:
+        """
+        Adds the pixels of one frame
+        :param stats: dict - Plot statistics of the frame with its "hist", as in vi.json
+        :return: None
+        """
+        hist = stats["hist"]
+        if (hist["low"], hist["high"], len(hist["counts"])) != (self.low, self.high, len(self.counts)):
+            raise ValueError(f"Cannot add a histogram over [{hist['low']}, {hist['high']}) to {self}: the bins differ")
+        n = sum(hist["counts"])
+        if n == 0:
+            return
+        if not (math.isfinite(stats["mean"]) and math.isfinite(stats["std"])):
+            self.skipped += 1
+            return
+        mean, std = round(stats["mean"] * unit), round(stats["std"] * unit)
+        self.counts += np.asarray(hist["counts"], dtype=np.int64)
+        self.frames += 1
+        self.total += mean * n
+        self.squares += (std * std + mean * mean) * n
+        self.minimum = min(self.minimum, stats.get("min", math.inf))  # Results extracted before "min" lack it
+        self.maximum = max(self.maximum, stats["max"])
+
+    def merge(self, other) -> None:
+        """
+        :param other: PlotRollup - Aggregate with the same bins, e.g. of other frames of the same day
+        :return: None
+        """
+        if (other.low, other.high, len(other.counts)) != (self.low, self.high, len(self.counts)):
+            raise ValueError(f"Cannot merge {other} into {self}: the bins differ")
+        self.counts += other.counts
+        self.frames += other.frames
+        self.total += other.total
+        self.squares += other.squares
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.skipped += other.skipped
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Estimates a percentile from the histogram, see HistogramSpec.percentile
+        :param percentile: float - Percentile in 0-100
+        :return: float - Estimated value, NaN when empty
+        """
+        return HistogramSpec(self.low, self.high, len(self.counts) - 1).percentile(self.counts, percentile)
+
+    def summary(self, percentiles: list = (50, 85, 90, 95)) -> dict:
+        """
+        :param percentiles: list[float] - Percentiles to estimate from the histogram
+        :return: dict - Daily values sent instead of the frames: "frames", "count", "mean", "std", "min", "max",
+                        "p<q>", the "hist" in the vi.json format and the "skipped" frames
+        """
+        summary = {"frames": self.frames, "count": self.count, "mean": round(self.mean, 5),
+                   "std": round(self.std, 5), "min": self.minimum if math.isfinite(self.minimum) else None,
+                   "max": self.maximum if math.isfinite(self.maximum) else None}
+        for q in percentiles:
+            summary[f"p{q}"] = round(self.percentile(q), 5)
+        summary["hist"] = {"low": self.low, "high": self.high, "counts": [int(count) for count in self.counts]}
+        summary["skipped"] = self.skipped
+        return summary
@@ -0,0 +1,27 @@
+class QualityLimits:
+    """
+    Acceptance limits of the frame-quality gate, all on the downsampled crop with values scaled to 0-1
+    """
+    def __init__(self, min_brightness: float = 0.08, max_brightness: float = 0.85, max_clipped: float = 0.05,
+                 max_dark: float = 0.25, min_sharpness: float = 0.08, max_haze: float = 0.55,
+                 min_saturation: float = 0.15):
+        self.min_brightness: float = min_brightness  # Mean grey level, below is near darkness
+        self.max_brightness: float = max_brightness  # Mean grey level, above is overexposed
+        self.max_clipped: float = max_clipped  # Share of pixels with a channel at 250 or more
+        self.max_dark: float = max_dark  # Share of pixels with a grey level of 5 or less
+        self.min_sharpness: float = min_sharpness  # Laplacian variance over grey variance, below is blurred
+        self.max_haze: float = max_haze  # Mean dark channel (local minimum over channels), fog and haze raise it
+        self.min_saturation: float = min_saturation  # Mean (max - min) / max over channels, fog lowers it
+
+    def __repr__(self):
+        return (f"QualityLimits(brightness={self.min_brightness}-{self.max_brightness}, "
+                f"max_clipped={self.max_clipped}, max_dark={self.max_dark}, min_sharpness={self.min_sharpness}, "
+                f"max_haze={self.max_haze}, min_saturation={self.min_saturation})")
+
+    @classmethod
+    def from_dict(cls, values: dict):
+        """
+        :param values: dict - Limits by attribute name, missing keys take defaults
+        :return: QualityLimits - Limits object
+        """
+        return cls(**values)
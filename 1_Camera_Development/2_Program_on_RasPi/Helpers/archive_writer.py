@@ -0,0 +1,68 @@
+import os
+import queue
+import threading
+
+import cv2
+
+from Helpers.encoders import write_frame
+
+
+class ArchiveWriter:
+    """
+    Background thread that encodes frames to disk so the capture and extraction path never waits on it
+    """
+    def __init__(self, max_pending: int = 8):
+        self.pending: queue.Queue = queue.Queue(maxsize=max_pending)  # Bounds the frames held in memory
+        self.written: int = 0
+        self.errors: list = []
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def __repr__(self):
+        return f"ArchiveWriter(pending={self.pending.qsize()}, written={self.written}, errors={len(self.errors)})"
+
+    def submit(self, path: str, frame, on_written=None, settings=None) -> None:
+        """
+        Queues one frame for writing; blocks only when max_pending frames are already waiting
+        :param path: str - Output file path, the extension selects the encoding unless settings are given
+        :param frame: np.ndarray - BGR frame, must not be modified after submitting
+        :param on_written: Optional callable (path) run by the writer thread once the file is on disk
+        :param settings: EncoderSettings - Format and tuning to encode with
+        :return: None
+        """
+        self.pending.put((path, frame, on_written, settings))
+
+    def _run(self) -> None:
+        while True:
+            item = self.pending.get()
+            if item is None:
+                self.pending.task_done()
+                return
+            path, frame, on_written, settings = item
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if settings is not None:
+                    path = write_frame(path, frame, settings)
+                elif not cv2.imwrite(path, frame):
+                    raise IOError(f"Could not write {path}")
+                self.written += 1
+                if on_written is not None:
+                    on_written(path)
+            except Exception as e:  # Archiving is best effort, the extracted results are already out
+                self.errors.append((path, str(e)))
+            self.pending.task_done()
+
+    def flush(self) -> None:
+        """
+        Waits until every queued frame is written
+        :return: None
+        """
+        self.pending.join()
+
+    def close(self) -> None:
+        """
+        Writes the remaining frames and stops the thread
+        :return: None
+        """
+        self.pending.put(None)
+        self.thread.join()
@@ -0,0 +1,204 @@
+import csv
+import os
+import re
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+from Helpers.encoders import extensions
+from Helpers.vi_engine import vi_names
+from Helpers.plot_layouts import load_layouts
+from Helpers.vi_extractor import extract_indices, layout_file, nir_window, prepare_crop, stat_header
+from Helpers.vi_lut import LUTEngine
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet output is optional, CSV always works
+    pyarrow = None
+
+columns = ["sensor", "timestamp", "frame", "plot", "index"] + stat_header[1:]
+
+# Capture time in the file name: stereo archive "<dd-mm-YYYY_HH-MM-SS>_<n>.png", capture service
+# "<camera>/<YYYY-MM-DD>/<camera>_<HHMMSS>.<ext>"
+stereo_name = re.compile(r"(\d{2}-\d{2}-\d{4}_\d{2}-\d{2}-\d{2})")
+service_name = re.compile(r"(\d{4}-\d{2}-\d{2})[/\\][a-z]+_(\d{6})\.")
+
+
+def frame_timestamp(path: str) -> datetime:
+    """
+    :param path: str - Archived frame
+    :return: datetime - Capture time from the file name, or the file time when the name carries none
+    """
+    match = stereo_name.search(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), "%d-%m-%Y_%H-%M-%S")
+    match = service_name.search(path)
+    if match:
+        return datetime.strptime(match.group(1) + match.group(2), "%Y-%m-%d%H%M%S")
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def iter_archive(folder: str, camera: str = "stereo") -> list:
+    """
+    :param folder: str - Archive root, walked recursively
+    :param camera: str - "stereo" for side-by-side frames, "nir" for the capture service's NoIR folder
+    :return: list[str] - Frames to process in a stable order, paths relative to the archive root
+    """
+    image_types = tuple(extensions.values()) + (".jpeg",)
+    frames = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if not name.lower().endswith(image_types):
+                continue
+            if (name.startswith("nir_") if camera == "nir" else not name.startswith(("rgb_", "nir_"))):
+                frames.append(os.path.relpath(os.path.join(root, name), folder))
+    return sorted(frames)
+
+
+# Per worker process state, set by init_worker
+_worker = {}
+
+
+def init_worker(folder: str, sensor: str, camera: str, lut_folder: str, layout_path: str) -> None:
+    """
+    Loads the plot layout and the index tables once per worker process
+    :return: None
+    """
+    layout = load_layouts(layout_path)[0]
+    crop = layout.crop if camera == "stereo" else nir_window(layout.crop)
+    _worker.update(folder=folder, sensor=sensor, crop=crop, layout=layout, engine=LUTEngine(vi_names, lut_folder))
+
+
+def process_frame(frame: str) -> tuple:
+    """
+    Extracts every index of one archived frame; runs in a worker process
+    :param frame: str - Frame path relative to the archive root
+    :return: tuple - (frame, list of rows in the order of columns, error message or None)
+    """
+    try:
+        timestamp = frame_timestamp(os.path.join(_worker["folder"], frame)).isoformat()
+        img = prepare_crop(os.path.join(_worker["folder"], frame), _worker["crop"])
+        layout = _worker["layout"]
+        results = extract_indices(img, timestamp, _worker["engine"], layout.polygons, layout.plot_ids, histograms=False)
+    except Exception as e:  # A corrupt file must not stop a season long backfill
+        return frame, [], str(e)
+    rows = []
+    for index, plots in results.items():
+        for plot, stats in plots.items():
+            rows.append([_worker["sensor"], timestamp, frame, plot, index] + [stats[name] for name in stat_header[1:]])
+    return frame, rows, None
+
+
+class ResultWriter:
+    """
+    Writes backfill results as numbered part files (CSV, or Parquet when pyarrow is installed) and keeps a
+    progress log of the frames each part holds. A part is renamed into place before it is logged, and parts
+    missing from the log are removed on start, so an interrupted run resumes without losing or duplicating rows.
+    """
+    def __init__(self, folder: str, format: str = "csv"):
+        if format == "parquet" and pyarrow is None:
+            raise ValueError("Parquet output needs pyarrow, use --format csv or pip3 install pyarrow")
+        self.folder: str = folder
+        self.format: str = format
+        self.done: set = set()
+        self.parts: int = 0
+        os.makedirs(folder, exist_ok=True)
+        logged = set()
+        if os.path.exists(self.log_path):
+            with open(self.log_path) as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # Torn last line of an interrupted run, its part is dropped below
+                    part, *frames = line.rstrip("\n").split("\t")
+                    logged.add(part)
+                    self.done.update(frames)
+        for name in os.listdir(folder):
+            if name.startswith("part-"):
+                if name in logged:
+                    self.parts = max(self.parts, int(name[5:10]))
+                else:
+                    os.remove(os.path.join(folder, name))
+
+    def __repr__(self):
+        return f"ResultWriter(folder={self.folder}, format={self.format}, parts={self.parts}, done={len(self.done)})"
+
+    @property
+    def log_path(self) -> str:
+        """
+        :return: str - Progress log, one line per part: part name and the frames it holds, tab separated
+        """
+        return os.path.join(self.folder, "progress.tsv")
+
+    def write_part(self, rows: list, frames: list) -> None:
+        """
+        Writes one part and logs its frames as done
+        :param rows: list[list] - Result rows in the order of columns
+        :param frames: list[str] - Frames whose rows are in this part
+        :return: None
+        """
+        self.parts += 1
+        name = f"part-{self.parts:05d}.{self.format}"
+        tmp_path = os.path.join(self.folder, name + ".tmp")
+        if self.format == "parquet":
+            table = pyarrow.Table.from_pydict({column: [row[i] for row in rows] for i, column in enumerate(columns)})
+            pyarrow.parquet.write_table(table, tmp_path)
+        else:
+            with open(tmp_path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(rows)
+        os.replace(tmp_path, os.path.join(self.folder, name))
+        with open(self.log_path, "a") as f:
+            f.write("\t".join([name] + frames) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(frames)
+
+
+def run_backfill(archive: str, output: str, sensor: str, camera: str = "stereo", workers: int = None,
+                 format: str = "csv", lut_folder: str = None, part_frames: int = 200,
+                 report_every: float = 10.0, layout_path: str = layout_file) -> dict:
+    """
+    Re-extracts every frame of an archive not yet in the output, sharding frames across a process pool
+    :param archive: str - Archive root folder
+    :param output: str - Output folder of part files and progress log
+    :param sensor: str - Sensor name stored in every row
+    :param camera: str - "stereo" or "nir", selects the crop window
+    :param workers: int - Worker processes, all cores by default
+    :param format: str - "csv" or "parquet"
+    :param lut_folder: str - Cache folder of the index lookup tables
+    :param part_frames: int - Frames per part file, also the unit of progress saved on interruption
+    :param report_every: float - Seconds between progress lines, 0 for none
+    :param layout_path: str - Layout file of the sensor (Layouts/<sensor>.json), its first layout is extracted
+    :return: dict - "frames" processed, "skipped" (already done), "failed" frame -> error, "seconds", "fps"
+    """
+    writer = ResultWriter(output, format)
+    frames = iter_archive(archive, camera)
+    pending = [frame for frame in frames if frame not in writer.done]
+    summary = {"frames": 0, "skipped": len(frames) - len(pending), "failed": {}, "seconds": 0.0, "fps": 0.0}
+    if not pending:
+        return summary
+
+    t0 = last_report = time.perf_counter()
+    rows, part = [], []
+    with Pool(workers, initializer=init_worker, initargs=(archive, sensor, camera, lut_folder, layout_path)) as pool:
+        for frame, frame_rows, error in pool.imap_unordered(process_frame, pending, chunksize=4):
+            rows.extend(frame_rows)
+            if error:
+                summary["failed"][frame] = error  # Not logged as done, retried by the next run
+            else:
+                part.append(frame)
+            summary["frames"] += 1
+            if len(part) >= part_frames and rows:
+                writer.write_part(rows, part)
+                rows, part = [], []
+            if report_every and time.perf_counter() - last_report >= report_every:
+                last_report = time.perf_counter()
+                print(f"{summary['frames']}/{len(pending)} frames, "
+                      f"{summary['frames'] / (last_report - t0):.2f} frames/s")
+    if part and rows:
+        writer.write_part(rows, part)
+    summary["seconds"] = round(time.perf_counter() - t0, 2)
+    summary["fps"] = round(summary["frames"] / max(summary["seconds"], 1e-9), 2)
+    return summary
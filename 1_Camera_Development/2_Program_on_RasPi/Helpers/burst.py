@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+
+
+class FrameRing:
+    """
+    Preallocated ring buffer holding the last k frames of one camera
+    """
+    def __init__(self, k: int, shape: tuple, dtype=np.uint8):
+        self.buffer: np.ndarray = np.empty((k,) + tuple(shape), dtype=dtype)
+        self.timestamps: np.ndarray = np.zeros(k, dtype=np.int64)
+        self.count: int = 0
+
+    def __repr__(self):
+        return f"FrameRing(k={len(self.buffer)}, shape={self.buffer.shape[1:]}, count={self.count})"
+
+    def push(self, frame: np.ndarray, timestamp: int = 0) -> None:
+        """
+        Copies a frame into the next slot, overwriting the oldest one when full
+        :param frame: np.ndarray - Frame of the ring's shape
+        :param timestamp: int - Frame timestamp in ns
+        :return: None
+        """
+        slot = self.count % len(self.buffer)
+        self.buffer[slot] = frame
+        self.timestamps[slot] = timestamp
+        self.count += 1
+
+    def clear(self) -> None:
+        """
+        Empties the ring without releasing its memory
+        :return: None
+        """
+        self.count = 0
+
+    def frames(self) -> np.ndarray:
+        """
+        :return: np.ndarray - View of the filled slots, shape (n, height, width, channels)
+        """
+        return self.buffer[:min(self.count, len(self.buffer))]
+
+
+def fuse_mean(frames: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """
+    Averages a stack of uint8 frames to reduce sensor noise
+    :param frames: np.ndarray - Stack of shape (k, height, width, channels), k <= 256
+    :param out: np.ndarray - Optional uint8 output buffer of one frame's shape
+    :return: np.ndarray - Rounded uint8 mean frame
+    """
+    k = len(frames)
+    if k > 256:
+        raise ValueError(f"Cannot fuse {k} frames, at most 256 frames fit the uint16 sum")
+    total = frames.sum(axis=0, dtype=np.uint16)  # 256 * 255 + 128 still fits in uint16
+    total += k // 2  # Round to nearest instead of truncating
+    total //= k
+    if out is None:
+        return total.astype(np.uint8)
+    np.copyto(out, total, casting="unsafe")
+    return out
+
+
+def sharpness(frame: np.ndarray) -> float:
+    """
+    Variance of the Laplacian of the grey image, higher is sharper
+    :param frame: np.ndarray - BGR or grey frame
+    :return: float - Sharpness score
+    """
+    grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return float(cv2.Laplacian(grey, cv2.CV_32F).var())
+
+
+def select_sharpest(frames: np.ndarray) -> tuple:
+    """
+    Picks the sharpest frame of a stack
+    :param frames: np.ndarray - Stack of shape (k, height, width, channels)
+    :return: tuple - (index of the sharpest frame, list of all scores)
+    """
+    scores = [sharpness(frame) for frame in frames]
+    return int(np.argmax(scores)), scores
+
+
+def fuse_burst(ring: FrameRing, method: str = "mean") -> tuple:
+    """
+    Reduces a burst to one frame
+    :param ring: FrameRing - Filled ring of one camera
+    :param method: str - "mean" to average the frames or "sharpest" to keep the sharpest one
+    :return: tuple - (fused frame, its timestamp in ns, info dict)
+    """
+    frames = ring.frames()
+    timestamps = ring.timestamps[:len(frames)]
+    if method == "mean":
+        return fuse_mean(frames), int(timestamps.mean()), {"k": len(frames)}
+    if method == "sharpest":
+        index, scores = select_sharpest(frames)
+        return frames[index].copy(), int(timestamps[index]), {"k": len(frames), "selected": index,
+                                                              "sharpness": [round(s, 2) for s in scores]}
+    raise ValueError(f"Unknown burst fusion method {method}")
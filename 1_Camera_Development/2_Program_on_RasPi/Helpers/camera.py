@@ -0,0 +1,346 @@
+import math
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+class PiCamera2Backend:
+    """
+    One Picamera2 camera that is configured once and kept running between captures
+    """
+    def __init__(self, index: int, lens_position: float = 0.1):
+        self.index: int = index
+        self.lens_position: float = lens_position
+        self.picam = None
+
+    def __repr__(self):
+        return f"PiCamera2Backend(index={self.index}, lens_position={self.lens_position})"
+
+    def start(self) -> None:
+        """
+        Creates, configures and starts the camera pipeline
+        :return: None
+        """
+        from picamera2 import Picamera2
+
+        self.picam = Picamera2(self.index)
+        # "RGB888" is stored as B, G, R in memory, the same channel order OpenCV uses
+        config = self.picam.create_still_configuration(main={"format": "RGB888"})
+        self.picam.configure(config)
+        self.picam.set_controls({"LensPosition": self.lens_position})  # Focus control
+        self.picam.start()
+
+    def capture_array(self) -> np.ndarray:
+        """
+        Captures one frame from the running pipeline
+        :return: np.ndarray - BGR frame of shape (height, width, 3)
+        """
+        return self.picam.capture_array("main")
+
+    def capture_frame(self) -> tuple:
+        """
+        Captures one frame together with the time its exposure was taken
+        :return: tuple - (BGR frame, sensor timestamp in ns)
+        """
+        request = self.picam.capture_request()
+        try:
+            frame = request.make_array("main")
+            timestamp = request.get_metadata().get("SensorTimestamp", time.monotonic_ns())
+        finally:
+            request.release()
+        return frame, timestamp
+
+    def capture_file(self, path: str) -> None:
+        """
+        Captures one frame and lets Picamera2 encode it to the given path
+        :param path: str - Output file path
+        :return: None
+        """
+        self.picam.capture_file(path)
+
+    def capture_metadata(self) -> dict:
+        """
+        Waits for the next frame and returns its metadata (ExposureTime, AnalogueGain, ColourGains, ...)
+        :return: dict - Frame metadata
+        """
+        return self.picam.capture_metadata()
+
+    def set_controls(self, controls: dict) -> None:
+        """
+        :param controls: dict - libcamera controls to apply to the running camera
+        :return: None
+        """
+        self.picam.set_controls(controls)
+
+    def stop(self) -> None:
+        """
+        Stops and releases the camera pipeline
+        :return: None
+        """
+        if self.picam is not None:
+            self.picam.stop()
+            self.picam.close()
+            self.picam = None
+
+
+class PiCameraStereoBackend:
+    """
+    StereoPi camera pair driven by the legacy picamera stack in side-by-side stereo mode
+    (the capture set-up of 1_capture_dual_img_original.py)
+    """
+    def __init__(self, resolution: tuple = (1280, 624), scale_ratio: int = 2, framerate: int = 20):
+        # Camera resolution height must be dividable by 16, and width by 32
+        self.resolution: tuple = (int((resolution[0] + 31) / 32) * 32, int((resolution[1] + 15) / 16) * 16)
+        self.output_size: tuple = (self.resolution[0] * scale_ratio, self.resolution[1] * scale_ratio)
+        self.framerate: int = framerate
+        self.camera = None
+        self.buffer = None
+
+    def __repr__(self):
+        return f"PiCameraStereoBackend(resolution={self.resolution}, output_size={self.output_size})"
+
+    def start(self) -> None:
+        """
+        Opens the camera pair in side-by-side stereo mode
+        :return: None
+        """
+        from picamera import PiCamera
+
+        self.camera = PiCamera(stereo_mode="side-by-side", stereo_decimate=False)
+        self.camera.resolution = self.resolution
+        self.camera.framerate = self.framerate
+        self.camera.hflip = False
+        self.buffer = np.empty((self.output_size[1], self.output_size[0], 3), dtype=np.uint8)
+
+    def capture_array(self) -> np.ndarray:
+        """
+        Captures one side-by-side frame of both cameras
+        :return: np.ndarray - BGR frame of shape (height, 2 * camera width, 3)
+        """
+        return self.capture_frame()[0]
+
+    def capture_frame(self) -> tuple:
+        """
+        Captures one side-by-side frame; both halves are exposed together by the stereo mode
+        :return: tuple - (BGR frame, timestamp in ns)
+        """
+        self.camera.capture(self.buffer, format="bgr", use_video_port=True, resize=self.output_size)
+        return self.buffer.copy(), time.monotonic_ns()
+
+    def capture_file(self, path: str) -> None:
+        """
+        Captures one side-by-side frame and encodes it to the given path
+        :param path: str - Output file path
+        :return: None
+        """
+        import cv2
+
+        cv2.imwrite(path, self.capture_array())
+
+    def stop(self) -> None:
+        """
+        Closes the camera pair
+        :return: None
+        """
+        if self.camera is not None:
+            self.camera.close()
+            self.camera = None
+
+
+class SideBySideCamera:
+    """
+    Wraps a backend whose frames hold two cameras next to each other and splits them into named views
+    """
+    def __init__(self, backend, views: tuple = ("rgb", "nir"), rotate_180: bool = False):
+        self.backend = backend
+        self.views: tuple = views  # Names of the left and right half
+        self.rotate_180: bool = rotate_180  # The original enclosure mounts the StereoPi upside down
+
+    def __repr__(self):
+        return f"SideBySideCamera(backend={self.backend}, views={self.views}, rotate_180={self.rotate_180})"
+
+    def start(self) -> None:
+        """
+        Starts the wrapped backend
+        :return: None
+        """
+        self.backend.start()
+
+    def stop(self) -> None:
+        """
+        Stops the wrapped backend
+        :return: None
+        """
+        self.backend.stop()
+
+    def capture_frame(self) -> tuple:
+        """
+        Captures one combined frame, rotated if configured
+        :return: tuple - (BGR frame, timestamp in ns)
+        """
+        frame, timestamp = self.backend.capture_frame()
+        if self.rotate_180:
+            frame = frame[::-1, ::-1]
+        return frame, timestamp
+
+    def split(self, frame: np.ndarray) -> dict:
+        """
+        Splits a combined frame into its left and right views without copying
+        :param frame: np.ndarray - Side-by-side frame
+        :return: dict - Frame view by view name
+        """
+        half = frame.shape[1] // 2
+        return {self.views[0]: frame[:, :half], self.views[1]: frame[:, half:]}
+
+
+class FakeCamera:
+    """
+    Camera stand-in that serves synthetic frames, used to run and benchmark the capture code without hardware
+    """
+    def __init__(self, index: int, resolution: tuple = (3280, 2464), startup_delay: float = 0.5,
+                 frame_latency: float = 0.0, latency_jitter: float = 0.0, seed: int = 0):
+        self.index: int = index
+        self.resolution: tuple = resolution
+        self.startup_delay: float = startup_delay
+        self.frame_latency: float = frame_latency  # Artificial seconds between the trigger and the frame
+        self.latency_jitter: float = latency_jitter  # Extra uniform random latency in seconds
+        self.seed: int = seed
+        self.rng: np.random.Generator = np.random.default_rng(seed + index)
+        self.ae_time_constant: float = 0.35  # Seconds for the simulated AE/AWB to close 63% of the gap
+        self.ae_state: dict = {}
+        self.ae_since: float = 0.0
+        self.ae_enabled: bool = True  # Simulated AE/AWB running, frozen at ae_state when off
+        self.frames: list = []
+        self.frame_count: int = 0
+
+    def __repr__(self):
+        return (f"FakeCamera(index={self.index}, resolution={self.resolution}, "
+                f"startup_delay={self.startup_delay}, frame_latency={self.frame_latency}, "
+                f"latency_jitter={self.latency_jitter})")
+
+    def start(self) -> None:
+        """
+        Simulates the pipeline start up cost and prepares a few synthetic frames to cycle through
+        :return: None
+        """
+        time.sleep(self.startup_delay)
+        # AE/AWB start from the sensor defaults, far from the scene's converged values
+        self.ae_state = {"ExposureTime": 33000, "AnalogueGain": 8.0, "ColourGains": (1.0, 1.0)}
+        self.ae_since = time.monotonic()
+        self.ae_enabled = True
+        rng = np.random.default_rng(self.seed + self.index)
+        base = synthetic_field_frame(self.resolution, rng).astype(np.int16)
+        self.frames = []
+        for _ in range(4):
+            noise = rng.integers(-4, 5, size=base.shape, dtype=np.int16)
+            self.frames.append(np.clip(base + noise, 0, 255).astype(np.uint8))
+
+    def capture_array(self) -> np.ndarray:
+        """
+        Returns the next synthetic frame
+        :return: np.ndarray - BGR frame of shape (height, width, 3)
+        """
+        return self.capture_frame()[0]
+
+    def capture_frame(self) -> tuple:
+        """
+        Returns the next synthetic frame after the artificial latency
+        :return: tuple - (BGR frame, timestamp in ns taken when the simulated exposure happens)
+        """
+        latency = self.frame_latency + self.latency_jitter * self.rng.random()
+        if latency > 0:
+            time.sleep(latency)
+        timestamp = time.monotonic_ns()
+        frame = self.frames[self.frame_count % len(self.frames)]
+        self.frame_count += 1
+        return frame.copy(), timestamp
+
+    def capture_file(self, path: str) -> None:
+        """
+        Captures one synthetic frame and encodes it to the given path
+        :param path: str - Output file path
+        :return: None
+        """
+        import cv2
+
+        cv2.imwrite(path, self.capture_array())
+
+    def set_controls(self, controls: dict) -> None:
+        """
+        Restarts the simulated AE/AWB from the given exposure, gain and colour gains
+        :param controls: dict - Controls; with AeEnable (or AwbEnable) False the values hold until it is True again
+        :return: None
+        """
+        state = {name: controls[name] for name in ("ExposureTime", "AnalogueGain", "ColourGains") if name in controls}
+        enabled = controls.get("AeEnable", controls.get("AwbEnable", self.ae_enabled))
+        if state or enabled != self.ae_enabled:
+            self.ae_state = dict(self.current_ae(), **state)
+            self.ae_since = time.monotonic()
+            self.ae_enabled = enabled
+
+    def current_ae(self) -> dict:
+        """
+        :return: dict - Simulated AE/AWB values, decaying from the start values toward the scene's target
+        """
+        if not self.ae_enabled:
+            return dict(self.ae_state)
+        target = fake_scene_exposure(datetime.now())
+        alpha = math.exp(-(time.monotonic() - self.ae_since) / self.ae_time_constant)
+        state = {}
+        for name in ("ExposureTime", "AnalogueGain"):
+            state[name] = target[name] + (self.ae_state[name] - target[name]) * alpha
+        state["ColourGains"] = tuple(t + (s - t) * alpha
+                                     for s, t in zip(self.ae_state["ColourGains"], target["ColourGains"]))
+        return state
+
+    def capture_metadata(self) -> dict:
+        """
+        Waits one frame period and returns the simulated AE/AWB metadata
+        :return: dict - Frame metadata
+        """
+        time.sleep(1 / 30)
+        return dict(self.current_ae(), SensorTimestamp=time.monotonic_ns())
+
+    def stop(self) -> None:
+        """
+        Drops the prepared frames
+        :return: None
+        """
+        self.frames = []
+
+
+def fake_scene_exposure(when: datetime) -> dict:
+    """
+    Converged AE/AWB values of the synthetic scene, repeatable for the same time of day
+    :param when: datetime - Time of the capture
+    :return: dict - ExposureTime (us), AnalogueGain and ColourGains (red, blue)
+    """
+    hours_from_noon = abs(when.hour + when.minute / 60 - 12)
+    return {"ExposureTime": 4000 + 1500 * hours_from_noon, "AnalogueGain": 1.0 + 0.2 * hours_from_noon,
+            "ColourGains": (1.9 - 0.05 * hours_from_noon, 1.5 + 0.05 * hours_from_noon)}
+
+
+def synthetic_field_frame(resolution: tuple, rng: np.random.Generator) -> np.ndarray:
+    """
+    Builds a synthetic field scene: a soil background with brighter vegetation stripes
+    :param resolution: tuple - (width, height) of the frame
+    :param rng: np.random.Generator - Random generator for the texture
+    :return: np.ndarray - uint8 BGR frame of shape (height, width, 3)
+    """
+    width, height = resolution
+    frame = np.empty((height, width, 3), dtype=np.int16)
+    frame[..., 0] = 90   # Blue (NIR on the NoIR camera)
+    frame[..., 1] = 100  # Green
+    frame[..., 2] = 110  # Red
+
+    # Vertical crop rows with more NIR and green and less red than the soil
+    stripe = (np.arange(width) // max(width // 16, 1)) % 2 == 1
+    frame[:, stripe, 0] += 80
+    frame[:, stripe, 1] += 40
+    frame[:, stripe, 2] -= 40
+
+    # Smooth brightness gradient from the top to the bottom of the scene
+    frame += np.linspace(-15, 15, height, dtype=np.float32).astype(np.int16)[:, None, None]
+    frame += rng.integers(-10, 11, size=frame.shape, dtype=np.int16)
+    return np.clip(frame, 0, 255).astype(np.uint8)
@@ -0,0 +1,251 @@
+import json
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+
+
+from DataStructures.encoder_settings import EncoderSettings
+from Helpers.encoders import extensions, write_frame
+from Helpers.exposure_cache import settle_cameras
+from Helpers.multi_capture import MultiCameraCapture
+
+
+class CaptureService:
+    """
+    Long-lived capture service that keeps every camera pipeline configured and running between triggers
+    """
+    def __init__(self, cameras: dict, base_folder: str = "/home/pi/images", settle_time: float = 2.0,
+                 extractor=None, archiver=None, store=None, exposure_cache=None, aligner=None,
+                 archive_settings: EncoderSettings = None):
+        self.cameras: dict = cameras  # Camera name (e.g. "rgb", "nir") -> camera backend
+        self.capturer: MultiCameraCapture = MultiCameraCapture(cameras)
+        self.base_folder: str = base_folder
+        self.settle_time: float = settle_time
+        self.extractor = extractor  # Callable (frames, timestamp) -> results, run on the in-memory frames
+        self.archiver = archiver  # ArchiveWriter that saves frames in the background, inline writes when None
+        self.store = store  # ImageStore every saved frame is registered with, none when None
+        self.exposure_cache = exposure_cache  # ExposureCache to settle from, fixed settle_time sleep when None
+        self.aligner = aligner  # FrameAligner applied to the extractor's input; archived frames stay raw
+        self.archive_settings: EncoderSettings = archive_settings or EncoderSettings("jpeg", quality=95)
+        self.settle_report: dict = {}
+        self.running: bool = False
+
+    def __repr__(self):
+        return (f"CaptureService(cameras={list(self.cameras)}, base_folder={self.base_folder}, "
+                f"settle_time={self.settle_time})")
+
+    def start(self) -> None:
+        """
+        Starts every camera once and waits for them to adjust
+        :return: None
+        """
+        self.capturer.start()
+        # Paid at start, not per trigger; scheduled captures settle again before their window
+        self.settle()
+        self.running = True
+
+    def settle(self) -> None:
+        """
+        Waits for the cameras to adjust to the current light, from the exposure cached for this time of day
+        :return: None
+        """
+        if self.exposure_cache is not None:
+            self.settle_report = settle_cameras(self.cameras, self.exposure_cache, datetime.now(), self.settle_time)
+        else:
+            time.sleep(self.settle_time)
+
+    def stop(self) -> None:
+        """
+        Stops every camera
+        :return: None
+        """
+        self.capturer.stop()
+        if self.archiver is not None:
+            self.archiver.close()
+        self.running = False
+
+    def capture(self, save: bool = True, extract: bool = False, burst: int = 1, fuse: str = "mean") -> dict:
+        """
+        Captures one frame from every camera at the same instant
+        :param save: bool - Write the frames and their metadata to the dated image folders
+        :param extract: bool - Run the extractor on the in-memory frames, without an encode/decode round trip
+        :param burst: int - Frames per camera fused into the returned frame
+        :param fuse: str - Burst fusion, "mean" or "sharpest"
+        :return: dict - Capture time, frames by camera name, capture metadata, saved paths, extracted results
+                        and trigger-to-frame latency
+        """
+        t0 = time.perf_counter()
+        when = datetime.now()
+        capture = self.capturer.capture(burst, fuse)
+        latency_ms = (time.perf_counter() - t0) * 1000
+        results = None
+        if extract and self.extractor is not None:
+            frames = capture["frames"] if self.aligner is None else self.aligner.align(capture["frames"])
+            results = self.extractor(frames, when.strftime("%d-%m-%Y_%H-%M-%S"))
+        paths = self.save_frames(capture["frames"], when, capture["metadata"]) if save else {}
+        return {"timestamp": when.strftime("%Y-%m-%d_%H%M%S"), "frames": capture["frames"],
+                "metadata": capture["metadata"], "paths": paths, "results": results,
+                "latency_ms": round(latency_ms, 3)}
+
+    def save_frames(self, frames: dict, when: datetime, metadata: dict = None) -> dict:
+        """
+        Writes frames as /<base_folder>/<camera>/<date>/<camera>_<time>.<ext> and the capture metadata as
+        /<base_folder>/meta/<date>/meta_<time>.json
+        :param frames: dict - Frames by camera name
+        :param when: datetime - Capture time used for the folder and file names
+        :param metadata: dict - Capture metadata (timestamps and skew), not written when None
+        :return: dict - Saved file path by camera name
+        """
+        paths = {}
+        for name, frame in frames.items():
+            save_folder = os.path.join(self.base_folder, name, when.strftime("%Y-%m-%d"))
+            os.makedirs(save_folder, exist_ok=True)
+            path = os.path.join(save_folder,
+                                f"{name}_{when.strftime('%H%M%S')}{extensions[self.archive_settings.format]}")
+            on_written = None
+            if self.store is not None:
+                on_written = lambda p, camera=name: self.store.register(p, camera, when)
+            if self.archiver is not None:
+                self.archiver.submit(path, frame, on_written, self.archive_settings)
+            else:
+                write_frame(path, frame, self.archive_settings)
+                if on_written is not None:
+                    on_written(path)
+            paths[name] = path
+        if metadata is not None:
+            meta_folder = os.path.join(self.base_folder, "meta", when.strftime("%Y-%m-%d"))
+            os.makedirs(meta_folder, exist_ok=True)
+            with open(os.path.join(meta_folder, f"meta_{when.strftime('%H%M%S')}.json"), "w") as f:
+                json.dump(dict(metadata, paths=paths), f, indent=2)
+        return paths
+
+    def handle_request(self, request: dict) -> dict:
+        """
+        Answers one request received on the control socket
+        :param request: dict - {"cmd": "capture", "save": bool, "extract": bool, "burst": int, "fuse": str} or
+                               {"cmd": "ping"} or {"cmd": "stop"}
+        :return: dict - JSON serializable reply
+        """
+        cmd = request.get("cmd", "capture")
+        if cmd == "ping":
+            return {"ok": True, "cameras": list(self.cameras), "settle": self.settle_report}
+        if cmd == "stop":
+            self.running = False
+            return {"ok": True}
+        if cmd == "capture":
+            result = self.capture(save=request.get("save", True), extract=request.get("extract", False),
+                                  burst=request.get("burst", 1), fuse=request.get("fuse", "mean"))
+            shapes = {name: list(frame.shape) for name, frame in result["frames"].items()}
+            return {"ok": True, "timestamp": result["timestamp"], "paths": result["paths"], "shapes": shapes,
+                    "metadata": result["metadata"], "results": result["results"],
+                    "latency_ms": result["latency_ms"]}
+        return {"ok": False, "error": f"Unknown command {cmd}"}
+
+    def serve_socket(self, socket_path: str) -> None:
+        """
+        Serves newline delimited JSON requests on a local unix socket until a stop request arrives
+        :param socket_path: str - Path of the unix socket to listen on
+        :return: None
+        """
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_path)
+        server.listen(1)
+        try:
+            while self.running:
+                conn, _ = server.accept()
+                with conn, conn.makefile("rw") as stream:
+                    for line in stream:
+                        try:
+                            reply = self.handle_request(json.loads(line))
+                        except Exception as e:  # Keep the service alive for the next trigger
+                            reply = {"ok": False, "error": str(e)}
+                        stream.write(json.dumps(reply) + "\n")
+                        stream.flush()
+                        if not self.running:
+                            break
+        finally:
+            server.close()
+            os.remove(socket_path)
+
+    def run_schedule(self, schedule_file: str) -> None:
+        """
+        Captures at every HH:MM time listed in the schedule file, re-reading the file before each wait. The light
+        changes between windows hours apart, so the cameras settle again just before each one
+        :param schedule_file: str - Text file with one HH:MM capture time per line
+        :return: None
+        """
+        while self.running:
+            next_time = next_scheduled_time(read_schedule(schedule_file), datetime.now())
+            time.sleep(max((next_time - datetime.now()).total_seconds() - self.settle_time, 0))
+            self.settle()
+            time.sleep(max((next_time - datetime.now()).total_seconds(), 0))
+            result = self.capture(save=True)
+            print(f"Images Captured: {result['paths']} ({result['latency_ms']} ms)")
+
+
+def request_capture(socket_path: str, save: bool = True, extract: bool = False, burst: int = 1, fuse: str = "mean",
+                    timeout: float = 10.0) -> dict:
+    """
+    Asks a running capture service for one capture
+    :param socket_path: str - Unix socket of the capture service
+    :param save: bool - Ask the service to write the frames to disk
+    :param extract: bool - Ask the service to extract the plot statistics from the in-memory frames
+    :param burst: int - Frames per camera fused into one
+    :param fuse: str - Burst fusion, "mean" or "sharpest"
+    :param timeout: float - Seconds to wait for the reply
+    :return: dict - Reply of the service
+    """
+    request = {"cmd": "capture", "save": save, "extract": extract, "burst": burst, "fuse": fuse}
+    return send_request(socket_path, request, timeout)
+
+
+def send_request(socket_path: str, request: dict, timeout: float = 10.0) -> dict:
+    """
+    Sends one request to a running capture service
+    :param socket_path: str - Unix socket of the capture service
+    :param request: dict - JSON serializable request
+    :param timeout: float - Seconds to wait for the reply
+    :return: dict - Reply of the service
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(socket_path)
+        with client.makefile("rw") as stream:
+            stream.write(json.dumps(request) + "\n")
+            stream.flush()
+            return json.loads(stream.readline())
+
+
+def read_schedule(schedule_file: str) -> list:
+    """
+    Reads capture times from a schedule file, ignoring blank lines and # comments
+    :param schedule_file: str - Text file with one HH:MM capture time per line
+    :return: list[str] - Sorted HH:MM strings
+    """
+    times = []
+    with open(schedule_file) as f:
+        for line in f:
+            line = line.split("#")[0].strip()
+            if line:
+                datetime.strptime(line, "%H:%M")  # Fail early on a malformed line
+                times.append(line)
+    return sorted(times)
+
+
+def next_scheduled_time(times: list, now: datetime) -> datetime:
+    """
+    Finds the next capture time after now
+    :param times: list[str] - HH:MM capture times
+    :param now: datetime - Current time
+    :return: datetime - Next capture time, rolling over to tomorrow after the last entry
+    """
+    for t in times:
+        hour, minute = map(int, t.split(":"))
+        candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate > now:
+            return candidate
+    hour, minute = map(int, times[0].split(":"))
+    return now.replace(hour=hour, minute=minute, second=0, microsecond=0) + timedelta(days=1)
@@ -0,0 +1,234 @@
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+
+from DataStructures.plot_rollup import PlotRollup
+from Helpers.result_codec import decode_payload, encode_payload
+
+schema = """
+CREATE TABLE IF NOT EXISTS rollups (
+    day TEXT NOT NULL,
+    vi TEXT NOT NULL,
+    plot TEXT NOT NULL,
+    frames INTEGER NOT NULL,
+    total TEXT NOT NULL,
+    squares TEXT NOT NULL,
+    minimum REAL,
+    maximum REAL,
+    low REAL NOT NULL,
+    high REAL NOT NULL,
+    counts BLOB NOT NULL,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, vi, plot)
+);
+CREATE TABLE IF NOT EXISTS contributions (
+    frame TEXT NOT NULL,
+    layout TEXT NOT NULL,
+    day TEXT NOT NULL,
+    stats BLOB NOT NULL,
+    PRIMARY KEY (frame, layout)
+);
+CREATE INDEX IF NOT EXISTS contributions_day ON contributions (day);
+CREATE TABLE IF NOT EXISTS days (
+    day TEXT PRIMARY KEY,
+    uplink_bytes INTEGER NOT NULL DEFAULT 0,
+    dirty INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def frame_day(result: dict) -> str:
+    """
+    :param result: dict - Result of one frame with its "vi" statistics
+    :return: str - Capture day of the frame, YYYY-MM-DD, from the timestamp stored with its plots
+    """
+    plots = next(iter(result["vi"].values()))
+    timestamp = next(iter(plots.values()))["timestamp"]
+    return datetime.strptime(timestamp, "%d-%m-%Y_%H-%M-%S").strftime("%Y-%m-%d")
+
+
+def choose_upload(detail_bytes: int, rollup_bytes: int, spent: int, budget: int = None) -> list:
+    """
+    Picks what a session queues for upload: the rollups of finished days come first, they are small and
+    complete, then the session's per-frame payloads when they still fit today's budget
+    :param detail_bytes: int - Encoded bytes of this session's per-frame payloads, 0 when there are none
+    :param rollup_bytes: int - Encoded bytes of the rollups waiting for upload, 0 when there are none
+    :param spent: int - Bytes already queued today
+    :param budget: int - Bytes per day the link may carry, None for no limit
+    :return: list[str] - "rollup" and/or "detail"
+    """
+    upload = []
+    if rollup_bytes and (budget is None or spent + rollup_bytes <= budget):
+        upload.append("rollup")
+        spent += rollup_bytes
+    if detail_bytes and (budget is None or spent + detail_bytes <= budget):
+        upload.append("detail")
+    return upload
+
+
+class DailyRollups:
+    """
+    SQLite store of daily per-plot aggregates of every index, updated frame by frame after each session: one
+    PlotRollup (pixel count, integer sums, min/max, histogram sketch) per day, index and plot. Every frame counts
+    once, by its content hash whatever folder or name the sessions read it under, and a re-extracted frame replaces
+    its previous contribution. The store also tracks the uplink bytes of each day and the days whose rollups
+    changed since they were last queued.
+    """
+    def __init__(self, db_path: str):
+        self.db_path: str = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db = sqlite3.connect(db_path, timeout=30)
+        self.db.executescript(schema)
+        if "skipped" not in [row[1] for row in self.db.execute("PRAGMA table_info(rollups)")]:
+            self.db.execute("ALTER TABLE rollups ADD COLUMN skipped INTEGER NOT NULL DEFAULT 0")  # Older stores
+
+    def __repr__(self):
+        days = self.db.execute("SELECT COUNT(*) FROM days").fetchone()[0]
+        return f"DailyRollups(db_path={self.db_path}, days={days})"
+
+    def close(self) -> None:
+        """
+        Closes the rollup database
+        :return: None
+        """
+        self.db.close()
+
+    def add(self, result: dict, frame: str, layout: str) -> bool:
+        """
+        Adds the plot statistics of one frame to the rollups of its day. A frame holds one contribution, kept with
+        its statistics: added again with other statistics or another layout, e.g. re-extracted after a layout edit
+        or an index change, its previous contribution is replaced and the rollups of its day are rebuilt
+        :param result: dict - Result of one frame from 2_extract_ndvi.py, with the "vi" statistics and histograms;
+                              a rejected frame (no "vi") only withdraws a previous contribution
+        :param frame: str - Canonical identity of the frame, the SHA-1 of its content (Helpers/image_store.file_sha1),
+                            the same whatever folder or name it was read under
+        :param layout: str - Layout key the frame was extracted with, e.g. the layout digests and settings
+        :return: bool - True when the rollups changed, False when rejected or already added with these statistics
+        """
+        day = frame_day(result) if "vi" in result else None
+        stats = encode_payload(result["vi"], use_msgpack=False) if day else None
+        with self.db:
+            previous = self.db.execute("SELECT layout, day, stats FROM contributions WHERE frame = ?",
+                                       (frame,)).fetchall()
+            if not previous:
+                if day is None:
+                    return False
+                self.db.execute("INSERT INTO contributions (frame, layout, day, stats) VALUES (?, ?, ?, ?)",
+                                (frame, layout, day, stats))
+                rollups = self.get(day)
+                for vi, plots in result["vi"].items():
+                    for plot, plot_stats in plots.items():
+                        rollup = rollups.setdefault(vi, {}).get(plot) or PlotRollup.empty(plot_stats["hist"])
+                        rollup.add(plot_stats)
+                        self.put(day, vi, plot, rollup)
+                self.mark_dirty(day)
+                return True
+            if previous == [(layout, day, stats)]:
+                return False
+            # Sums and counts could be taken back, min and max cannot: the days are rebuilt from their contributions
+            self.db.execute("DELETE FROM contributions WHERE frame = ?", (frame,))
+            if day is not None:
+                self.db.execute("INSERT INTO contributions (frame, layout, day, stats) VALUES (?, ?, ?, ?)",
+                                (frame, layout, day, stats))
+            for each in sorted({row[1] for row in previous} | ({day} if day else set())):
+                self.rebuild(each)
+        return True
+
+    def rebuild(self, day: str) -> None:
+        """
+        Recomputes the rollups of one day from the contributions of its frames
+        :param day: str - YYYY-MM-DD
+        :return: None
+        """
+        rollups = {}
+        for (stats,) in self.db.execute("SELECT stats FROM contributions WHERE day = ?", (day,)).fetchall():
+            for vi, plots in decode_payload(stats).items():
+                for plot, plot_stats in plots.items():
+                    rollups.setdefault(vi, {}).setdefault(plot, PlotRollup.empty(plot_stats["hist"])).add(plot_stats)
+        self.db.execute("DELETE FROM rollups WHERE day = ?", (day,))
+        for vi, plots in rollups.items():
+            for plot, rollup in plots.items():
+                self.put(day, vi, plot, rollup)
+        self.mark_dirty(day)
+
+    def mark_dirty(self, day: str) -> None:
+        """
+        :param day: str - YYYY-MM-DD whose rollups changed and are to be queued again
+        :return: None
+        """
+        self.db.execute("INSERT INTO days (day, dirty) VALUES (?, 1) ON CONFLICT (day) DO UPDATE SET dirty = 1", (day,))
+
+    def put(self, day: str, vi: str, plot: str, rollup: PlotRollup) -> None:
+        """
+        Writes one aggregate; the sums are stored as decimal text since they outgrow 64-bit integers
+        :param day: str - YYYY-MM-DD
+        :param vi: str - Index name
+        :param plot: str - Plot name
+        :param rollup: PlotRollup - Aggregate
+        :return: None
+        """
+        self.db.execute("INSERT OR REPLACE INTO rollups (day, vi, plot, frames, total, squares, minimum, maximum, "
+                        "low, high, counts, skipped) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (day, vi, plot, rollup.frames, str(rollup.total), str(rollup.squares),
+                         rollup.minimum if np.isfinite(rollup.minimum) else None,
+                         rollup.maximum if np.isfinite(rollup.maximum) else None,
+                         rollup.low, rollup.high, rollup.counts.astype(np.int64).tobytes(), rollup.skipped))
+
+    def get(self, day: str) -> dict:
+        """
+        :param day: str - YYYY-MM-DD
+        :return: dict - Index name -> plot name -> PlotRollup of that day
+        """
+        rollups = {}
+        for vi, plot, frames, total, squares, minimum, maximum, low, high, counts, skipped in self.db.execute(
+                "SELECT vi, plot, frames, total, squares, minimum, maximum, low, high, counts, skipped FROM rollups "
+                "WHERE day = ?", (day,)):
+            rollups.setdefault(vi, {})[plot] = PlotRollup(
+                low, high, np.frombuffer(counts, dtype=np.int64).copy(), frames, int(total), int(squares),
+                np.inf if minimum is None else minimum, -np.inf if maximum is None else maximum, skipped)
+        return rollups
+
+    def payload(self, days: list) -> dict:
+        """
+        :param days: list[str] - Days to send
+        :return: dict - Day -> index name -> plot name -> PlotRollup.summary, the "rollup" upload payload
+        """
+        return {day: {vi: {plot: rollup.summary() for plot, rollup in plots.items()}
+                      for vi, plots in self.get(day).items()} for day in days}
+
+    def dirty_days(self, before: str) -> list:
+        """
+        :param before: str - YYYY-MM-DD, usually today: only finished days are returned
+        :return: list[str] - Days before it whose rollups changed since they were last queued
+        """
+        return [row[0] for row in self.db.execute("SELECT day FROM days WHERE dirty = 1 AND day < ? ORDER BY day",
+                                                  (before,))]
+
+    def mark_queued(self, days: list) -> None:
+        """
+        :param days: list[str] - Days whose rollups were queued for upload
+        :return: None
+        """
+        with self.db:
+            self.db.executemany("UPDATE days SET dirty = 0 WHERE day = ?", [(day,) for day in days])
+
+    def spend(self, day: str, nbytes: int) -> None:
+        """
+        :param day: str - Uplink day, YYYY-MM-DD
+        :param nbytes: int - Encoded bytes queued for upload
+        :return: None
+        """
+        with self.db:
+            self.db.execute("INSERT INTO days (day, uplink_bytes) VALUES (?, ?) "
+                            "ON CONFLICT (day) DO UPDATE SET uplink_bytes = uplink_bytes + excluded.uplink_bytes",
+                            (day, nbytes))
+
+    def spent(self, day: str) -> int:
+        """
+        :param day: str - Uplink day, YYYY-MM-DD
+        :return: int - Bytes queued for upload that day
+        """
+        row = self.db.execute("SELECT uplink_bytes FROM days WHERE day = ?", (day,)).fetchone()
+        return row[0] if row else 0
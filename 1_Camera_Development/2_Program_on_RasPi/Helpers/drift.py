@@ -0,0 +1,207 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from Helpers.registration import estimate_homography
+
+
+def grey_pyramid(frame: np.ndarray, levels: int) -> list:
+    """
+    :param frame: np.ndarray - BGR or grey frame
+    :param levels: int - Number of halvings
+    :return: list[np.ndarray] - float32 grey images, full resolution first
+    """
+    grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    pyramid = [grey.astype(np.float32)]
+    for _ in range(levels):
+        pyramid.append(cv2.pyrDown(pyramid[-1]))
+    return pyramid
+
+
+def shift_image(image: np.ndarray, dx: float, dy: float) -> np.ndarray:
+    """
+    Translates an image by a sub-pixel shift, filling uncovered pixels with zeros
+    :param image: np.ndarray - Image to move
+    :param dx: float - Shift to the right in pixels
+    :param dy: float - Shift down in pixels
+    :return: np.ndarray - Shifted image
+    """
+    matrix = np.float32([[1, 0, dx], [0, 1, dy]])
+    return cv2.warpAffine(image, matrix, (image.shape[1], image.shape[0]), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT)
+
+
+def phase_shift(reference: np.ndarray, image: np.ndarray) -> tuple:
+    """
+    :param reference: np.ndarray - float32 grey reference
+    :param image: np.ndarray - float32 grey image of the same size
+    :return: tuple - (dx, dy, response): how far the image content moved relative to the reference
+    """
+    window = cv2.createHanningWindow((reference.shape[1], reference.shape[0]), cv2.CV_32F)
+    (dx, dy), response = cv2.phaseCorrelate(reference, image, window)
+    return dx, dy, response
+
+
+def estimate_drift(reference_pyramid: list, pyramid: list, start: tuple = (0.0, 0.0)) -> tuple:
+    """
+    Coarse-to-fine phase correlation: the coarsest level finds large moves cheaply, every finer level
+    only corrects the residual left after undoing the current estimate
+    :param reference_pyramid: list[np.ndarray] - Pyramid of the reference frame
+    :param pyramid: list[np.ndarray] - Pyramid of the new frame
+    :param start: tuple - Initial (dx, dy) estimate in full resolution pixels
+    :return: tuple - (dx, dy, response) in full resolution pixels
+    """
+    dx, dy = start
+    response = 0.0
+    for level in range(len(pyramid) - 1, -1, -1):
+        scale = 2 ** level
+        undone = shift_image(pyramid[level], -dx / scale, -dy / scale)
+        rx, ry, response = phase_shift(reference_pyramid[level], undone)
+        dx += rx * scale
+        dy += ry * scale
+    return dx, dy, response
+
+
+def orb_shift(reference: np.ndarray, frame: np.ndarray) -> tuple:
+    """
+    Shift from ORB feature matches, for frames phase correlation cannot place (e.g. the mount also turned): the
+    translation of the frame centre under the matched homography
+    :param reference: np.ndarray - uint8 grey reference
+    :param frame: np.ndarray - BGR or grey frame of the same size
+    :return: tuple - (dx, dy): how far the image content moved relative to the reference
+    """
+    homography = estimate_homography(frame, reference)  # Frame pixels -> reference pixels
+    height, width = reference.shape[:2]
+    centre = np.float32([[[width / 2, height / 2]]])
+    x, y = cv2.perspectiveTransform(centre, homography)[0, 0]
+    return float(width / 2 - x), float(height / 2 - y)
+
+
+class DriftTracker:
+    """
+    Aligns each new frame of one sensor to that sensor's reference frame before the plot masks are applied.
+    The reference is set explicitly (set_reference) or taken from the first frame that passed the quality gate;
+    until then frames are left as they are.
+    """
+    def __init__(self, folder: str, sensor: str, levels: int = 2, reuse_tolerance: float = 1.0,
+                 warn_drift: float = 15.0, min_response: float = 0.1):
+        self.folder: str = folder
+        self.sensor: str = sensor
+        self.levels: int = levels
+        # Change of the coarse estimate since last session, in full resolution pixels, below which the cached
+        # shift is kept
+        self.reuse_tolerance: float = reuse_tolerance
+        self.warn_drift: float = warn_drift  # Drift in pixels that flags the unit for maintenance
+        # Phase correlation peak below which the shift is taken from ORB feature matches instead
+        self.min_response: float = min_response
+        self.reference_pyramid: list = None
+        self.state: dict = {"shift": [0.0, 0.0]}
+        self.last_report: dict = {}
+        self.warned: bool = False  # The missing reference was reported
+        os.makedirs(folder, exist_ok=True)
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                self.state = json.load(f)
+
+    def __repr__(self):
+        return f"DriftTracker(sensor={self.sensor}, levels={self.levels}, shift={self.state['shift']})"
+
+    @property
+    def reference_path(self) -> str:
+        """
+        :return: str - Grey reference frame of the sensor
+        """
+        return os.path.join(self.folder, f"{self.sensor}_reference.png")
+
+    @property
+    def has_reference(self) -> bool:
+        """
+        :return: bool - The sensor has a reference frame
+        """
+        return self.reference_pyramid is not None or os.path.exists(self.reference_path)
+
+    @property
+    def state_path(self) -> str:
+        """
+        :return: str - JSON file with the cached shift of the sensor
+        """
+        return os.path.join(self.folder, f"{self.sensor}_drift.json")
+
+    def set_reference(self, frame: np.ndarray) -> None:
+        """
+        Makes a frame the sensor's reference and resets the cached shift
+        :param frame: np.ndarray - Cropped frame the plot polygons were drawn on
+        :return: None
+        """
+        grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        cv2.imwrite(self.reference_path, grey)
+        self.reference_pyramid = grey_pyramid(grey, self.levels)
+        self.state = {"shift": [0.0, 0.0]}
+        self.save_state()
+        print(f"Drift reference of {self.sensor} set: {self.reference_path}")
+
+    def save_state(self) -> None:
+        """
+        Writes the cached shift
+        :return: None
+        """
+        with open(self.state_path, "w") as f:
+            json.dump(self.state, f)
+
+    def align(self, frame: np.ndarray, gated: bool = False) -> tuple:
+        """
+        Estimates the drift of a frame against the reference and moves the frame back onto it. A sensor without a
+        reference takes the frame as its reference only when it passed the quality gate, a blurred or dark first
+        frame would misplace every later one
+        :param frame: np.ndarray - Cropped frame
+        :param gated: bool - The frame passed the quality gate
+        :return: tuple - (aligned frame, drift report dict)
+        """
+        if self.reference_pyramid is None:
+            if not os.path.exists(self.reference_path):
+                if not gated:
+                    if not self.warned:
+                        print(f"No drift reference for {self.sensor}: frames are not aligned until one passes the "
+                              f"quality gate or set_reference is called")
+                        self.warned = True
+                    self.last_report = {"dx": 0.0, "dy": 0.0, "drift": 0.0, "response": 0.0, "reused": False,
+                                        "new_reference": False, "maintenance": False, "method": None}
+                    return frame, self.last_report
+                self.set_reference(frame)
+                self.last_report = {"dx": 0.0, "dy": 0.0, "drift": 0.0, "response": 1.0, "reused": False,
+                                    "new_reference": True, "maintenance": False, "method": None}
+                return frame, self.last_report
+            self.reference_pyramid = grey_pyramid(cv2.imread(self.reference_path, cv2.IMREAD_GRAYSCALE), self.levels)
+
+        pyramid = grey_pyramid(frame, self.levels)
+        # Cheap check on the coarsest level only: if the frame sits where it did last session, the cached full
+        # resolution shift is reused and the finer levels are skipped
+        scale = 2 ** self.levels
+        coarse_dx, coarse_dy, response = phase_shift(self.reference_pyramid[-1], pyramid[-1])
+        last_coarse = self.state.get("coarse")
+        reused = (last_coarse is not None and
+                  np.hypot(coarse_dx - last_coarse[0], coarse_dy - last_coarse[1]) * scale <= self.reuse_tolerance)
+        method = self.state.get("method", "phase")
+        if reused:
+            dx, dy = self.state["shift"]
+        else:
+            dx, dy, response = estimate_drift(self.reference_pyramid, pyramid, (coarse_dx * scale, coarse_dy * scale))
+            method = "phase"
+            if response < self.min_response:
+                try:
+                    dx, dy = orb_shift(self.reference_pyramid[0].astype(np.uint8), frame)
+                    method = "orb"
+                except ValueError as e:
+                    print(f"Drift of {self.sensor}: weak phase correlation ({response:.3f}) and {e}")
+            self.state = {"shift": [round(dx, 3), round(dy, 3)], "coarse": [coarse_dx, coarse_dy], "method": method}
+            self.save_state()
+
+        drift = float(np.hypot(dx, dy))
+        self.last_report = {"dx": round(dx, 3), "dy": round(dy, 3), "drift": round(drift, 3),
+                            "response": round(float(response), 3), "reused": bool(reused), "new_reference": False,
+                            "maintenance": drift > self.warn_drift, "method": method}
+        if dx == 0 and dy == 0:
+            return frame, self.last_report
+        return shift_image(frame, -dx, -dy), self.last_report
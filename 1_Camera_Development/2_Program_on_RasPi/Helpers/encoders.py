@@ -0,0 +1,125 @@
+import io
+import json
+import os
+
+import cv2
+import numpy as np
+
+from DataStructures.encoder_settings import EncoderSettings
+
+extensions = {"png": ".png", "jpeg": ".jpg", "webp": ".webp", "npy": ".npy"}
+
+
+def encode_frame(frame: np.ndarray, settings: EncoderSettings) -> bytes:
+    """
+    Encodes a frame in memory
+    :param frame: np.ndarray - BGR frame
+    :param settings: EncoderSettings - Format and its tuning
+    :return: bytes - Encoded file content
+    """
+    if settings.format == "npy":
+        buffer = io.BytesIO()
+        np.save(buffer, frame, allow_pickle=False)
+        return buffer.getvalue()
+    if settings.format == "png":
+        params = [cv2.IMWRITE_PNG_COMPRESSION, settings.compression]
+    elif settings.format == "jpeg":
+        params = [cv2.IMWRITE_JPEG_QUALITY, settings.quality]
+    elif settings.format == "webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, settings.quality]
+    else:
+        raise ValueError(f"Unknown image format {settings.format}")
+    ok, data = cv2.imencode(extensions[settings.format], frame, params)
+    if not ok:
+        raise ValueError(f"Could not encode frame as {settings.format}")
+    return data.tobytes()
+
+
+def decode_frame(data: bytes, format: str, flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+    """
+    Decodes a frame from memory
+    :param data: bytes - Encoded file content
+    :param format: str - Format the content was encoded with
+    :param flags: int - cv2.imdecode flags, e.g. cv2.IMREAD_REDUCED_COLOR_2 for a half size decode
+    :return: np.ndarray - BGR frame
+    """
+    if format == "npy":
+        return np.load(io.BytesIO(data), allow_pickle=False)
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+
+
+def write_frame(path: str, frame: np.ndarray, settings: EncoderSettings) -> str:
+    """
+    Encodes a frame to disk, replacing the extension of the path with the format's one
+    :param path: str - Output path, with or without extension
+    :param frame: np.ndarray - BGR frame
+    :param settings: EncoderSettings - Format and its tuning
+    :return: str - Path actually written
+    """
+    path = os.path.splitext(path)[0] + extensions[settings.format]
+    data = encode_frame(frame, settings)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def read_frame_file(path: str, flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+    """
+    Reads a frame written by write_frame or any image file OpenCV understands
+    :param path: str - Image path
+    :param flags: int - cv2.imread flags
+    :return: np.ndarray - BGR frame, None when the file cannot be read
+    """
+    if path.endswith(".npy"):
+        frame = np.load(path, allow_pickle=False)
+        # Match cv2.imread: drop the alpha channel of BGRA stereo frames unless the caller asks to keep it
+        if flags == cv2.IMREAD_COLOR and frame.ndim == 3 and frame.shape[2] == 4:
+            frame = frame[..., :3]
+        return frame
+    return cv2.imread(path, flags)
+
+
+# cv2.imread flags of the reduced-resolution decodes; JPEG is decoded directly at the reduced size
+reduced_flags = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4,
+                 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+
+def decodes_reduced(path: str) -> bool:
+    """
+    :param path: str - Image path
+    :return: bool - The format is read at a reduced resolution without a full decode (JPEG, .npy); a gate scoring
+                    any other format decodes the whole frame, which should then be decoded once and shared
+    """
+    return path.lower().endswith((".jpg", ".jpeg", ".npy"))
+
+
+def read_reduced(path: str, factor: int) -> np.ndarray:
+    """
+    Reads a frame at 1 / factor of its resolution, as cheaply as the format allows: JPEG is decoded at the reduced
+    size (DCT scaling), .npy frames are subsampled without a copy, other formats are decoded and then reduced
+    :param path: str - Image path
+    :param factor: int - 1, 2, 4 or 8
+    :return: np.ndarray - BGR frame of about (height / factor, width / factor), None when the file cannot be read
+    """
+    if path.endswith(".npy"):
+        frame = read_frame_file(path)
+        return frame[::factor, ::factor]
+    return cv2.imread(path, reduced_flags[factor])
+
+
+def load_encoder_config(path: str, sensor: str) -> dict:
+    """
+    Reads the archive and upload encoder settings of a sensor from a JSON file of the form
+    {"default": {"archive": {...}, "upload": {...}}, "<sensor>": {...}}; a sensor entry overrides the default
+    :param path: str - JSON config file
+    :param sensor: str - Sensor name
+    :return: dict - {"archive": EncoderSettings, "upload": EncoderSettings}
+    """
+    config = {"archive": {"format": "png", "compression": 3}, "upload": {"format": "jpeg", "quality": 85}}
+    if os.path.exists(path):
+        with open(path) as f:
+            values = json.load(f)
+        for entry in (values.get("default", {}), values.get(sensor, {})):
+            for output in ("archive", "upload"):
+                config[output] = dict(config[output], **entry.get(output, {}))
+    return {output: EncoderSettings.from_dict(values) for output, values in config.items()}
@@ -0,0 +1,145 @@
+import json
+import os
+import time
+from datetime import datetime
+
+# Controls saved once AE/AWB have converged and restored at the start of the next session
+cached_controls = ["ExposureTime", "AnalogueGain", "ColourGains"]
+
+
+class ExposureCache:
+    """
+    Converged exposure, gain and colour gains per camera and time-of-day slot, kept in a JSON file
+    """
+    def __init__(self, path: str, slot_minutes: int = 30):
+        self.path: str = path
+        self.slot_minutes: int = slot_minutes
+        self.entries: dict = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def __repr__(self):
+        return f"ExposureCache(path={self.path}, slot_minutes={self.slot_minutes}, entries={len(self.entries)})"
+
+    def key(self, camera: str, when: datetime) -> str:
+        """
+        :param camera: str - Camera name
+        :param when: datetime - Session time
+        :return: str - Cache key "<camera>@HH:MM" of the time-of-day slot containing the session time
+        """
+        minutes = (when.hour * 60 + when.minute) // self.slot_minutes * self.slot_minutes
+        return f"{camera}@{minutes // 60:02d}:{minutes % 60:02d}"
+
+    def get(self, camera: str, when: datetime) -> dict:
+        """
+        :param camera: str - Camera name
+        :param when: datetime - Session time
+        :return: dict - Saved controls for the slot, None when there are none yet
+        """
+        return self.entries.get(self.key(camera, when))
+
+    def put(self, camera: str, when: datetime, metadata: dict) -> None:
+        """
+        Saves the converged controls of a camera for the slot
+        :param camera: str - Camera name
+        :param when: datetime - Session time
+        :param metadata: dict - Frame metadata after convergence
+        :return: None
+        """
+        controls = {name: metadata[name] for name in cached_controls if name in metadata}
+        if "ColourGains" in controls:
+            controls["ColourGains"] = list(controls["ColourGains"])
+        self.entries[self.key(camera, when)] = controls
+
+    def save(self) -> None:
+        """
+        Writes the cache atomically so a power cut never leaves a half written file
+        :return: None
+        """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def is_converged(previous: dict, current: dict, tolerance: float) -> bool:
+    """
+    Compares two consecutive frame metadata records: AE/AWB count as converged when the total exposure
+    (ExposureTime * AnalogueGain) and the colour gains stop moving
+    :param previous: dict - Metadata of the previous frame
+    :param current: dict - Metadata of the current frame
+    :param tolerance: float - Largest relative change still counted as steady
+    :return: bool - True when steady
+    """
+    def relative_change(a: float, b: float) -> float:
+        return abs(a - b) / max(abs(b), 1e-9)
+
+    exposure_prev = previous["ExposureTime"] * previous["AnalogueGain"]
+    exposure_cur = current["ExposureTime"] * current["AnalogueGain"]
+    if relative_change(exposure_prev, exposure_cur) > tolerance:
+        return False
+    gains_prev = previous.get("ColourGains", (1.0, 1.0))
+    gains_cur = current.get("ColourGains", (1.0, 1.0))
+    return all(relative_change(p, c) <= tolerance for p, c in zip(gains_prev, gains_cur))
+
+
+def settle_cameras(cameras: dict, cache: ExposureCache, when: datetime, timeout: float = 2.0,
+                   tolerance: float = 0.02, stable_frames: int = 3) -> dict:
+    """
+    Starts every running camera from its cached controls, then waits until its metadata shows AE/AWB
+    convergence instead of sleeping a fixed time; the converged controls are saved for the next session.
+    The cached controls are applied with AE/AWB off, so the first frames are exposed with them instead of being
+    pulled back by the algorithms; once a frame shows them applied, AE/AWB are enabled again to follow the light
+    :param cameras: dict - Started camera backends by name
+    :param cache: ExposureCache - Cache of converged controls
+    :param when: datetime - Session time, selects the time-of-day slot
+    :param timeout: float - Longest wait in seconds, the old fixed settle time
+    :param tolerance: float - Largest relative change between frames counted as steady
+    :param stable_frames: int - Consecutive steady frames needed
+    :return: dict - Per camera: settle time in ms, whether cached controls were used and whether it converged
+    """
+    t0 = time.perf_counter()
+    report, previous, steady, manual = {}, {}, {}, {}
+    for name, camera in cameras.items():
+        saved = cache.get(name, when)
+        if saved and hasattr(camera, "set_controls"):
+            controls = dict(saved)
+            if "ColourGains" in controls:
+                controls["ColourGains"] = tuple(controls["ColourGains"])
+            camera.set_controls(dict(controls, AeEnable=False, AwbEnable=False))
+            manual[name] = controls
+        report[name] = {"from_cache": bool(saved), "converged": False, "settle_ms": None}
+        steady[name] = 0
+
+    pending = {name for name, camera in cameras.items() if hasattr(camera, "capture_metadata")}
+    while pending and time.perf_counter() - t0 < timeout:
+        for name in list(pending):
+            metadata = cameras[name].capture_metadata()  # Blocks until the next frame
+            if name in manual:
+                # Controls take effect a few frames after they are set: AE/AWB stay off until they show
+                if is_converged(manual[name], metadata, tolerance):
+                    cameras[name].set_controls({"AeEnable": True, "AwbEnable": True})
+                    del manual[name]
+                continue
+            if name in previous and is_converged(previous[name], metadata, tolerance):
+                steady[name] += 1
+            else:
+                steady[name] = 0
+            previous[name] = metadata
+            if steady[name] >= stable_frames:
+                report[name].update(converged=True, settle_ms=round((time.perf_counter() - t0) * 1000, 1))
+                cache.put(name, when, metadata)
+                pending.discard(name)
+    # Cameras left in manual mode by the timeout, or without metadata, get their AE/AWB back
+    for name in manual:
+        cameras[name].set_controls({"AeEnable": True, "AwbEnable": True})
+
+    # Cameras without metadata get the full fixed wait
+    if any(not hasattr(camera, "capture_metadata") for camera in cameras.values()):
+        time.sleep(max(timeout - (time.perf_counter() - t0), 0))
+    for name in report:
+        if report[name]["settle_ms"] is None:
+            report[name]["settle_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    cache.save()
+    return report
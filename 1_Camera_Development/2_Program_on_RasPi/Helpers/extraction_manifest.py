@@ -0,0 +1,120 @@
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from Helpers.image_store import file_sha1
+
+schema = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha1 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS processed (
+    path TEXT NOT NULL,
+    layout TEXT NOT NULL,
+    sha1 TEXT NOT NULL,
+    index_version INTEGER NOT NULL,
+    captured_at TEXT NOT NULL,
+    processed_at TEXT NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (path, layout)
+);
+"""
+
+
+class ExtractionManifest:
+    """
+    SQLite manifest of the frames already extracted: for every frame and layout, the content hash of the frame,
+    the index version and the result. A frame is pending when it is new, its content changed, or it was extracted
+    with another layout digest or index version. File hashes are cached by (path, size, mtime), so a run over an
+    unchanged folder costs one directory scan and two queries.
+    """
+    def __init__(self, db_path: str):
+        self.db_path: str = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db = sqlite3.connect(db_path, timeout=30)
+        self.db.executescript(schema)
+
+    def __repr__(self):
+        count = self.db.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
+        return f"ExtractionManifest(db_path={self.db_path}, processed={count})"
+
+    def close(self) -> None:
+        """
+        Closes the manifest database
+        :return: None
+        """
+        self.db.close()
+
+    def scan(self, folder: str, frames: list) -> dict:
+        """
+        Content hashes of the frames, hashing only files that are new or whose size or mtime changed
+        :param folder: str - Folder the frame paths are relative to
+        :param frames: list[str] - Frame paths, e.g. from Helpers/backfill.iter_archive
+        :return: dict - Frame path -> SHA-1 of its content
+        """
+        known = {row[0]: row[1:] for row in self.db.execute("SELECT path, size, mtime_ns, sha1 FROM files")}
+        hashes, changed = {}, []
+        for frame in frames:
+            stat = os.stat(os.path.join(folder, frame))
+            cached = known.get(frame)
+            if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                hashes[frame] = cached[2]
+            else:
+                hashes[frame] = file_sha1(os.path.join(folder, frame))
+                changed.append((frame, stat.st_size, stat.st_mtime_ns, hashes[frame]))
+        gone = [(frame,) for frame in known.keys() - hashes.keys()]
+        if changed or gone:
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO files (path, size, mtime_ns, sha1) VALUES (?, ?, ?, ?)",
+                                    changed)
+                self.db.executemany("DELETE FROM files WHERE path = ?", gone)  # Results of evicted frames stay
+        return hashes
+
+    def pending(self, hashes: dict, layout: str, index_version: int) -> list:
+        """
+        :param hashes: dict - Frame path -> content hash, see scan
+        :param layout: str - Digest of the plot layout, see DataStructures/PlotLayout.digest
+        :param index_version: int - Version of the index formulas and statistics
+        :return: list[str] - Frames that are new or stale for this layout and index version, in path order
+        """
+        done = {row[0]: row[1] for row in self.db.execute(
+            "SELECT path, sha1 FROM processed WHERE layout = ? AND index_version = ?", (layout, index_version))}
+        return sorted(frame for frame, sha1 in hashes.items() if done.get(frame) != sha1)
+
+    def record(self, frame: str, sha1: str, layout: str, index_version: int, captured_at: datetime,
+               result: dict) -> None:
+        """
+        Stores the result of one frame, replacing an earlier result of the same frame and layout
+        :param frame: str - Frame path relative to the scanned folder
+        :param sha1: str - Content hash the result was extracted from
+        :param layout: str - Digest of the plot layout
+        :param index_version: int - Version of the index formulas and statistics
+        :param captured_at: datetime - Capture time of the frame
+        :param result: dict - json serializable result
+        :return: None
+        """
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO processed (path, layout, sha1, index_version, captured_at, "
+                            "processed_at, result) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (frame, layout, sha1, index_version, captured_at.isoformat(),
+                             datetime.now().isoformat(timespec="seconds"), json.dumps(result, separators=(",", ":"))))
+
+    def results(self, layout: str, since: datetime = None, latest: int = None) -> dict:
+        """
+        :param layout: str - Digest of the plot layout
+        :param since: datetime - Only frames captured at or after this time when given
+        :param latest: int - Only the last frames captured when given
+        :return: dict - Frame path -> result, in capture order
+        """
+        query = "SELECT path, result FROM processed WHERE layout = ? AND captured_at >= ? " \
+                "ORDER BY captured_at DESC, path DESC"
+        args = [layout, since.isoformat() if since else ""]
+        if latest is not None:
+            query += " LIMIT ?"
+            args.append(latest)
+        rows = self.db.execute(query, args).fetchall()
+        return {frame: json.loads(result) for frame, result in reversed(rows)}
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from Helpers.daily_rollup import DailyRollups, choose_upload
+from Helpers.drift import DriftTracker
+from Helpers.encoders import decodes_reduced, load_encoder_config, write_frame
+from Helpers.frame_extraction import FrameExtractor
+from Helpers.image_store import ImageStore, file_sha1
+from Helpers.job_runner import Stage
+from Helpers.plot_layouts import MaskCache, load_layouts
+from Helpers.quality_gate import QualityGate
+from Helpers.result_codec import encode_payload
+from Helpers.segmentation import Segmenter
+from Helpers.upload_queue import UploadQueue, Uploader
+from Helpers.vi_engine import vi_names
+from Helpers.vi_extractor import read_frame
+from Helpers.vi_lut import LUTEngine, ndvi_table
+
+replicate = ['rep1', 'rep2', 'rep3', 'rep4', 'rep5']
+
+
+class FieldChain:
+    """
+    The capture -> quality -> extract -> upload stages of one stereo sensor for the job runner. Stages pass file
+    paths and results, never frames, so every job payload is small and survives a restart in the queue. Frames are
+    extracted like 2_extract_ndvi.py does (Helpers/frame_extraction.py), drift-aligned and with every layout.
+    """
+    def __init__(self, camera, folder: str, image_folder: str, layout_file: str, sensor: str, url: str = None,
+                 storage_quota: int = 20 * 1024 ** 3, segmenter: Segmenter = None, gate: QualityGate = None,
+                 drift: bool = True, level: int = 1, link_budget: int = None, upload_vi: bool = False):
+        self.camera = camera  # Started camera backend, e.g. PiCameraStereoBackend or FakeCamera
+        self.folder: str = folder  # Results, caches and databases, /home/pi/MScamera on the sensor
+        self.image_folder: str = image_folder  # Archive of the captured stereo frames
+        self.sensor: str = sensor
+        self.storage_quota: int = storage_quota
+        self.link_budget: int = link_budget  # Uplink bytes per day, as in 2_extract_ndvi.py; None for no limit
+        self.upload_vi: bool = upload_vi  # Frame records carry every index with its histograms when set
+        self.layouts: list = load_layouts(layout_file)
+        self.layout = self.layouts[0]
+        # Key of the rollup contributions, a frame re-extracted under another layout or settings replaces its own
+        settings = hashlib.sha1((repr(segmenter) + repr(gate) + str(level) + str(drift)).encode()).hexdigest()[:8]
+        self.layout_key: str = '+'.join([each.digest for each in self.layouts] + [settings])
+        self.gate: QualityGate = gate
+        # Same tracker folder as 2_extract_ndvi.py, so both align to the sensor's one reference frame
+        tracker = DriftTracker(os.path.join(folder, 'drift'), sensor) if drift else None
+        lut_folder = os.path.join(folder, 'lut')
+        self.extractor: FrameExtractor = FrameExtractor(self.layouts, MaskCache(os.path.join(folder, 'masks')),
+                                                        LUTEngine(vi_names, lut_folder), ndvi_table(lut_folder),
+                                                        tracker, segmenter, level)
+        self.encoders: dict = load_encoder_config(os.path.join(image_folder, 'encoders.json'), sensor)
+        self.queue: UploadQueue = UploadQueue(os.path.join(folder, 'upload_queue.sqlite'))
+        self.store: ImageStore = ImageStore(os.path.join(image_folder, 'index.sqlite'), storage_quota)
+        # Frames whose results the server acknowledged are marked uploaded, the first ones the store evicts
+        self.uploader: Uploader = Uploader(self.queue, url, sensor, store=self.store) if url else None
+        self.frames_path: str = os.path.join(folder, 'ndvi_frames.jsonl')
+        self.written: set = set()  # Frames already in ndvi_frames.jsonl
+        self.latest: list = []  # Results of the last frames that passed the gate, for ndvi.json
+        self.decoded: tuple = None  # (path, frame) decoded in full by the gate, reused by the frame's extract
+        self.load_frames()
+
+    def __repr__(self):
+        return f"FieldChain(sensor={self.sensor}, camera={self.camera}, folder={self.folder}, {self.extractor})"
+
+    def load_frames(self) -> None:
+        """
+        Reads the frames already extracted from ndvi_frames.jsonl, so a restarted chain appends no frame twice and
+        its ndvi.json goes on from the latest frames instead of starting empty. A last line cut by a power loss is
+        cut off the file; its frame is written again when its job is resumed
+        :return: None
+        """
+        if not os.path.exists(self.frames_path):
+            return
+        latest = {}
+        complete = 0  # Bytes up to the end of the last whole line
+        with open(self.frames_path, 'rb') as frames_file:
+            for line in frames_file:
+                if not line.endswith(b'\n'):
+                    break
+                complete += len(line)
+                result = json.loads(line)
+                self.written.add(result['frame'])
+                if result['quality']['passed']:
+                    latest.pop(result['frame'], None)  # The last line of a frame wins
+                    latest[result['frame']] = result
+                    if len(latest) > len(replicate):
+                        del latest[next(iter(latest))]
+        if complete < os.path.getsize(self.frames_path):
+            os.truncate(self.frames_path, complete)
+        self.latest = list(latest.values())
+
+    def close(self) -> None:
+        """
+        Closes the upload queue and the image store
+        :return: None
+        """
+        self.queue.close()
+        self.store.close()
+
+    def capture(self, payload: dict) -> dict:
+        """
+        Captures and archives one stereo frame
+        :param payload: dict - Unused, capture jobs are submitted by the schedule
+        :return: dict - {"path", "timestamp"} of the archived frame
+        """
+        when = datetime.now()
+        frame = self.camera.capture_array()
+        day_folder = os.path.join(self.image_folder, when.strftime('%Y-%m-%d'))
+        os.makedirs(day_folder, exist_ok=True)
+        # Stereo archive naming, <dd-mm-YYYY_HH-MM-SS>_<n>, numbered when several frames share a second
+        stem = when.strftime('%d-%m-%Y_%H-%M-%S')
+        number = 1
+        while any(name.startswith(f"{stem}_{number}.") for name in os.listdir(day_folder)):
+            number += 1
+        path = write_frame(os.path.join(day_folder, f"{stem}_{number}"), frame, self.encoders['archive'])
+        self.store.register(path, 'stereo', when)
+        return {'path': path, 'timestamp': stem}
+
+    def quality(self, payload: dict) -> dict:
+        """
+        Scores the frame on a reduced decode; rejected frames end their chain here
+        :param payload: dict - From capture
+        :return: dict - The payload with its "quality" report, None when rejected
+        """
+        if self.gate is None:
+            return dict(payload, quality={'passed': True, 'reasons': []})
+        frame = payload['path']
+        if not decodes_reduced(frame):
+            # PNG and WebP have no reduced decode: decoded once here and kept for extract
+            frame = read_frame(frame)
+            self.decoded = (payload['path'], frame)
+        report = self.gate.check(frame, self.layout.crop)
+        if not report['passed']:
+            print(f"Rejected {os.path.basename(payload['path'])}: {', '.join(report['reasons'])}")
+            self.decoded = None
+            return None
+        return dict(payload, quality=report)
+
+    def extract(self, payload: dict) -> dict:
+        """
+        Extracts the ndvi and every index of the frame, adds it to the daily rollups and ndvi_frames.jsonl and
+        rewrites ndvi.json with the latest frames for Node-RED. The rollups key the frame by its content hash and skip
+        it when they already hold these statistics, and the line is only appended for a frame not in the file yet,
+        so a job cut at any point and run again adds the frame once to both
+        :param payload: dict - From quality
+        :return: dict - Frame result, as in ndvi_frames.jsonl, and the image "path"
+        """
+        frame = payload['path']
+        if self.decoded is not None and self.decoded[0] == frame:
+            frame = self.decoded[1]
+        self.decoded = None
+        result = self.extractor.extract(frame, payload['timestamp'], payload['quality'])
+        result['frame'] = os.path.basename(payload['path'])
+        rollups = DailyRollups(os.path.join(self.folder, 'rollups.sqlite'))
+        rollups.add(result, file_sha1(payload['path']), self.layout_key)
+        rollups.close()
+        if result['frame'] not in self.written:
+            with open(self.frames_path, 'a') as frames_file:
+                frames_file.write(json.dumps(result, separators=(',', ':')) + '\n')
+            self.written.add(result['frame'])
+        self.latest = ([each for each in self.latest if each['frame'] != result['frame']] + [result])[-len(replicate):]
+        final_data = dict(zip(replicate, [each['ndvi'] for each in self.latest]))
+        final_data['drift'] = [each.get('drift') for each in self.latest]
+        final_data['frames'] = [each['frame'] for each in self.latest]
+        final_data['quality'] = [each['quality'] for each in self.latest]
+        final_data['levels'] = [each['level'] for each in self.latest]
+        if 'layouts' in result:
+            final_data['layouts'] = dict(zip(replicate, [each.get('layouts') for each in self.latest]))
+        with open(os.path.join(self.folder, 'ndvi.json'), 'w') as json_file:
+            json.dump(final_data, json_file, indent=6)
+        return dict(result, path=payload['path'])
+
+    def upload(self, payload: dict) -> None:
+        """
+        Queues the frame record and sends what the link takes, with the same choice as 2_extract_ndvi.py: under a
+        link budget the rollups of the finished days come first, then the frame while it fits today's budget, the
+        rest stays on the device. The record is keyed by the frame name, so a retried job queues it once. While the
+        link is down the records stay queued and the uploader's own backoff paces the next attempts
+        :param payload: dict - From extract
+        :return: None
+        """
+        name = os.path.basename(payload['path'])
+        if not self.queue.queued(name):
+            # The ndvi statistics and the frame's report; vi (every index and histogram) only with upload_vi
+            record = {key: value for key, value in payload.items() if key != 'path' and (key != 'vi' or self.upload_vi)}
+            detail_bytes = len(encode_payload(record))
+            day = datetime.now().strftime('%Y-%m-%d')
+            rollups = DailyRollups(os.path.join(self.folder, 'rollups.sqlite'))
+            days = rollups.dirty_days(before=day) if self.link_budget else []
+            rollup_data = rollups.payload(days)
+            rollup_bytes = len(encode_payload(rollup_data)) if days else 0
+            upload = choose_upload(detail_bytes, rollup_bytes, rollups.spent(day), self.link_budget)
+            if 'rollup' in upload:
+                self.queue.put('rollup', rollup_data)
+                rollups.mark_queued(days)
+                rollups.spend(day, rollup_bytes)
+            if 'detail' in upload:
+                self.queue.put('frame', record, [payload['path']], key=name)
+                rollups.spend(day, detail_bytes)
+            else:
+                print(f"Link budget of {self.link_budget} bytes used up today, {name} stays on the device")
+            rollups.close()
+        if self.uploader is not None:
+            self.uploader.drain()
+        return None
+
+
+def chain_stages(chain: FieldChain = None) -> list:
+    """
+    :param chain: FieldChain - Stage functions, None for the graph alone (e.g. to read the metrics)
+    :return: list[Stage] - The capture -> quality -> extract -> upload graph with the cost of every stage on a
+                           Raspberry Pi 4: cores kept busy and watts above idle (camera, SD card, modem)
+    """
+    def fn(name):
+        return getattr(chain, name) if chain is not None else None
+
+    return [Stage('capture', fn('capture'), ['quality'], cpu=0.5, power=1.5),
+            Stage('quality', fn('quality'), ['extract'], cpu=1.0, power=0.5, concurrency=2),
+            Stage('extract', fn('extract'), ['upload'], cpu=1.0, power=1.0),  # The LUT engine has one buffer
+            Stage('upload', fn('upload'), [], cpu=0.2, power=2.0, max_attempts=5)]
@@ -0,0 +1,156 @@
+import math
+
+import numpy as np
+
+from DataStructures.histogram_spec import HistogramSpec
+from Helpers.order_stats import order_ranks
+from Helpers.plot_labels import plot_groups
+from Helpers.segmentation import Segmenter
+from Helpers.vi_extractor import plot_dicts, plot_names, plot_polygons
+from Helpers.vi_lut import pair_key, vi_channels
+
+# Fixed-point ndvi: a value v is stored as the int16 round(v * scale), so [-1, 31.999] at a step of 1/1024
+scale_bits = 10
+scale = 1 << scale_bits
+fixed_max = np.iinfo(np.int16).max  # Larger values (red near 0) are clipped, the float path gives up to inf there
+# Extra bits of the calibration gain 1.664 / 0.953, so its rounding stays far below one step; the products
+# gain * b stay within int32
+gain_bits = 12
+ndvi_gain = round(1.664 / 0.953 * scale * (1 << gain_bits))
+# Largest difference between a fixed-point value (not clipped) and the float64 ndvi: half a step for the final
+# rounding plus the gain rounding, or one step for the smallest positive values, kept at one step so that
+# "> 0" selects exactly the pixels the float path keeps. The plot statistics (mean, std, median, max and
+# percentiles) of a plot without clipped pixels inherit the same bound: the mapping preserves order, so order
+# statistics move by at most one pixel error, and the mean and std of values each within e of the exact ones are
+# within e themselves. A clipped pixel (ndvi above 31.999, or inf where R = 0) has no bound: every plot reports
+# the share of its pixels that were clipped under "clipped".
+error_bound = 1 / scale
+
+
+def fixed_ndvi_table() -> np.ndarray:
+    """
+    ndvi of every pair of 8-bit B and R values in int32 arithmetic only:
+    q = round(ndvi_gain * b / r / 2**gain_bits) - scale, clipped to int16; positive ndvi (1664 b > 953 r,
+    exactly) maps to q >= 1 and the rest to q <= 0, B = R = 0 (NaN in the float path) to 0
+    :return: np.ndarray - int16 table of 65536 values indexed by (B << 8) | R, like ndvi_table
+    """
+    b = np.repeat(np.arange(256, dtype=np.int32), 256)
+    r = np.tile(np.arange(256, dtype=np.int32), 256)
+    ratio = (ndvi_gain * b) // np.maximum(r, 1)
+    q = ((ratio + (1 << (gain_bits - 1))) >> gain_bits) - scale
+    positive = 1664 * b > 953 * r
+    q = np.where(positive, np.maximum(q, 1), np.minimum(q, 0))
+    q[r == 0] = np.where(b[r == 0] > 0, fixed_max, 0)
+    return np.clip(q, -scale, fixed_max).astype(np.int16)
+
+
+def lookup_fixed(img: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """
+    :param img: np.ndarray - Cropped BGR uint8 frame
+    :param table: np.ndarray - Table from fixed_ndvi_table
+    :return: np.ndarray - int16 fixed-point ndvi image, 2 bytes per pixel instead of 8
+    """
+    return np.take(table, pair_key(img, vi_channels["ndvi"]), mode="clip")
+
+
+def segment_fixed(ndvi: np.ndarray, img: np.ndarray, segmenter: Segmenter, polygons: list = plot_polygons) -> tuple:
+    """
+    segment_frame on a fixed-point ndvi: the segmenter runs on the integer values with its thresholds and range
+    scaled, so the Otsu histogram has the same bins; the threshold can still move by one bin when a value lies
+    on a bin edge
+    :param ndvi: np.ndarray - int16 image from lookup_fixed
+    :param img: np.ndarray - Cropped BGR frame, used by the excess green method
+    :param segmenter: Segmenter - Segmentation method
+    :param polygons: list - Plot polygons in cropped image coordinates
+    :return: tuple - (bool per gathered plot pixel, threshold in ndvi units), for fixed_plot_stats
+    """
+    groups = plot_groups(polygons, ndvi.shape)
+    if segmenter.method == "exg":
+        return segmenter.classify(None, img.reshape(-1, img.shape[2])[groups.index])
+    scaled = Segmenter(segmenter.method, None if segmenter.threshold is None else segmenter.threshold * scale,
+                       tuple(value * scale for value in segmenter.value_range), segmenter.bins,
+                       None if segmenter.floor is None else segmenter.floor * scale)
+    vegetation, threshold = scaled.classify(groups.gather(ndvi))
+    return vegetation, threshold / scale
+
+
+def fixed_grouped_stats(values: np.ndarray, plot_ids: np.ndarray, count: int, percentiles: list = (95, 90, 85),
+                        histogram: HistogramSpec = None, vegetation: np.ndarray = None) -> dict:
+    """
+    grouped_stats on fixed-point values: counts, sums and sums of squares are accumulated as integers and the
+    order statistics are read from an int16 partition of each plot; values are converted to ndvi units only in
+    the returned per-plot arrays, within error_bound of grouped_stats on the float64 ndvi for plots without clipped
+    pixels
+    :param values: np.ndarray - Gathered int16 plot pixel values
+    :param plot_ids: np.ndarray - Plot of every value, non-decreasing
+    :param count: int - Number of plots
+    :param percentiles: list[float] - Percentiles to report, linear interpolation like np.nanpercentile
+    :param histogram: HistogramSpec - Bins of the per-plot histograms, none are computed when not given; a value
+                                      within error_bound of a bin edge may be counted in the neighbouring bin
+    :param vegetation: np.ndarray - Bool per value from segment_fixed: only vegetation pixels are summarized
+    :return: dict - Same arrays as grouped_stats, and "clipped", the share of each plot's valid pixels clipped at
+                    fixed_max; the statistics of a plot with clipped pixels may be off by more than error_bound
+    """
+    keep = values > 0
+    if vegetation is not None:
+        keep &= vegetation
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cover = np.bincount(plot_ids, keep, minlength=count) / np.bincount(plot_ids, minlength=count)
+    values = values[keep]
+    plot_ids = plot_ids[keep]
+    n = np.bincount(plot_ids, minlength=count)
+
+    stats = {"count": n}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stats["clipped"] = np.bincount(plot_ids, values == fixed_max, minlength=count) / n
+    for name in ["mean", "std"] + list(order_ranks(1, percentiles)):
+        stats[name] = np.full(count, np.nan)
+    if vegetation is not None:
+        stats["cover"] = cover
+    if histogram is not None:
+        # Integer bins: the bin edges low + i * width scaled to fixed point
+        low, span = round(histogram.low * scale), round((histogram.high - histogram.low) * scale)
+        position = np.clip((values.astype(np.int32) - low) * histogram.bins // span, 0, histogram.bins)
+        width = histogram.bins + 1
+        cells = plot_ids * width + position
+        stats["hist"] = np.bincount(cells, minlength=count * width).astype(np.uint32).reshape(count, width)
+    ends = np.cumsum(n)
+    for plot in range(count):
+        size = int(n[plot])
+        if size == 0:
+            continue
+        segment = values[ends[plot] - size:ends[plot]]  # values is already a private copy
+        wide = segment.astype(np.int64)
+        total, squares = int(wide.sum()), int(np.dot(wide, wide))  # Exact, Python ints do not overflow
+        stats["mean"][plot] = total / (size * scale)
+        stats["std"][plot] = math.sqrt(size * squares - total * total) / (size * scale)
+        ranks = order_ranks(size, percentiles)
+        segment.partition(sorted({rank for low, high, _ in ranks.values() for rank in (low, high)}))
+        for name, (low, high, fraction) in ranks.items():
+            below, above = int(segment[low]), int(segment[high])
+            if name == "median":
+                stats[name][plot] = (below + above) / (2 * scale)
+            else:
+                stats[name][plot] = (below + (above - below) * fraction) / scale
+    return stats
+
+
+def fixed_plot_stats(ndvi: np.ndarray, timestamp: str, polygons: list = plot_polygons, names: list = plot_names,
+                     histogram: HistogramSpec = None, segmentation: tuple = None) -> dict:
+    """
+    extract_plot_stats for a fixed-point ndvi image, with the same output plus the "clipped" share of every plot
+    :param ndvi: np.ndarray - int16 image from lookup_fixed
+    :param timestamp: str - Timestamp stored with every plot
+    :param polygons: list - Plot polygons in cropped image coordinates
+    :param names: list[str] - Plot name of every polygon
+    :param histogram: HistogramSpec - When given, each plot also gets its histogram under "hist"
+    :param segmentation: tuple - From segment_fixed
+    :return: dict - Plot name -> dict of the stat_header values and "clipped"
+    """
+    groups = plot_groups(polygons, ndvi.shape)
+    vegetation, threshold = segmentation or (None, None)
+    stats = fixed_grouped_stats(groups.gather(ndvi), groups.plot_ids, groups.count, histogram=histogram,
+                                vegetation=vegetation)
+    if segmentation is not None:
+        stats["threshold"] = np.full(groups.count, threshold)
+    return plot_dicts(stats, timestamp, names, histogram)
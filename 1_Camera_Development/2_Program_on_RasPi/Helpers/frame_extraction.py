@@ -0,0 +1,91 @@
+import numpy as np
+
+from Helpers.drift import DriftTracker
+from Helpers.fixed_point import fixed_plot_stats, lookup_fixed, segment_fixed
+from Helpers.multi_resolution import read_level, reduce_image
+from Helpers.plot_layouts import MaskCache
+from Helpers.quality_gate import gate_passed
+from Helpers.segmentation import Segmenter
+from Helpers.vi_extractor import extract_indices, extract_layouts, extract_plot_stats, extract_tiled, prepare_crop, \
+    read_frame, segment_frame
+from Helpers.vi_lut import LUTEngine, lookup_ndvi
+
+
+class FrameExtractor:
+    """
+    Extracts one frame with every plot layout of a sensor: drift alignment, pyramid level, segmentation and the
+    float, fixed-point or memory-bounded ndvi path of the first layout, all indices, and the ndvi of any further
+    layouts. Shared by 2_extract_ndvi.py and the job runner's extract stage, so both write the same results.
+    """
+    def __init__(self, layouts: list, masks: MaskCache, engine: LUTEngine, ndvi_lut: np.ndarray,
+                 tracker: DriftTracker = None, segmenter: Segmenter = None, level: int = 1, memory_budget: int = None,
+                 ndvi_fixed: np.ndarray = None):
+        if memory_budget and segmenter:
+            raise ValueError("Segmentation needs the full-size index images, set segmenter = None to use "
+                             "memory_budget")
+        self.layouts: list = layouts  # PlotLayout list, the first one feeds ndvi and vi
+        self.layout = layouts[0]
+        self.level_layout = self.layout.scaled(level)  # Plot polygons on the reduced crop
+        self.masks: MaskCache = masks
+        self.engine: LUTEngine = engine
+        self.ndvi_lut: np.ndarray = ndvi_lut
+        self.tracker: DriftTracker = tracker  # None skips the drift alignment
+        self.segmenter: Segmenter = segmenter
+        self.level: int = level
+        self.memory_budget: int = memory_budget
+        self.ndvi_fixed: np.ndarray = ndvi_fixed  # Fixed-point table, the integer ndvi path is used when given
+
+    def __repr__(self):
+        return (f"FrameExtractor(layouts={[layout.name for layout in self.layouts]}, level={self.level}, "
+                f"drift={self.tracker is not None}, segmenter={self.segmenter}, memory_budget={self.memory_budget}, "
+                f"fixed_point={self.ndvi_fixed is not None})")
+
+    def extract(self, frame, timestamp: str, quality: dict = None) -> dict:
+        """
+        :param frame: str or np.ndarray - Image path of a frame that passed the quality gate, or the frame already
+                                          decoded for the gate
+        :param timestamp: str - Timestamp stored with every plot
+        :param quality: dict - Quality report stored with the result
+        :return: dict - "ndvi" plot statistics of the first layout, "vi" all indices, "drift" report (None without
+                        a tracker), "quality", "level", and "layouts" with the ndvi of any further layouts
+        """
+        layout, level_layout, level, tracker = self.layout, self.level_layout, self.level, self.tracker
+        # Crop and extract the ndvi of every plot of the layout
+        if level > 1 and tracker is None and len(self.layouts) == 1 and isinstance(frame, str):
+            img = read_level(frame, layout.crop, level)  # JPEG decoded at the reduced size, no full-resolution decode
+        else:
+            frame = read_frame(frame)
+            img = reduce_image(prepare_crop(frame, crop=layout.crop, tracker=tracker, gated=gate_passed(quality)),
+                               level)
+        self.masks.groups(level_layout, img.shape)  # Loads the compiled masks instead of rasterizing the polygons
+        segmentation = None
+        if self.memory_budget:
+            ndvi_data = extract_tiled(img, lambda pairs: lookup_ndvi(pairs, self.ndvi_lut), timestamp,
+                                      self.memory_budget, level_layout.polygons, level_layout.plot_ids)
+        elif self.ndvi_fixed is not None:
+            ndvi = lookup_fixed(img, self.ndvi_fixed)
+            if self.segmenter:
+                segmentation = segment_fixed(ndvi, img, self.segmenter, level_layout.polygons)
+            ndvi_data = fixed_plot_stats(ndvi, timestamp, level_layout.polygons, level_layout.plot_ids,
+                                         segmentation=segmentation)
+        else:
+            ndvi = lookup_ndvi(img, self.ndvi_lut)
+            if self.segmenter:
+                segmentation = segment_frame(ndvi, img, self.segmenter, level_layout.polygons)
+            ndvi_data = extract_plot_stats(ndvi, timestamp, level_layout.polygons, level_layout.plot_ids,
+                                           segmentation=segmentation)
+        # Statistics and per-plot histograms of all vegetation indices, kept out of the Node-RED payload
+        vi_data = extract_indices(img, timestamp, self.engine, level_layout.polygons, level_layout.plot_ids,
+                                  segmentation=segmentation, memory_budget=self.memory_budget)
+        drift = tracker.last_report if tracker else None
+        result = {'ndvi': ndvi_data, 'vi': vi_data, 'drift': drift, 'quality': quality, 'level': level}
+        if len(self.layouts) > 1:
+            # Polygons scaled to the level, and the crops reduced after the (shared) drift alignment like the first
+            trackers = {each.name: tracker for each in self.layouts[1:] if tracker and each.crop == layout.crop}
+            result['layouts'] = extract_layouts(frame, timestamp, [each.scaled(level) for each in self.layouts[1:]],
+                                                self.masks,
+                                                lambda crop: lookup_ndvi(reduce_image(crop, level), self.ndvi_lut),
+                                                trackers)
+        if drift and drift['maintenance']:
+            print(f"Camera drifted {drift['drift']} px from its reference, check the mount")
+        return result
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from Helpers.encoders import extensions
+
+# Every format write_frame produces, and .jpeg from other tools
+image_extensions = tuple(extensions.values()) + (".jpeg",)
+
+schema = """
+CREATE TABLE IF NOT EXISTS frames (
+    path TEXT PRIMARY KEY,
+    camera TEXT NOT NULL,
+    captured_at TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    uploaded INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS frames_by_time ON frames (camera, captured_at);
+"""
+
+
+class ImageStore:
+    """
+    Byte-quota image store with a SQLite index of every stored frame
+    """
+    def __init__(self, db_path: str, quota_bytes: int, keep_recent_hours: float = 48):
+        self.db_path: str = db_path
+        self.quota_bytes: int = quota_bytes
+        self.keep_recent_hours: float = keep_recent_hours  # Never evicted, uploaded or not
+        self.lock = threading.Lock()  # The archive writer thread registers frames too
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.db.executescript(schema)
+
+    def __repr__(self):
+        return f"ImageStore(db_path={self.db_path}, quota_bytes={self.quota_bytes}, used_bytes={self.used_bytes()})"
+
+    def close(self) -> None:
+        """
+        Closes the index database
+        :return: None
+        """
+        self.db.close()
+
+    def register(self, path: str, camera: str, captured_at: datetime, enforce: bool = True) -> list:
+        """
+        Adds a written file to the index and evicts old frames if the quota is exceeded
+        :param path: str - Path of the written image
+        :param camera: str - Camera name, e.g. "rgb", "nir" or "stereo"
+        :param captured_at: datetime - Capture time
+        :param enforce: bool - Run the eviction policy after registering
+        :return: list[str] - Paths evicted to make room
+        """
+        path = os.path.abspath(path)
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO frames (path, camera, captured_at, size, sha1, uploaded) "
+                            "VALUES (?, ?, ?, ?, ?, 0)",
+                            (path, camera, captured_at.isoformat(), os.path.getsize(path), file_sha1(path)))
+        return self.enforce_quota() if enforce else []
+
+    def mark_uploaded(self, path: str) -> None:
+        """
+        Records that a frame reached the server, which makes it the first choice for eviction
+        :param path: str - Path of the frame
+        :return: None
+        """
+        with self.lock, self.db:
+            self.db.execute("UPDATE frames SET uploaded = 1 WHERE path = ?", (os.path.abspath(path),))
+
+    def used_bytes(self) -> int:
+        """
+        :return: int - Total size of the indexed frames
+        """
+        with self.lock:
+            return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM frames").fetchone()[0]
+
+    def frames_between(self, start: datetime, end: datetime, camera: str = None) -> list:
+        """
+        Looks up the frames captured in [start, end) from the index
+        :param start: datetime - Start of the window
+        :param end: datetime - End of the window (excluded)
+        :param camera: str - Only frames of this camera when given
+        :return: list[str] - Frame paths in capture order
+        """
+        query = "SELECT path FROM frames WHERE captured_at >= ? AND captured_at < ?"
+        args = [start.isoformat(), end.isoformat()]
+        if camera is not None:
+            query += " AND camera = ?"
+            args.append(camera)
+        with self.lock:
+            return [row[0] for row in self.db.execute(query + " ORDER BY captured_at, path", args)]
+
+    def frames_in_hour(self, when: datetime, camera: str = None) -> list:
+        """
+        Looks up the frames captured in the same hour as the given time
+        :param when: datetime - Any time inside the hour
+        :param camera: str - Only frames of this camera when given
+        :return: list[str] - Frame paths in capture order
+        """
+        start = when.replace(minute=0, second=0, microsecond=0)
+        return self.frames_between(start, start + timedelta(hours=1), camera)
+
+    def enforce_quota(self, now: datetime = None) -> list:
+        """
+        Deletes frames until the store fits its quota: frames from the last keep_recent_hours are kept, then the
+        oldest uploaded frames go first and the oldest not yet uploaded ones only after those
+        :param now: datetime - Current time, defaults to datetime.now()
+        :return: list[str] - Paths of the deleted frames
+        """
+        excess = self.used_bytes() - self.quota_bytes
+        if excess <= 0:
+            return []
+        cutoff = ((now or datetime.now()) - timedelta(hours=self.keep_recent_hours)).isoformat()
+        with self.lock:
+            candidates = self.db.execute("SELECT path, size FROM frames WHERE captured_at < ? "
+                                         "ORDER BY uploaded DESC, captured_at, path", (cutoff,)).fetchall()
+        evicted = []
+        for path, size in candidates:
+            if excess <= 0:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            evicted.append(path)
+            excess -= size
+        with self.lock, self.db:
+            self.db.executemany("DELETE FROM frames WHERE path = ?", [(path,) for path in evicted])
+        return evicted
+
+    def forget_missing(self) -> int:
+        """
+        Drops index rows whose file was removed outside the store
+        :return: int - Number of dropped rows
+        """
+        with self.lock:
+            paths = [row[0] for row in self.db.execute("SELECT path FROM frames")]
+        missing = [(path,) for path in paths if not os.path.exists(path)]
+        with self.lock, self.db:
+            self.db.executemany("DELETE FROM frames WHERE path = ?", missing)
+        return len(missing)
+
+    def import_folder(self, folder: str, camera: str) -> int:
+        """
+        One-off registration of frames written before the store existed, using the file time as capture time
+        :param folder: str - Folder to walk
+        :param camera: str - Camera name of every file found
+        :return: int - Number of newly registered files
+        """
+        with self.lock:
+            known = {row[0] for row in self.db.execute("SELECT path FROM frames")}
+        count = 0
+        for root, _, files in os.walk(folder):
+            for name in sorted(files):
+                path = os.path.abspath(os.path.join(root, name))
+                if path not in known and name.lower().endswith(image_extensions):
+                    self.register(path, camera, datetime.fromtimestamp(os.path.getmtime(path)), enforce=False)
+                    count += 1
+        self.enforce_quota()
+        return count
+
+
+def file_sha1(path: str) -> str:
+    """
+    :param path: str - File to hash
+    :return: str - Hex SHA-1 of the file content
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,290 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import traceback
+
+import numpy as np
+
+schema = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stage TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    origin REAL NOT NULL,
+    created_at REAL NOT NULL,
+    ready_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, ready_at);
+"""
+
+
+class Stage:
+    """
+    One step of the job graph: a function taking the payload dict of a job and returning the payload of the next
+    stages (a dict, a list of dicts for several jobs, or None to end the chain there), with what it costs to run
+    """
+    def __init__(self, name: str, fn, downstream: list = (), cpu: float = 1.0, power: float = 0.0,
+                 concurrency: int = 1, max_attempts: int = 3):
+        self.name: str = name
+        self.fn = fn
+        self.downstream: list = list(downstream)  # Stage names every output is passed to
+        self.cpu: float = cpu  # Cores the stage keeps busy
+        self.power: float = power  # Watts drawn on top of the idle board, e.g. the camera or the modem
+        self.concurrency: int = concurrency  # Jobs of this stage running at once, 1 for a camera or a shared buffer
+        self.max_attempts: int = max_attempts
+
+    def __repr__(self):
+        return (f"Stage(name={self.name}, downstream={self.downstream}, cpu={self.cpu}, power={self.power}, "
+                f"concurrency={self.concurrency})")
+
+
+class JobRunner:
+    """
+    On-device runner of a job graph (e.g. capture -> quality -> extract -> upload) over a durable SQLite queue.
+    A job's outputs are queued for the next stages as soon as it finishes; ready jobs of independent stages run
+    in threads side by side as long as the running stages fit the CPU and power budgets, stages nearer the end of
+    the graph first so work in flight is finished before new work is started. A failed job is retried with an
+    exponential, jittered delay; jobs left running by a crash or power cut are run again at the next start.
+    """
+    def __init__(self, db_path: str, stages: list, cpu_budget: float = None, power_budget: float = None,
+                 base_delay: float = 5.0, max_delay: float = 600.0):
+        self.db_path: str = db_path
+        self.stages: dict = {stage.name: stage for stage in stages}
+        self.cpu_budget: float = cpu_budget or os.cpu_count()
+        self.power_budget: float = power_budget  # Watts, no limit when None
+        self.base_delay: float = base_delay
+        self.max_delay: float = max_delay
+        self.depth: dict = self.stage_depths()
+        self.lock = threading.Lock()
+        self.wake = threading.Event()  # Set when a job finished or was submitted
+        self.running: dict = {}  # Job id -> Stage
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.db.executescript(schema)
+
+    def __repr__(self):
+        return (f"JobRunner(db_path={self.db_path}, stages={list(self.stages)}, cpu_budget={self.cpu_budget}, "
+                f"power_budget={self.power_budget})")
+
+    def close(self) -> None:
+        """
+        Closes the queue database, after run or run_until_idle returned
+        :return: None
+        """
+        self.db.close()
+
+    def stage_depths(self) -> dict:
+        """
+        :return: dict - Stage name -> length of the longest path from a source stage, raises on a cycle or an
+                        unknown downstream stage
+        """
+        depth = {}
+
+        def visit(name, path):
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage {name} downstream of {path[-1]}")
+            if name in path:
+                raise ValueError(f"Cycle in the job graph: {' -> '.join(path + [name])}")
+            depth[name] = max(depth.get(name, 0), len(path))
+            for child in self.stages[name].downstream:
+                visit(child, path + [name])
+
+        for name in self.stages:
+            visit(name, [])
+        return depth
+
+    def submit(self, stage: str, payload: dict, delay: float = 0.0, origin: float = None) -> int:
+        """
+        Queues one job
+        :param stage: str - Stage name
+        :param payload: dict - json serializable input of the stage
+        :param delay: float - Seconds before the job may start
+        :param origin: float - time.time() the chain started, for the end-to-end latency; now by default
+        :return: int - Job id
+        """
+        if stage not in self.stages:
+            raise ValueError(f"Unknown stage {stage}")
+        now = time.time()
+        with self.lock, self.db:
+            job_id = self.db.execute("INSERT INTO jobs (stage, payload, origin, created_at, ready_at) "
+                                     "VALUES (?, ?, ?, ?, ?)",
+                                     (stage, json.dumps(payload), origin or now, now, now + delay)).lastrowid
+        self.wake.set()
+        return job_id
+
+    def recover(self) -> int:
+        """
+        Makes the jobs left running by a previous process ready again
+        :return: int - Number of jobs recovered
+        """
+        with self.lock, self.db:
+            return self.db.execute("UPDATE jobs SET state = 'pending', ready_at = ? WHERE state = 'running'",
+                                   (time.time(),)).rowcount
+
+    def fits(self, stage: Stage) -> bool:
+        """
+        :param stage: Stage - Stage of a ready job
+        :return: bool - The job can start next to the running ones; with nothing running any job can start
+        """
+        running = list(self.running.values())
+        if not running:
+            return True
+        if sum(1 for other in running if other is stage) >= stage.concurrency:
+            return False
+        if sum(other.cpu for other in running) + stage.cpu > self.cpu_budget:
+            return False
+        if self.power_budget is not None and sum(other.power for other in running) + stage.power > self.power_budget:
+            return False
+        return True
+
+    def step(self) -> int:
+        """
+        Starts every ready job that fits the budgets
+        :return: int - Number of jobs started
+        """
+        started = 0
+        with self.lock:
+            ready = self.db.execute("SELECT id, stage, payload, attempts FROM jobs WHERE state = 'pending' AND "
+                                    "ready_at <= ? ORDER BY id", (time.time(),)).fetchall()
+            ready.sort(key=lambda job: -self.depth[job[1]])  # Stable: oldest first within a stage depth
+            for job_id, name, payload, attempts in ready:
+                stage = self.stages[name]
+                if not self.fits(stage):
+                    continue
+                with self.db:
+                    self.db.execute("UPDATE jobs SET state = 'running', attempts = ?, started_at = ? WHERE id = ?",
+                                    (attempts + 1, time.time(), job_id))
+                self.running[job_id] = stage
+                threading.Thread(target=self.work, args=(job_id, stage, json.loads(payload), attempts + 1),
+                                 daemon=True).start()
+                started += 1
+        return started
+
+    def work(self, job_id: int, stage: Stage, payload: dict, attempt: int) -> None:
+        """
+        Runs one job in its thread and records the outcome: outputs are queued for the downstream stages in the
+        same transaction that marks the job done
+        :param job_id: int - Job id
+        :param stage: Stage - Stage of the job
+        :param payload: dict - Input of the stage
+        :param attempt: int - 1 for the first run
+        :return: None
+        """
+        try:
+            output = stage.fn(payload)
+            error = None
+        except Exception:
+            output, error = None, traceback.format_exc(limit=3)
+        now = time.time()
+        outputs = [] if output is None else output if isinstance(output, list) else [output]
+        with self.lock, self.db:
+            if error is None:
+                origin = self.db.execute("SELECT origin FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+                self.db.execute("UPDATE jobs SET state = 'done', finished_at = ?, error = NULL WHERE id = ?",
+                                (now, job_id))
+                self.db.executemany("INSERT INTO jobs (stage, payload, origin, created_at, ready_at) "
+                                    "VALUES (?, ?, ?, ?, ?)",
+                                    [(child, json.dumps(item), origin, now, now)
+                                     for item in outputs for child in stage.downstream])
+            elif attempt < stage.max_attempts:
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                self.db.execute("UPDATE jobs SET state = 'pending', ready_at = ?, error = ? WHERE id = ?",
+                                (now + delay, error, job_id))
+            else:
+                self.db.execute("UPDATE jobs SET state = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                                (now, error, job_id))
+            del self.running[job_id]
+        if error is not None:
+            print(f"{stage.name} job {job_id} failed (attempt {attempt} of {stage.max_attempts}): "
+                  f"{error.strip().splitlines()[-1]}")
+        self.wake.set()
+
+    def next_ready(self) -> float:
+        """
+        :return: float - Seconds until the next delayed job is ready, None when no job is pending
+        """
+        row = self.db.execute("SELECT MIN(ready_at) FROM jobs WHERE state = 'pending'").fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def run(self, stop: threading.Event, idle: float = 1.0) -> None:
+        """
+        Runs jobs until stopped, waking up as soon as a job finishes or is submitted
+        :param stop: threading.Event - Set to stop; running jobs are finished first
+        :param idle: float - Longest wait between queue checks
+        :return: None
+        """
+        self.recover()
+        while not stop.is_set():
+            self.wake.clear()
+            self.step()
+            with self.lock:
+                wait = self.next_ready()
+            self.wake.wait(idle if wait is None else min(idle, wait))
+        while self.running:
+            self.wake.clear()
+            self.wake.wait(idle)
+
+    def run_until_idle(self, timeout: float = None) -> bool:
+        """
+        Runs jobs until none is pending or running, waiting out the retry delays
+        :param timeout: float - Seconds to give up after, none by default
+        :return: bool - True when the queue drained, False on timeout
+        """
+        self.recover()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.wake.clear()
+            self.step()
+            with self.lock:
+                wait = self.next_ready()
+                if wait is None and not self.running:
+                    return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            self.wake.wait(1.0 if wait is None else min(1.0, wait))
+
+    def metrics(self, window: int = 100) -> dict:
+        """
+        Per-stage queue depth and latency over the last jobs of every stage
+        :param window: int - Finished jobs per stage the latencies are computed over
+        :return: dict - Stage name -> {"pending", "running", "done", "failed", "retries", "wait_ms" and "run_ms"
+                        (mean and p95 time ready-to-start and start-to-finish), "chain_ms" (mean and p95 time since
+                        the chain started, at the end of this stage)}
+        """
+        with self.lock:
+            counts = self.db.execute("SELECT stage, state, COUNT(*), SUM(attempts - 1) FROM jobs "
+                                     "GROUP BY stage, state").fetchall()
+            latency = {name: self.db.execute(
+                "SELECT started_at - ready_at, finished_at - started_at, finished_at - origin FROM jobs "
+                "WHERE stage = ? AND state = 'done' ORDER BY finished_at DESC LIMIT ?", (name, window)).fetchall()
+                for name in self.stages}
+        metrics = {name: {"pending": 0, "running": 0, "done": 0, "failed": 0, "retries": 0} for name in self.stages}
+        for name, state, count, retries in counts:
+            if name in metrics:
+                metrics[name][state] = count
+                metrics[name]["retries"] += retries or 0
+        for name, rows in latency.items():
+            if rows:
+                times = np.array(rows) * 1000
+                for column, key in enumerate(("wait_ms", "run_ms", "chain_ms")):
+                    metrics[name][key] = {"mean": round(float(times[:, column].mean()), 1),
+                                          "p95": round(float(np.percentile(times[:, column], 95)), 1)}
+        return metrics
+
+    def prune(self, older_than: float = 7 * 86400) -> int:
+        """
+        Deletes finished and failed jobs, keeping their recent history for the metrics
+        :param older_than: float - Seconds a finished job is kept
+        :return: int - Number of jobs deleted
+        """
+        with self.lock, self.db:
+            return self.db.execute("DELETE FROM jobs WHERE state IN ('done', 'failed') AND finished_at < ?",
+                                   (time.time() - older_than,)).rowcount
@@ -0,0 +1,126 @@
+import threading
+import time
+
+from Helpers.burst import FrameRing, fuse_burst
+
+
+class MultiCameraCapture:
+    """
+    Triggers any number of cameras at the same instant, one worker thread per camera released by a shared barrier
+    """
+    def __init__(self, cameras: dict):
+        self.cameras: dict = cameras  # Camera name -> backend (a SideBySideCamera yields two named views)
+        self.results: dict = {}
+        self.rings: dict = {}  # Camera name -> FrameRing, kept between bursts to avoid reallocating
+        self.burst: int = 1
+        self.fuse: str = "mean"
+        self.workers: list = []
+        self.trigger = None
+        self.done = None
+        self.stopping: bool = False
+
+    def __repr__(self):
+        return f"MultiCameraCapture(cameras={list(self.cameras)})"
+
+    def start(self) -> None:
+        """
+        Starts every camera and its worker thread
+        :return: None
+        """
+        for camera in self.cameras.values():
+            camera.start()
+        # The main thread is the extra party: it releases the workers and waits for them to finish
+        self.trigger = threading.Barrier(len(self.cameras) + 1)
+        self.done = threading.Barrier(len(self.cameras) + 1)
+        self.stopping = False
+        self.workers = []
+        for name, camera in self.cameras.items():
+            worker = threading.Thread(target=self._worker, args=(name, camera), daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def stop(self) -> None:
+        """
+        Releases the workers one last time so they exit, then stops every camera
+        :return: None
+        """
+        if self.workers:
+            self.stopping = True
+            self.trigger.wait()
+            for worker in self.workers:
+                worker.join()
+            self.workers = []
+        for camera in self.cameras.values():
+            camera.stop()
+
+    def _worker(self, name: str, camera) -> None:
+        while True:
+            self.trigger.wait()
+            if self.stopping:
+                return
+            try:
+                if self.burst > 1:
+                    self.results[name] = self._capture_burst(name, camera)
+                else:
+                    self.results[name] = camera.capture_frame() + (None,)
+            except Exception as e:  # Re-raised in the main thread
+                self.results[name] = e
+            self.done.wait()
+
+    def _capture_burst(self, name: str, camera) -> tuple:
+        frame, timestamp = camera.capture_frame()
+        ring = self.rings.get(name)
+        if ring is None or ring.buffer.shape != (self.burst,) + frame.shape:
+            ring = self.rings[name] = FrameRing(self.burst, frame.shape, frame.dtype)
+        ring.clear()
+        ring.push(frame, timestamp)
+        for _ in range(self.burst - 1):
+            ring.push(*camera.capture_frame())
+        return fuse_burst(ring, self.fuse)
+
+    def capture(self, burst: int = 1, fuse: str = "mean") -> dict:
+        """
+        Captures one frame from every camera in parallel
+        :param burst: int - Frames per camera; more than one are fused into a single frame
+        :param fuse: str - Burst fusion, "mean" or "sharpest"
+        :return: dict - "frames" by view name, "metadata" with per-view timestamps, inter-camera skew and wall time
+        """
+        self.burst = burst
+        self.fuse = fuse
+        self.results = {}
+        t0 = time.perf_counter()
+        self.trigger.wait()
+        self.done.wait()
+        wall_ms = (time.perf_counter() - t0) * 1000
+
+        frames, timestamps, bursts = {}, {}, {}
+        for name, camera in self.cameras.items():
+            result = self.results[name]
+            if isinstance(result, Exception):
+                raise RuntimeError(f"Camera {name} failed to capture") from result
+            frame, timestamp, burst_info = result
+            views = camera.split(frame) if hasattr(camera, "split") else {name: frame}
+            for view_name, view in views.items():
+                frames[view_name] = view
+                timestamps[view_name] = timestamp
+                if burst_info is not None:
+                    bursts[view_name] = burst_info
+        metadata = capture_metadata(timestamps, wall_ms)
+        if bursts:
+            metadata["burst"] = {"method": fuse, "cameras": bursts}
+        return {"frames": frames, "metadata": metadata}
+
+
+def capture_metadata(timestamps: dict, wall_ms: float) -> dict:
+    """
+    Builds the capture metadata record for one synchronized capture
+    :param timestamps: dict - Frame timestamp in ns by view name
+    :param wall_ms: float - Wall clock time from trigger until every frame arrived
+    :return: dict - Timestamps, skew between the earliest and latest frame, RGB/NIR skew when both exist
+    """
+    metadata = {"timestamps_ns": dict(timestamps),
+                "skew_ms": round((max(timestamps.values()) - min(timestamps.values())) / 1e6, 3),
+                "wall_ms": round(wall_ms, 3)}
+    if "rgb" in timestamps and "nir" in timestamps:
+        metadata["rgb_nir_skew_ms"] = round((timestamps["nir"] - timestamps["rgb"]) / 1e6, 3)
+    return metadata
@@ -0,0 +1,124 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from DataStructures.plot_layout import PlotLayout
+from Helpers.encoders import read_reduced
+from Helpers.segmentation import Segmenter
+from Helpers.vi_extractor import compute_ndvi, extract_plot_stats, segment_frame, stat_header
+
+# Downsampling factors of the pyramid levels, 1 is the full crop
+pyramid_levels = (1, 2, 4, 8)
+
+
+def reduce_image(img: np.ndarray, factor: int) -> np.ndarray:
+    """
+    :param img: np.ndarray - Cropped BGR frame
+    :param factor: int - Downsampling factor
+    :return: np.ndarray - Crop reduced by area averaging, the crop itself for factor 1
+    """
+    if factor == 1:
+        return img
+    return cv2.resize(img, (img.shape[1] // factor, img.shape[0] // factor), interpolation=cv2.INTER_AREA)
+
+
+def read_level(path: str, crop: tuple, factor: int) -> np.ndarray:
+    """
+    Reads the crop of a frame file straight at a pyramid level, decoding JPEG at the reduced size
+    :param path: str - Image path
+    :param crop: tuple - (top, bottom, left, right) window of the full-resolution frame
+    :param factor: int - Downsampling factor, 1, 2, 4 or 8
+    :return: np.ndarray - Reduced crop
+    """
+    small = read_reduced(path, factor)
+    if small is None:
+        raise ValueError(f"Could not read image {path}")
+    top, bottom, left, right = (edge // factor for edge in crop)
+    return small[top:bottom, left:right]
+
+
+def extract_level(img: np.ndarray, timestamp: str, layout: PlotLayout, factor: int, index_fn=compute_ndvi,
+                  segmenter: Segmenter = None, reduced: bool = False) -> dict:
+    """
+    Per-plot statistics of one index computed on a pyramid level
+    :param img: np.ndarray - Cropped (and aligned) BGR frame
+    :param timestamp: str - Timestamp stored with every plot
+    :param layout: PlotLayout - Plot layout at full resolution
+    :param factor: int - Downsampling factor
+    :param index_fn: callable - Index image of a BGR crop, compute_ndvi by default
+    :param segmenter: Segmenter - Vegetation/soil segmentation on the reduced index, when given
+    :param reduced: bool - img is already reduced by factor, e.g. from read_level
+    :return: dict - Plot ID -> dict of the stat_header values
+    """
+    small = img if reduced else reduce_image(img, factor)
+    level_layout = layout.scaled(factor)
+    index = index_fn(small)
+    segmentation = segment_frame(index, small, segmenter, level_layout.polygons) if segmenter else None
+    return extract_plot_stats(index, timestamp, level_layout.polygons, level_layout.plot_ids,
+                              segmentation=segmentation)
+
+
+def level_errors(frames: list, layout: PlotLayout, levels: tuple = pyramid_levels, index_fn=compute_ndvi,
+                 segmenter: Segmenter = None) -> dict:
+    """
+    Measures how far the statistics of every level are from the full resolution on a calibration set
+    :param frames: list[np.ndarray] - Cropped BGR calibration frames, covering the season's conditions
+    :param layout: PlotLayout - Plot layout at full resolution
+    :param levels: tuple[int] - Downsampling factors to measure
+    :param index_fn: callable - Index image of a BGR crop
+    :param segmenter: Segmenter - Segmentation used by the extraction, when any
+    :return: dict - Factor -> statistic -> largest absolute error over all frames and plots
+    """
+    names = stat_header[1:] + (["cover"] if segmenter else [])
+    errors = {factor: dict.fromkeys(names, 0.0) for factor in levels}
+    for img in frames:
+        full = extract_level(img, "", layout, 1, index_fn, segmenter)
+        for factor in levels:
+            level = extract_level(img, "", layout, factor, index_fn, segmenter)
+            for plot in full:
+                for name in names:
+                    error = abs(level[plot][name] - full[plot][name])
+                    if not np.isnan(error):
+                        errors[factor][name] = round(max(errors[factor][name], error), 5)
+    return errors
+
+
+def choose_level(errors: dict, tolerance: dict) -> int:
+    """
+    :param errors: dict - Factor -> statistic -> error, see level_errors
+    :param tolerance: dict - Statistic -> largest acceptable error; statistics not listed are not checked
+    :return: int - Coarsest factor whose errors are all within tolerance, 1 when none is
+    """
+    passing = [int(factor) for factor, stats in errors.items()
+               if all(stats[name] <= limit for name, limit in tolerance.items())]
+    return max(passing, default=1)
+
+
+def save_calibration(path: str, layout: PlotLayout, errors: dict) -> None:
+    """
+    :param path: str - Calibration json file
+    :param layout: PlotLayout - Layout the errors were measured with
+    :param errors: dict - Factor -> statistic -> error
+    :return: None
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"layout": layout.digest, "errors": {str(factor): stats for factor, stats in errors.items()}}, f,
+                  indent=2)
+
+
+def load_calibration(path: str, layout: PlotLayout) -> dict:
+    """
+    :param path: str - Calibration json file
+    :param layout: PlotLayout - Current plot layout
+    :return: dict - Factor -> statistic -> error, None when missing or measured with another layout
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        calibration = json.load(f)
+    if calibration["layout"] != layout.digest:
+        return None
+    return {int(factor): stats for factor, stats in calibration["errors"].items()}
@@ -0,0 +1,103 @@
+import numpy as np
+
+
+def _lerp(low, high, fraction):
+    """Linear interpolation written the way numpy's percentile does it, so results agree bit for bit"""
+    return np.where(fraction >= 0.5, high - (high - low) * (1 - fraction), low + (high - low) * fraction)
+
+
+def order_ranks(n: int, percentiles: list) -> dict:
+    """
+    Ranks in the sorted values that the min, the max, the median and every percentile are read from
+    :param n: int - Number of values
+    :param percentiles: list[float] - Percentiles, linear interpolation like np.percentile
+    :return: dict - Statistic name ("min", "max", "median", "p<q>") -> (lower rank, upper rank, interpolation
+                    fraction)
+    """
+    last = n - 1
+    ranks = {"min": (0, 0, 0.0), "max": (last, last, 0.0), "median": (last // 2, n // 2, 0.5 if n % 2 == 0 else 0.0)}
+    for q in percentiles:
+        position = q / 100 * last
+        below = int(np.floor(position))
+        ranks[f"p{q}"] = (below, min(below + 1, last), position - below)
+    return ranks
+
+
+def order_stats(values: np.ndarray, percentiles: list = (95, 90, 85), in_place: bool = False) -> dict:
+    """
+    Min, max, median and percentiles of a set of values from a single np.partition over all the ranks they need,
+    instead of one sort or partition per statistic. Min, max and a percentile falling on a rank are read from the
+    rank, only percentiles between two ranks are interpolated: an infinite ndvi (red = 0) gives max = inf like
+    np.nanmax, where np.percentile's interpolation would turn inf + (inf - inf) * 0 into NaN
+    :param values: np.ndarray - 1-D values without NaN, may hold inf
+    :param percentiles: list[float] - Percentiles, linear interpolation like np.percentile
+    :param in_place: bool - Partition the given array instead of a copy
+    :return: dict - "min", "max", "median" and "p<q>" -> float, NaN when there are no values
+    """
+    n = len(values)
+    ranks = order_ranks(n, percentiles)
+    if n == 0:
+        return {name: np.nan for name in ranks}
+    kth = sorted({rank for low, high, _ in ranks.values() for rank in (low, high)})
+    if in_place:
+        values.partition(kth)
+    else:
+        values = np.partition(values, kth)
+    return read_ranks(ranks, values.__getitem__)
+
+
+def counted_order_stats(values: np.ndarray, counts: np.ndarray, percentiles: list = (95, 90, 85)) -> dict:
+    """
+    order_stats of values given once each with how often they occur, e.g. the distinct index values of a plot and
+    their pixel counts: every rank is looked up in the cumulative counts, so memory grows with the distinct values
+    only and the results are those of order_stats on the repeated values
+    :param values: np.ndarray - Distinct values in ascending order, no NaN, may hold inf
+    :param counts: np.ndarray - Occurrences of every value
+    :param percentiles: list[float] - Percentiles, linear interpolation like np.percentile
+    :return: dict - "min", "max", "median" and "p<q>" -> float, NaN when there are no values
+    """
+    cumulative = np.cumsum(counts)
+    n = int(cumulative[-1]) if len(cumulative) else 0
+    ranks = order_ranks(n, percentiles)
+    if n == 0:
+        return {name: np.nan for name in ranks}
+    return read_ranks(ranks, lambda rank: values[np.searchsorted(cumulative, rank, side="right")])
+
+
+def read_ranks(ranks: dict, value_at) -> dict:
+    """
+    :param ranks: dict - From order_ranks
+    :param value_at: callable - Value of a rank in the sorted values
+    :return: dict - Statistic name -> float: min, max and a percentile falling on a rank read from the rank, the
+                    median and percentiles between two ranks interpolated
+    """
+    stats = {}
+    with np.errstate(invalid="ignore"):  # inf - inf between an infinite and a finite rank is NaN, as in numpy
+        for name, (low, high, fraction) in ranks.items():
+            if name == "median":
+                # np.median averages the two middle values
+                stats[name] = (value_at(low) + value_at(high)) / 2 if low != high else value_at(low)
+            elif fraction == 0:
+                stats[name] = float(value_at(low))
+            else:
+                stats[name] = float(_lerp(value_at(low), value_at(high), fraction))
+    return stats
+
+def summarize(values: np.ndarray, percentiles: list = (95, 90, 85)) -> dict:
+    """
+    The plot summary of the original extraction (non-positive and NaN values left out, then nanmean, nanmedian,
+    nanstd, nanmax and nanpercentile) from the moments (sum, centred sum of squares) and one partition
+    :param values: np.ndarray - Index values of one plot
+    :param percentiles: list[float] - Percentiles to report
+    :return: dict - "count", "mean", "std", "min", "max", "median" and "p<q>", NaN for a plot without valid pixels
+    """
+    values = values[values > 0].astype(np.float64)  # NaN compares False, so it is dropped with the rest
+    n = len(values)
+    stats = {"count": n, "mean": np.nan, "std": np.nan}
+    if n:
+        with np.errstate(invalid="ignore"):  # An infinite value gives mean = inf and std = NaN, like np.nan*
+            mean = values.sum() / n
+            deviation = values - mean
+            stats.update(mean=mean, std=float(np.sqrt(np.dot(deviation, deviation) / n)))
+    stats.update(order_stats(values, percentiles, in_place=True))
+    return stats
@@ -0,0 +1,61 @@
+import json
+import os
+
+from DataStructures.plot_layout import PlotLayout
+from Helpers.plot_labels import PlotGroups, register_groups
+
+
+def load_layouts(path: str) -> list:
+    """
+    Reads a sensor's layout file:
+    {"sensor": "IOT11", "version": 1, "layouts": [{"name": ..., "crop": [...], "plots": {plot ID: polygon}}]}
+    :param path: str - Layout json file
+    :return: list[PlotLayout] - Layouts in file order
+    """
+    with open(path) as f:
+        values = json.load(f)
+    return [PlotLayout.from_dict(layout, values.get("sensor", ""), values.get("version", 1))
+            for layout in values["layouts"]]
+
+
+class MaskCache:
+    """
+    Compiled plot masks (PlotGroups) on disk, one file per layout digest and crop size, so a layout is rasterized
+    once and never again until it changes: an edited layout has a new digest and compiles into a new file. Groups
+    handed out are also registered with plot_groups, so extract_plot_stats with the layout's polygons uses them.
+    """
+    def __init__(self, folder: str = None):
+        self.folder: str = folder  # Memory only when None
+        self.loaded: dict = {}
+
+    def __repr__(self):
+        return f"MaskCache(folder={self.folder}, loaded={len(self.loaded)})"
+
+    def path(self, layout: PlotLayout, shape: tuple) -> str:
+        """
+        :param layout: PlotLayout - Plot layout
+        :param shape: tuple - (height, width) of the crop
+        :return: str - File of the layout's compiled masks at that size
+        """
+        return os.path.join(self.folder, f"{layout.digest}_{shape[1]}x{shape[0]}.npz")
+
+    def groups(self, layout: PlotLayout, shape: tuple) -> PlotGroups:
+        """
+        :param layout: PlotLayout - Plot layout
+        :param shape: tuple - (height, width) of the crop
+        :return: PlotGroups - Compiled masks, loaded from disk or rasterized and stored
+        """
+        key = (layout.digest, tuple(shape[:2]))
+        if key not in self.loaded:
+            path = self.path(layout, shape) if self.folder else None
+            if path and os.path.exists(path):
+                self.loaded[key] = PlotGroups.load(path)
+            else:
+                self.loaded[key] = PlotGroups(layout.polygons, shape)
+                if path:
+                    os.makedirs(self.folder, exist_ok=True)
+                    tmp_path = path[:-len(".npz")] + ".tmp.npz"
+                    self.loaded[key].save(tmp_path)
+                    os.replace(tmp_path, path)
+            register_groups(layout.polygons, self.loaded[key])
+        return self.loaded[key]
@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+
+from DataStructures.quality_limits import QualityLimits
+from Helpers.encoders import read_reduced
+
+
+def frame_quality(small: np.ndarray) -> dict:
+    """
+    Quality scores of a downsampled BGR crop
+    :param small: np.ndarray - uint8 BGR image, a few hundred pixels wide
+    :return: dict - "brightness", "clipped", "dark", "sharpness", "haze" and "saturation", rounded to 5 decimals
+    """
+    grey = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    high = small.max(axis=2)
+    low = small.min(axis=2)
+    # Laplacian energy relative to the grey variance: blur removes the fine detail, while exposure and haze scale
+    # both and leave the ratio unchanged
+    grey_float = grey.astype(np.float32)
+    laplacian = cv2.Laplacian(grey_float, cv2.CV_32F)
+    # Dark channel: fog adds a bright airlight to every channel, so even the darkest channel of a patch rises
+    dark_channel = cv2.erode(low, np.ones((7, 7), np.uint8))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        saturation = np.where(high > 0, (high.astype(np.float32) - low) / high, 0)
+    scores = {"brightness": grey.mean() / 255, "clipped": (high >= 250).mean(), "dark": (grey <= 5).mean(),
+              "sharpness": laplacian.var() / max(float(grey_float.var()), 1e-6), "haze": dark_channel.mean() / 255,
+              "saturation": saturation.mean()}
+    return {name: round(float(value), 5) for name, value in scores.items()}
+
+
+class QualityGate:
+    """
+    Rejects blurred, over- or underexposed and fogged frames before the full-resolution extraction, scoring only a
+    downsampled copy of the crop window
+    """
+    def __init__(self, limits: QualityLimits = None, factor: int = 8):
+        self.limits: QualityLimits = limits or QualityLimits()
+        self.factor: int = factor  # Downsampling of the scored copy: 1, 2, 4 or 8
+
+    def __repr__(self):
+        return f"QualityGate(limits={self.limits}, factor={self.factor})"
+
+    def reduced_crop(self, frame, crop: tuple = None) -> np.ndarray:
+        """
+        :param frame: np.ndarray or str - BGR frame, or an image path read with a reduced-resolution decode
+        :param crop: tuple - (top, bottom, left, right) window of the full-resolution frame, the whole frame if None
+        :return: np.ndarray - Downsampled crop
+        """
+        if isinstance(frame, np.ndarray):
+            top, bottom, left, right = crop or (0, frame.shape[0], 0, frame.shape[1])
+            window = frame[top:bottom, left:right]
+            size = (max(1, window.shape[1] // self.factor), max(1, window.shape[0] // self.factor))
+            return cv2.resize(window, size, interpolation=cv2.INTER_AREA)
+        small = read_reduced(str(frame), self.factor)
+        if small is None:
+            raise ValueError(f"Could not read image {frame}")
+        if crop is None:
+            return small
+        top, bottom, left, right = (edge // self.factor for edge in crop)
+        return small[top:bottom, left:right]
+
+    def reasons(self, scores: dict) -> list:
+        """
+        :param scores: dict - Scores from frame_quality
+        :return: list[str] - Why the frame fails the limits, empty when it passes
+        """
+        limits = self.limits
+        checks = [("too dark", scores["brightness"] < limits.min_brightness),
+                  ("overexposed", scores["brightness"] > limits.max_brightness),
+                  ("clipped highlights", scores["clipped"] > limits.max_clipped),
+                  ("crushed shadows", scores["dark"] > limits.max_dark),
+                  ("blurred", scores["sharpness"] < limits.min_sharpness),
+                  ("hazy", scores["haze"] > limits.max_haze or scores["saturation"] < limits.min_saturation)]
+        return [reason for reason, failed in checks if failed]
+
+    def check(self, frame, crop: tuple = None) -> dict:
+        """
+        Scores one frame
+        :param frame: np.ndarray or str - BGR frame, or an image path (reduced-resolution decode, no full decode)
+        :param crop: tuple - (top, bottom, left, right) window to score, e.g. the plot layout's crop
+        :return: dict - The scores, "passed" and the rejection "reasons"
+        """
+        report = frame_quality(self.reduced_crop(frame, crop))
+        report["reasons"] = self.reasons(report)
+        report["passed"] = not report["reasons"]
+        return report
+
+
+def gate_passed(report: dict) -> bool:
+    """
+    :param report: dict - Quality report stored with a frame, None when there is none
+    :return: bool - True for a frame QualityGate.check scored and passed; the stand-in report of an ungated run,
+                    {"passed": True, "reasons": []}, holds no scores and does not count
+    """
+    return bool(report) and report.get("passed", False) and "sharpness" in report
@@ -0,0 +1,150 @@
+import os
+
+import cv2
+import numpy as np
+
+
+def to_grey(frame: np.ndarray) -> np.ndarray:
+    """
+    Grey image with local contrast equalized, so features of the RGB and NoIR cameras look alike
+    :param frame: np.ndarray - BGR or grey frame
+    :return: np.ndarray - uint8 grey image
+    """
+    grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(grey)
+
+
+def estimate_homography(src: np.ndarray, dst: np.ndarray, max_features: int = 4000) -> np.ndarray:
+    """
+    Estimates the homography taking src pixel coordinates to dst pixel coordinates from ORB feature matches
+    :param src: np.ndarray - Frame to be warped (e.g. RGB)
+    :param dst: np.ndarray - Reference frame (e.g. NoIR)
+    :param max_features: int - ORB features per image
+    :return: np.ndarray - 3x3 homography
+    """
+    orb = cv2.ORB_create(max_features)
+    src_points, src_desc = orb.detectAndCompute(to_grey(src), None)
+    dst_points, dst_desc = orb.detectAndCompute(to_grey(dst), None)
+    if src_desc is None or dst_desc is None:
+        raise ValueError("No features found in the calibration pair")
+    matches = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True).match(src_desc, dst_desc)
+    if len(matches) < 10:
+        raise ValueError(f"Only {len(matches)} feature matches in the calibration pair")
+    src_xy = np.float32([src_points[m.queryIdx].pt for m in matches])
+    dst_xy = np.float32([dst_points[m.trainIdx].pt for m in matches])
+    homography, _ = cv2.findHomography(src_xy, dst_xy, cv2.RANSAC, 3.0)
+    if homography is None:
+        raise ValueError("Homography estimation failed on the calibration pair")
+    return homography
+
+
+def build_remap(homography: np.ndarray, size: tuple) -> tuple:
+    """
+    Precomputes cv2.remap maps that apply a homography, in the fixed-point format remap is fastest with
+    :param homography: np.ndarray - 3x3 homography from source to destination pixels
+    :param size: tuple - (width, height) of the destination frame
+    :return: tuple - (map1, map2) for cv2.remap
+    """
+    width, height = size
+    xs, ys = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+    grid = np.stack([xs, ys], axis=-1).reshape(-1, 1, 2)
+    # Every destination pixel looks up its source pixel through the inverse warp
+    source = cv2.perspectiveTransform(grid, np.linalg.inv(homography)).reshape(height, width, 2)
+    return cv2.convertMaps(source[..., 0], source[..., 1], cv2.CV_16SC2)
+
+
+def apply_remap(frame: np.ndarray, maps: tuple) -> np.ndarray:
+    """
+    Warps a frame with precomputed maps
+    :param frame: np.ndarray - Frame to warp
+    :param maps: tuple - (map1, map2) from build_remap
+    :return: np.ndarray - Warped frame, black where the source has no pixels
+    """
+    return cv2.remap(frame, maps[0], maps[1], cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+
+
+class RemapCache:
+    """
+    Remap tables on disk, one file per camera pair and resolution
+    """
+    def __init__(self, folder: str):
+        self.folder: str = folder
+        self.loaded: dict = {}
+
+    def __repr__(self):
+        return f"RemapCache(folder={self.folder}, loaded={list(self.loaded)})"
+
+    def path(self, pair: str, size: tuple) -> str:
+        """
+        :param pair: str - Camera pair name, e.g. "rgb_to_nir"
+        :param size: tuple - (width, height) of the frames
+        :return: str - File of the pair's maps at that resolution
+        """
+        return os.path.join(self.folder, f"{pair}_{size[0]}x{size[1]}.npz")
+
+    def save(self, pair: str, size: tuple, homography: np.ndarray) -> tuple:
+        """
+        Builds and stores the maps of a calibrated pair
+        :param pair: str - Camera pair name
+        :param size: tuple - (width, height) of the frames
+        :param homography: np.ndarray - Calibrated homography
+        :return: tuple - (map1, map2)
+        """
+        maps = build_remap(homography, size)
+        os.makedirs(self.folder, exist_ok=True)
+        np.savez(self.path(pair, size), map1=maps[0], map2=maps[1], homography=homography)
+        self.loaded[(pair, size)] = maps
+        return maps
+
+    def load(self, pair: str, size: tuple) -> tuple:
+        """
+        :param pair: str - Camera pair name
+        :param size: tuple - (width, height) of the frames
+        :return: tuple - (map1, map2), None when the pair was never calibrated at that resolution
+        """
+        if (pair, size) not in self.loaded:
+            path = self.path(pair, size)
+            if not os.path.exists(path):
+                return None
+            with np.load(path) as data:
+                self.loaded[(pair, size)] = (data["map1"], data["map2"])
+        return self.loaded[(pair, size)]
+
+
+def calibrate_pair(src: np.ndarray, dst: np.ndarray, pair: str, cache: RemapCache) -> np.ndarray:
+    """
+    One-off calibration: estimates the warp of a calibration pair and stores its remap tables
+    :param src: np.ndarray - Frame of the camera to be warped
+    :param dst: np.ndarray - Frame of the reference camera
+    :param pair: str - Camera pair name
+    :param cache: RemapCache - Where the maps are stored
+    :return: np.ndarray - Estimated homography
+    """
+    homography = estimate_homography(src, dst)
+    cache.save(pair, (dst.shape[1], dst.shape[0]), homography)
+    return homography
+
+
+class FrameAligner:
+    """
+    Warps one camera's frames onto another's pixel grid with cached remap tables, one remap per capture
+    """
+    def __init__(self, cache: RemapCache, src: str = "rgb", dst: str = "nir"):
+        self.cache: RemapCache = cache
+        self.src: str = src
+        self.dst: str = dst
+
+    def __repr__(self):
+        return f"FrameAligner(src={self.src}, dst={self.dst}, cache={self.cache})"
+
+    def align(self, frames: dict) -> dict:
+        """
+        :param frames: dict - Captured frames by camera name
+        :return: dict - The same frames with the source camera's frame aligned to the destination camera;
+                        unchanged when the pair is not calibrated at this resolution
+        """
+        dst = frames[self.dst]
+        maps = self.cache.load(f"{self.src}_to_{self.dst}", (dst.shape[1], dst.shape[0]))
+        if maps is None:
+            return frames
+        return dict(frames, **{self.src: apply_remap(frames[self.src], maps)})
@@ -0,0 +1,76 @@
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # Compact JSON is the fallback, both are zlib compressed
+    msgpack = None
+
+# First byte of an encoded payload: the serializer used before compression
+msgpack_tag = b"M"
+json_tag = b"J"
+# Keys of a folded table, see fold_tables
+keys_tag = "~k"
+rows_tag = "~r"
+
+
+def fold_tables(value):
+    """
+    Replaces every dict whose values are dicts with the same keys (plot name -> statistics) by one key list and a
+    row of values per entry, so the statistic names are sent once per table instead of once per plot
+    :param value: Any json serializable value
+    :return: The same value with its tables folded
+    """
+    if isinstance(value, list):
+        return [fold_tables(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    children = list(value.values())
+    if len(children) > 1 and all(isinstance(child, dict) for child in children):
+        keys = list(children[0])
+        if all(list(child) == keys for child in children[1:]):
+            return {keys_tag: keys, rows_tag: {name: [fold_tables(child[key]) for key in keys]
+                                               for name, child in value.items()}}
+    return {key: fold_tables(child) for key, child in value.items()}
+
+
+def unfold_tables(value):
+    """
+    :param value: A value folded by fold_tables
+    :return: The original value
+    """
+    if isinstance(value, list):
+        return [unfold_tables(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if keys_tag in value and rows_tag in value:
+        return {name: dict(zip(value[keys_tag], [unfold_tables(item) for item in row]))
+                for name, row in value[rows_tag].items()}
+    return {key: unfold_tables(child) for key, child in value.items()}
+
+
+def encode_payload(payload: dict, use_msgpack: bool = True) -> bytes:
+    """
+    Compact encoding of a result payload for metered links: tables folded, msgpack (or JSON without whitespace when
+    msgpack is not installed), then zlib
+    :param payload: dict - json serializable result, e.g. the ndvi.json content
+    :param use_msgpack: bool - Use msgpack when it is installed
+    :return: bytes - Serializer tag followed by the compressed payload
+    """
+    folded = fold_tables(payload)
+    if use_msgpack and msgpack is not None:
+        return msgpack_tag + zlib.compress(msgpack.packb(folded, use_bin_type=True), 9)
+    return json_tag + zlib.compress(json.dumps(folded, separators=(",", ":")).encode(), 9)
+
+
+def decode_payload(data: bytes) -> dict:
+    """
+    :param data: bytes - Payload written by encode_payload
+    :return: dict - The original payload
+    """
+    body = zlib.decompress(data[1:])
+    if data[:1] == msgpack_tag:
+        if msgpack is None:
+            raise ValueError("Payload is msgpack encoded, pip3 install msgpack to decode it")
+        return unfold_tables(msgpack.unpackb(body, raw=False))
+    return unfold_tables(json.loads(body))
@@ -0,0 +1,80 @@
+import numpy as np
+
+
+def otsu_threshold(values: np.ndarray, value_range: tuple, bins: int = 256) -> float:
+    """
+    Otsu's threshold from a fixed-bin histogram: the cut that maximizes the between-class variance
+    :param values: np.ndarray - Finite values to split, e.g. the valid plot pixels of one frame
+    :param value_range: tuple - (low, high) of the histogram, values outside are counted in the end bins
+    :param bins: int - Histogram bins, also the resolution of the threshold
+    :return: float - Threshold, values above it are the upper class; NaN when there are no values
+    """
+    if len(values) == 0:
+        return np.nan
+    low, high = value_range
+    position = np.clip((values - low) * (bins / (high - low)), 0, bins - 1).astype(np.int64)
+    hist = np.bincount(position, minlength=bins).astype(np.float64)
+    centers = low + (np.arange(bins) + 0.5) * ((high - low) / bins)
+    weight = np.cumsum(hist)  # Pixels in the lower class when cutting after each bin
+    moment = np.cumsum(hist * centers)
+    total, total_moment = weight[-1], moment[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (total_moment * weight - total * moment) ** 2 / (weight * (total - weight))
+    cut = int(np.nanargmax(between)) if np.isfinite(between).any() else bins - 1
+    return low + (cut + 1) * ((high - low) / bins)
+
+
+def excess_green(pixels: np.ndarray) -> np.ndarray:
+    """
+    Excess green 2g - r - b on chromatic coordinates, high on green canopy
+    :param pixels: np.ndarray - uint8 BGR pixels, any leading shape
+    :return: np.ndarray - float32 ExG in [-1, 2], 0 for black pixels
+    """
+    b, g, r = (pixels[..., channel].astype(np.float32) for channel in range(3))
+    total = b + g + r
+    return np.divide(2 * g - r - b, total, out=np.zeros_like(total), where=total > 0)
+
+
+class Segmenter:
+    """
+    Splits plot pixels into vegetation and background (soil, residue, shadow) once per frame:
+    "otsu" - Otsu's threshold on the index values of all plot pixels of the frame
+    "fixed" - a fixed index threshold
+    "exg" - Otsu's threshold (or the fixed threshold when given) on the excess green of the BGR pixels, for RGB
+            frames
+    """
+    def __init__(self, method: str = "otsu", threshold: float = None, value_range: tuple = (0.0, 4.0),
+                 bins: int = 256, floor: float = None):
+        if method not in ("otsu", "fixed", "exg"):
+            raise ValueError(f"Unknown segmentation method {method}, use otsu, fixed or exg")
+        if method == "fixed" and threshold is None:
+            raise ValueError("The fixed segmentation needs a threshold")
+        self.method: str = method
+        self.threshold: float = threshold
+        self.value_range: tuple = value_range  # Otsu histogram range of the index, that of histogram_specs
+        self.bins: int = bins
+        self.floor: float = floor  # Lowest Otsu threshold, keeps a bare-soil frame from being split in two
+
+    def __repr__(self):
+        return (f"Segmenter(method={self.method}, threshold={self.threshold}, value_range={self.value_range}, "
+                f"bins={self.bins}, floor={self.floor})")
+
+    def classify(self, values: np.ndarray, pixels: np.ndarray = None) -> tuple:
+        """
+        :param values: np.ndarray - Index values of the frame's plot pixels
+        :param pixels: np.ndarray - The same pixels of the BGR crop, (n, 3), needed by "exg"
+        :return: tuple - (bool array, True for vegetation, aligned with values; the frame's threshold)
+        """
+        if self.method == "exg":
+            if pixels is None:
+                raise ValueError("The exg segmentation needs the BGR pixels")
+            values = excess_green(pixels)
+            threshold = self.threshold if self.threshold is not None else \
+                otsu_threshold(values, (-1.0, 2.0), self.bins)
+        elif self.method == "fixed":
+            threshold = self.threshold
+        else:
+            threshold = otsu_threshold(values[values > 0], self.value_range, self.bins)  # NaN compares False
+            if self.floor is not None:
+                threshold = max(threshold, self.floor)
+        return values > threshold, float(threshold)
@@ -0,0 +1,183 @@
+import numpy as np
+
+from DataStructures.histogram_spec import HistogramSpec
+from Helpers.order_stats import counted_order_stats
+from Helpers.plot_labels import plot_groups
+from Helpers.vi_engine import pair_grid, vi_channels
+
+# Every index is a function of one pair of 8-bit bands (see vi_channels), so a plot is summed up exactly by how
+# often each of the 65536 value pairs occurs in it: its counts replace its pixel values
+pair_cells = 256 * 256
+# Working bytes per gathered pixel: row and column (int64), the BGR(A) pixel, its keys and bincount's int64 copy
+chunk_bytes_per_pixel = 32
+# Working bytes of the statistics of one plot and index when all 65536 pairs occur in it
+stats_bytes = 64 * pair_cells
+# Fewest pixels gathered at once
+min_chunk = 4096
+
+
+def budget_chunk(memory_budget: int, fixed: int) -> int:
+    """
+    :param memory_budget: int - Bytes the extraction of one frame may allocate
+    :param fixed: int - Bytes needed whatever the chunk size: tables, pair counts and statistics
+    :return: int - Pixels gathered at once, so that fixed plus the chunk stay within the budget
+    """
+    chunk = (memory_budget - fixed) // chunk_bytes_per_pixel
+    if chunk < min_chunk:
+        raise ValueError(f"memory_budget of {memory_budget} bytes is too small, at least "
+                         f"{fixed + min_chunk * chunk_bytes_per_pixel} bytes are needed")
+    return chunk
+
+
+def counts_bytes(pairs: int) -> int:
+    """
+    :param pairs: int - Band pairs counted
+    :return: int - Bytes of the int64 counts of one plot, with bincount's result while a chunk is added
+    """
+    return (pairs + 1) * pair_cells * 8
+
+
+def pair_counts(img: np.ndarray, index: np.ndarray, pairs: set, chunk: int) -> dict:
+    """
+    Counts how often every pair of 8-bit band values occurs among some pixels, gathered a chunk at a time
+    :param img: np.ndarray - Cropped BGR frame, may be a view of the whole frame
+    :param index: np.ndarray - Flat pixel indices, e.g. the pixels of one plot
+    :param pairs: set - Band pairs (first, second) to count
+    :param chunk: int - Pixels gathered at once
+    :return: dict - Band pair -> int64 counts of the 65536 pairs, entry (first << 8) | second
+    """
+    counts = {pair: np.zeros(pair_cells, dtype=np.int64) for pair in pairs}
+    for start in range(0, len(index), chunk):
+        # Row and column instead of a flat view: the crop is a strided view that reshape(-1) would copy whole
+        pixels = img[np.divmod(index[start:start + chunk], img.shape[1])]
+        for (first, second), total in counts.items():
+            keys = pixels[:, first].astype(np.uint16) << 8
+            keys |= pixels[:, second]
+            total += np.bincount(keys, minlength=pair_cells)
+    return counts
+
+
+def counted_stats(table: np.ndarray, counts: np.ndarray, percentiles: list = (95, 90, 85),
+                  histogram: HistogramSpec = None) -> dict:
+    """
+    Statistics of one plot from its pair counts, the same as grouped_stats on its pixel values
+    :param table: np.ndarray - Index value of every pair, entry (first << 8) | second
+    :param counts: np.ndarray - Occurrences of every pair in the plot, from pair_counts
+    :param percentiles: list[float] - Percentiles to report
+    :param histogram: HistogramSpec - Bins of the plot's histogram, none is computed when not given
+    :return: dict - "count", "mean", "std", "min", "max", "median", "p<q>" and "hist" of the valid (> 0, not NaN)
+                    values, NaN for a plot without valid pixels
+    """
+    keys = np.flatnonzero(counts)
+    values = table[keys].astype(np.float64)
+    keep = values > 0  # Same filter as replacing values <= 0 by NaN: NaN compares False
+    values, weights = values[keep], counts[keys][keep]
+    order = np.argsort(values, kind="stable")
+    values, weights = values[order], weights[order]
+    n = int(weights.sum())
+    stats = {"count": n, "mean": np.nan, "std": np.nan}
+    if n:
+        with np.errstate(invalid="ignore"):  # An infinite value gives mean = inf and std = NaN, like np.nan*
+            mean = np.dot(weights, values) / n
+            deviation = values - mean
+            stats.update(mean=mean, std=float(np.sqrt(np.dot(weights, deviation * deviation) / n)))
+    stats.update(counted_order_stats(values, weights, percentiles))
+    if histogram is not None:
+        stats["hist"] = np.bincount(histogram.bin_of(values), weights,
+                                    minlength=histogram.bins + 1).astype(np.uint32)
+    return stats
+
+
+def stack_plots(plots: list) -> dict:
+    """
+    :param plots: list[dict] - counted_stats of every plot
+    :return: dict - The same arrays as grouped_stats, one entry per plot
+    """
+    return {name: np.array([stats[name] for stats in plots]) for name in plots[0]} if plots else {}
+
+
+def plot_bounds(groups) -> np.ndarray:
+    """
+    :param groups: PlotGroups - Compiled plot layout
+    :return: np.ndarray - Start of every plot's pixels in groups.index, and their end last
+    """
+    # Searched with the dtype of plot_ids, which would otherwise be copied to int64 as a whole
+    return np.searchsorted(groups.plot_ids, np.arange(groups.count + 1, dtype=groups.plot_ids.dtype))
+
+
+def index_tables(engine) -> dict:
+    """
+    :param engine: VIEngine or LUTEngine - Indices to compute
+    :return: dict - Index name -> float32 value of every band pair: the LUTEngine's own tables, or the engine
+                    evaluated on the pair grids
+    """
+    tables = getattr(engine, "tables", None)
+    if tables is not None:
+        return tables
+    tables = {}
+    cube = np.empty((len(engine.names), 256, 256), dtype=np.float32)
+    for pair in {vi_channels[name] for name in engine.names}:
+        engine.cube(pair_grid(pair), out=cube)
+        for plane, name in enumerate(engine.names):
+            if vi_channels[name] == pair:
+                tables[name] = cube[plane].reshape(-1).copy()
+    return tables
+
+
+def tiled_stats(img: np.ndarray, index_fn, polygons: list, memory_budget: int, histogram: HistogramSpec = None,
+                channels: tuple = vi_channels["ndvi"]) -> dict:
+    """
+    Memory-bounded plot statistics of one index: the index is evaluated once on the 65536 pairs of its bands, and
+    every plot is summed up from how often each pair occurs among its pixels. No index image, and no buffer of the
+    plot pixel values, is ever built: the memory is fixed plus the gathered chunk, whatever the frame or plot size.
+    :param img: np.ndarray - Cropped BGR frame
+    :param index_fn: callable - Index image of a BGR image, e.g. compute_ndvi, depending on the channels only
+    :param polygons: list - Plot polygons in cropped image coordinates
+    :param memory_budget: int - Bytes the extraction may allocate, besides the frame and the cached plot groups
+    :param histogram: HistogramSpec - Bins of the per-plot histograms, none are computed when not given
+    :param channels: tuple - The two channel numbers the index depends on
+    :return: dict - The same arrays as grouped_stats
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):  # Pairs with a zero band, as in the full-size path
+        table = np.asarray(index_fn(pair_grid(channels)), dtype=np.float64).reshape(-1)
+    # The evaluation on the grid takes up to about 64 bytes per pair, before the counting starts
+    fixed = table.nbytes + max(64 * pair_cells, counts_bytes(1) + stats_bytes)
+    chunk = budget_chunk(memory_budget, fixed)
+    groups = plot_groups(polygons, img.shape)
+    bounds = plot_bounds(groups)
+    plots = []
+    for plot in range(groups.count):
+        counts = pair_counts(img, groups.index[bounds[plot]:bounds[plot + 1]], {channels}, chunk)
+        plots.append(counted_stats(table, counts[channels], histogram=histogram))
+    return stack_plots(plots)
+
+
+def tiled_cube_stats(img: np.ndarray, engine, polygons: list, memory_budget: int, histograms: dict = None) -> dict:
+    """
+    tiled_stats for all indices of an engine: the band pairs of a plot are counted once and shared by all the
+    indices of each pair
+    :param img: np.ndarray - Cropped BGR frame
+    :param engine: VIEngine or LUTEngine - Indices to compute
+    :param polygons: list - Plot polygons in cropped image coordinates
+    :param memory_budget: int - Bytes the extraction may allocate, besides the frame and the cached plot groups
+    :param histograms: dict - Index name -> HistogramSpec of its per-plot histograms, none are computed when not given
+    :return: dict - Index name -> the same arrays as grouped_stats
+    """
+    own_tables = getattr(engine, "tables", None) is not None
+    tables = index_tables(engine)
+    pairs = {vi_channels[name] for name in engine.names}
+    # Evaluated tables, their evaluation cube and the engine's strip scratch, then the counts of one plot and the
+    # statistics of one index
+    evaluated = 0 if own_tables else (2 * len(engine.names) + 6) * pair_cells * 4
+    fixed = evaluated + counts_bytes(len(pairs)) + stats_bytes
+    chunk = budget_chunk(memory_budget, fixed)
+    histograms = histograms or {}
+    groups = plot_groups(polygons, img.shape)
+    bounds = plot_bounds(groups)
+    plots = {name: [] for name in engine.names}
+    for plot in range(groups.count):
+        counts = pair_counts(img, groups.index[bounds[plot]:bounds[plot + 1]], pairs, chunk)
+        for name in engine.names:
+            plots[name].append(counted_stats(tables[name], counts[vi_channels[name]],
+                                             histogram=histograms.get(name)))
+    return {name: stack_plots(plots[name]) for name in engine.names}
@@ -0,0 +1,249 @@
+import os
+import random
+import sqlite3
+import struct
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+from Helpers.image_store import ImageStore
+from Helpers.result_codec import encode_payload
+
+schema = """
+CREATE TABLE IF NOT EXISTS queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    body BLOB NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    frames TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS keys (
+    key TEXT PRIMARY KEY,
+    id INTEGER NOT NULL
+);
+"""
+
+# Record header in a batch: record id, kind length, body length
+record_header = struct.Struct(">QHI")
+
+
+def pack_batch(records: list) -> bytes:
+    """
+    :param records: list[tuple] - (id, kind, body) records
+    :return: bytes - Records concatenated, each behind its header
+    """
+    parts = []
+    for record_id, kind, body in records:
+        kind = kind.encode()
+        parts += [record_header.pack(record_id, len(kind), len(body)), kind, body]
+    return b"".join(parts)
+
+
+def unpack_batch(data: bytes) -> list:
+    """
+    :param data: bytes - Batch written by pack_batch
+    :return: list[tuple] - (id, kind, body) records
+    """
+    records, offset = [], 0
+    while offset < len(data):
+        record_id, kind_size, body_size = record_header.unpack_from(data, offset)
+        offset += record_header.size
+        kind = data[offset:offset + kind_size].decode()
+        offset += kind_size
+        records.append((record_id, kind, data[offset:offset + body_size]))
+        offset += body_size
+    return records
+
+
+class UploadQueue:
+    """
+    Durable store-and-forward queue of encoded result payloads: results are queued locally as they are extracted
+    and stay on the SD card until the server acknowledged them, so a connectivity gap only delays them
+    """
+    def __init__(self, db_path: str):
+        self.db_path: str = db_path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.db.executescript(schema)
+        if "frames" not in [row[1] for row in self.db.execute("PRAGMA table_info(queue)")]:
+            self.db.execute("ALTER TABLE queue ADD COLUMN frames TEXT NOT NULL DEFAULT ''")  # Older queues
+
+    def __repr__(self):
+        return f"UploadQueue(db_path={self.db_path}, depth={self.depth()})"
+
+    def close(self) -> None:
+        """
+        Closes the queue database
+        :return: None
+        """
+        self.db.close()
+
+    def put(self, kind: str, payload: dict, frames: list = (), key: str = None) -> int:
+        """
+        Encodes and queues one payload
+        :param kind: str - Payload type, e.g. "ndvi" or "vi"
+        :param payload: dict - json serializable payload
+        :param frames: list[str] - Paths of the frames whose results the payload holds, returned by ack
+        :param key: str - Identity of the payload, e.g. a frame name: a payload put again under a key already queued
+                          (sent or not) is not queued twice
+        :return: int - Record id, that of the first payload put under the key
+        """
+        with self.lock, self.db:
+            if key is not None:
+                row = self.db.execute("SELECT id FROM keys WHERE key = ?", (key,)).fetchone()
+                if row:
+                    return row[0]
+            record_id = self.db.execute("INSERT INTO queue (kind, created_at, body, frames) VALUES (?, ?, ?, ?)",
+                                        (kind, datetime.now().isoformat(timespec="seconds"), encode_payload(payload),
+                                         "\n".join(frames))).lastrowid
+            if key is not None:
+                self.db.execute("INSERT INTO keys (key, id) VALUES (?, ?)", (key, record_id))
+            return record_id
+
+    def queued(self, key: str) -> bool:
+        """
+        :param key: str - Payload identity given to put
+        :return: bool - True when a payload was put under the key, whether it was sent since or not
+        """
+        with self.lock:
+            return self.db.execute("SELECT 1 FROM keys WHERE key = ?", (key,)).fetchone() is not None
+
+    def peek(self, limit: int) -> list:
+        """
+        :param limit: int - Maximum number of records
+        :return: list[tuple] - Oldest (id, kind, body) records
+        """
+        with self.lock:
+            return self.db.execute("SELECT id, kind, body FROM queue ORDER BY id LIMIT ?", (limit,)).fetchall()
+
+    def ack(self, ids: list) -> list:
+        """
+        Removes records the server acknowledged
+        :param ids: list[int] - Record ids
+        :return: list[str] - Paths of the frames whose results the records held
+        """
+        frames = []
+        with self.lock, self.db:
+            for record_id in ids:
+                row = self.db.execute("SELECT frames FROM queue WHERE id = ?", (record_id,)).fetchone()
+                frames += [path for path in row[0].split("\n") if path] if row else []
+            self.db.executemany("DELETE FROM queue WHERE id = ?", [(record_id,) for record_id in ids])
+        return frames
+
+    def retry(self, ids: list) -> None:
+        """
+        Counts a failed attempt of the records
+        :param ids: list[int] - Record ids
+        :return: None
+        """
+        with self.lock, self.db:
+            self.db.executemany("UPDATE queue SET attempts = attempts + 1 WHERE id = ?",
+                                [(record_id,) for record_id in ids])
+
+    def depth(self) -> int:
+        """
+        :return: int - Records waiting for upload
+        """
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM queue").fetchone()[0]
+
+    def queued_bytes(self) -> int:
+        """
+        :return: int - Encoded bytes waiting for upload
+        """
+        with self.lock:
+            return self.db.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM queue").fetchone()[0]
+
+
+class Uploader:
+    """
+    Drains an upload queue in batches over HTTP POST. A batch is acknowledged only on a 2xx response; on any
+    failure it stays queued and the next attempt waits an exponentially growing, jittered delay.
+    """
+    def __init__(self, queue: UploadQueue, url: str, sensor: str, batch_size: int = 50, timeout: float = 20.0,
+                 base_delay: float = 5.0, max_delay: float = 900.0, store: ImageStore = None):
+        self.queue: UploadQueue = queue
+        self.url: str = url
+        self.sensor: str = sensor
+        self.batch_size: int = batch_size
+        self.timeout: float = timeout
+        self.base_delay: float = base_delay
+        self.max_delay: float = max_delay
+        self.store: ImageStore = store  # Frames of acknowledged records are marked uploaded, none when None
+        self.failures: int = 0  # Consecutive failed batches
+        self.next_attempt: float = 0.0  # time.monotonic() before which no batch is sent
+        self.stats: dict = {"records": 0, "batches": 0, "bytes": 0, "failures": 0}
+
+    def __repr__(self):
+        return f"Uploader(url={self.url}, sensor={self.sensor}, batch_size={self.batch_size}, stats={self.stats})"
+
+    def send(self, records: list) -> None:
+        """
+        Posts one batch, raising when it was not accepted
+        :param records: list[tuple] - (id, kind, body) records
+        :return: None
+        """
+        body = pack_batch(records)
+        request = urllib.request.Request(self.url, data=body, method="POST",
+                                         headers={"Content-Type": "application/octet-stream",
+                                                  "X-Sensor": self.sensor})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+        self.stats["bytes"] += len(body)
+
+    def backoff(self) -> float:
+        """
+        :return: float - Seconds to wait after the current run of failures
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def drain(self, max_batches: int = None) -> bool:
+        """
+        Sends batches until the queue is empty, a batch fails or max_batches were sent
+        :param max_batches: int - Batch limit of this call, none by default
+        :return: bool - True when the queue was emptied
+        """
+        sent = 0
+        while max_batches is None or sent < max_batches:
+            if time.monotonic() < self.next_attempt:
+                return False
+            records = self.queue.peek(self.batch_size)
+            if not records:
+                return True
+            ids = [record[0] for record in records]
+            try:
+                self.send(records)
+            except (urllib.error.URLError, OSError) as e:  # HTTPError, refused, timeout, DNS: the link is down
+                self.queue.retry(ids)
+                self.failures += 1
+                self.stats["failures"] += 1
+                self.next_attempt = time.monotonic() + self.backoff()
+                print(f"Upload failed ({e}), {self.queue.depth()} records queued, retry in "
+                      f"{self.next_attempt - time.monotonic():.0f} s")
+                return False
+            for path in self.queue.ack(ids):
+                if self.store is not None:
+                    self.store.mark_uploaded(path)  # Its results are on the server: first to evict
+            self.failures = 0
+            self.stats["records"] += len(records)
+            self.stats["batches"] += 1
+            sent += 1
+        return False
+
+    def run(self, stop: threading.Event, idle: float = 60.0) -> None:
+        """
+        Uploads until stopped: drains whenever records are queued and waits out the backoff after failures
+        :param stop: threading.Event - Set to stop
+        :param idle: float - Seconds between queue checks while it is empty
+        :return: None
+        """
+        while not stop.is_set():
+            if self.drain():
+                stop.wait(idle)
+            else:
+                stop.wait(max(0.0, self.next_attempt - time.monotonic()))
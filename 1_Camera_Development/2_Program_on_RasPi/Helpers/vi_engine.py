@@ -0,0 +1,154 @@
+import numpy as np
+
+# Every index the analysis side (VIState) knows, in the order of the cube
+vi_names = ["cigreen0", "cigreen", "evi2", "gndvi0", "gndvi", "ndvi", "rdvi", "savi", "sr"]
+# The two 8-bit bands every index depends on, as BGR channel numbers: each index is a function of one pair
+vi_channels = {"cigreen0": (0, 1), "cigreen": (0, 1), "gndvi0": (0, 1), "gndvi": (0, 1),
+               "evi2": (0, 2), "ndvi": (0, 2), "rdvi": (0, 2), "savi": (0, 2), "sr": (0, 2)}
+
+# Band calibration of the NoIR camera: blue carries the NIR signal, red the visible red
+nir_gain = 1.664  # !!! change
+red_gain = 0.953  # !!! change
+
+
+def pair_grid(channels: tuple) -> np.ndarray:
+    """
+    :param channels: tuple - The two channel numbers (first, second) of a band pair
+    :return: np.ndarray - 256 x 256 BGR uint8 image holding every pair of values of the two bands, pixel
+                          (first, second); evaluating an index of that pair on it gives the index for all 65536
+                          pairs, entry (first << 8) | second
+    """
+    first, second = channels
+    grid = np.zeros((256, 256, 3), dtype=np.uint8)
+    grid[:, :, first] = np.arange(256, dtype=np.uint8)[:, None]
+    grid[:, :, second] = np.arange(256, dtype=np.uint8)[None, :]
+    return grid
+
+
+class VIEngine:
+    """
+    Computes any subset of the vegetation indices from one cropped BGR frame in float32.
+    The frame is processed in strips of block_rows rows: the calibrated bands and the intermediates shared by
+    several indices (nir - red, nir + red) are computed once per strip into small scratch buffers that stay in
+    cache, and every index writes straight into its plane of a preallocated cube.
+    Bands are read as strided views of the frame, no channel is copied.
+    Indices:
+        ndvi     = nir / red - 1 (same definition as the original extraction so ndvi.json values do not move)
+        sr       = nir / red
+        gndvi    = (nir - green) / (nir + green)
+        gndvi0   = (B - G) / (B + G) on the uncalibrated bands
+        cigreen  = nir / green - 1
+        cigreen0 = B / G - 1 on the uncalibrated bands
+        evi2     = 2.5 (nir - red) / (nir + 2.4 red + 1)
+        rdvi     = (nir - red) / sqrt(nir + red)
+        savi     = 1.5 (nir - red) / (nir + red + 0.5)
+    with nir = nir_gain * B / 255, red = red_gain * R / 255 and green = G / 255 as reflectance-like values.
+    Pixels with a zero denominator give inf or nan like the float64 path, and are dropped by the plot statistics.
+    """
+    def __init__(self, names: list = vi_names, block_rows: int = 32):
+        unknown = set(names) - set(vi_names)
+        if unknown:
+            raise ValueError(f"Unknown vegetation indices {sorted(unknown)}")
+        self.names: list = list(names)
+        self.block_rows: int = block_rows
+        self.buffer: np.ndarray = None  # Reused output cube, reallocated only when the crop size changes
+        self.scratch: dict = {}
+
+    def __repr__(self):
+        return f"VIEngine(names={self.names}, block_rows={self.block_rows})"
+
+    def _scratch(self, width: int) -> dict:
+        """
+        :param width: int - Frame width
+        :return: dict - float32 strip buffers of block_rows x width, allocated once per width
+        """
+        if self.scratch.get("width") != width:
+            shape = (self.block_rows, width)
+            self.scratch = {"width": width}
+            for name in ("nir", "red", "green", "diff", "total", "tmp"):
+                self.scratch[name] = np.empty(shape, dtype=np.float32)
+        return self.scratch
+
+    def cube(self, img: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Computes the requested indices of a cropped frame
+        :param img: np.ndarray - Cropped BGR (or BGRA) uint8 frame
+        :param out: np.ndarray - Optional float32 array of shape (len(names), height, width) to write into;
+                                 by default the engine's own buffer, overwritten by the next call
+        :return: np.ndarray - float32 cube, one plane per index in the order of names
+        """
+        height, width = img.shape[:2]
+        shape = (len(self.names), height, width)
+        if out is None:
+            if self.buffer is None or self.buffer.shape != shape:
+                self.buffer = np.empty(shape, dtype=np.float32)
+            out = self.buffer
+        names = set(self.names)
+        need_red = bool(names & {"ndvi", "sr", "evi2", "rdvi", "savi"})
+        need_green = bool(names & {"gndvi", "cigreen"})
+        need_diff = bool(names & {"evi2", "rdvi", "savi"})
+        need_total = bool(names & {"rdvi", "savi"})
+        need_nir = need_red or need_green
+        scratch = self._scratch(width)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for top in range(0, height, self.block_rows):
+                bottom = min(top + self.block_rows, height)
+                rows = bottom - top
+                b, g, r = img[top:bottom, :, 0], img[top:bottom, :, 1], img[top:bottom, :, 2]
+                nir, red, green = scratch["nir"][:rows], scratch["red"][:rows], scratch["green"][:rows]
+                diff, total, tmp = scratch["diff"][:rows], scratch["total"][:rows], scratch["tmp"][:rows]
+                if need_nir:
+                    np.multiply(b, nir_gain / 255, out=nir, dtype=np.float32)
+                if need_red:
+                    np.multiply(r, red_gain / 255, out=red, dtype=np.float32)
+                if need_green:
+                    np.multiply(g, 1 / 255, out=green, dtype=np.float32)
+                if need_diff:
+                    np.subtract(nir, red, out=diff)
+                if need_total:
+                    np.add(nir, red, out=total)
+
+                for plane, name in enumerate(self.names):
+                    o = out[plane, top:bottom]
+                    if name == "ndvi":
+                        np.divide(nir, red, out=o)
+                        o -= 1
+                    elif name == "sr":
+                        np.divide(nir, red, out=o)
+                    elif name == "gndvi":
+                        np.subtract(nir, green, out=tmp)
+                        np.add(nir, green, out=o)
+                        np.divide(tmp, o, out=o)
+                    elif name == "gndvi0":
+                        np.subtract(b, g, out=tmp, dtype=np.float32)
+                        np.add(b, g, out=o, dtype=np.float32)
+                        np.divide(tmp, o, out=o)
+                    elif name == "cigreen":
+                        np.divide(nir, green, out=o)
+                        o -= 1
+                    elif name == "cigreen0":
+                        np.divide(b, g, out=o, dtype=np.float32)
+                        o -= 1
+                    elif name == "evi2":
+                        np.multiply(red, 2.4, out=o)
+                        o += nir
+                        o += 1
+                        np.divide(diff, o, out=o)
+                        o *= 2.5
+                    elif name == "rdvi":
+                        np.sqrt(total, out=o)
+                        np.divide(diff, o, out=o)
+                    elif name == "savi":
+                        np.add(total, 0.5, out=o)
+                        np.divide(diff, o, out=o)
+                        o *= 1.5
+        return out
+
+    def compute(self, img: np.ndarray) -> dict:
+        """
+        :param img: np.ndarray - Cropped BGR uint8 frame
+        :return: dict - Index name -> float32 image, views into the engine's cube
+        """
+        cube = self.cube(img)
+        return {name: cube[plane] for plane, name in enumerate(self.names)}
@@ -0,0 +1,253 @@
+import os
+
+import cv2
+import numpy as np
+
+from DataStructures.histogram_spec import HistogramSpec
+from Helpers.encoders import read_frame_file
+from Helpers.plot_labels import grouped_stats, plot_groups
+from Helpers.plot_layouts import MaskCache, load_layouts
+from Helpers.segmentation import Segmenter
+from Helpers.tiled_extraction import tiled_cube_stats, tiled_stats
+from Helpers.vi_engine import VIEngine, vi_names
+
+# Crop window (top, bottom, left, right) of the NoIR camera in the side-by-side stereo frame
+stereo_crop = (100, 900, 1280, 2496)
+# The same window on the NoIR view on its own (the right half of the stereo frame)
+nir_crop = (100, 900, 0, 1216)
+
+# Plots used when no polygons are given: the first layout of the sensor's layout file (see Layouts/ and
+# extract_layouts); edit the plots in the layout file, not here
+layout_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Layouts')
+layout_file = os.path.join(layout_folder, 'IOT11.json')  # !!! change
+default_layout = load_layouts(layout_file)[0]
+plot_polygons = default_layout.polygons
+plot_names = default_layout.plot_ids
+
+stat_header = ['timestamp', 'mean', 'median', 'std', 'max', 'p95', 'p90', 'p85']
+# Version of the index formulas, calibration and statistics; bump it to have incremental runs re-extract every frame
+index_version = 1
+
+# Per-plot histogram bins of every index over the valid (> 0) range, the last bin counts everything above
+histogram_specs = {'cigreen0': HistogramSpec(0.0, 8.0),
+                   'cigreen': HistogramSpec(0.0, 8.0),
+                   'evi2': HistogramSpec(0.0, 2.0),
+                   'gndvi0': HistogramSpec(0.0, 1.0),
+                   'gndvi': HistogramSpec(0.0, 1.0),
+                   'ndvi': HistogramSpec(0.0, 4.0),
+                   'rdvi': HistogramSpec(0.0, 1.5),
+                   'savi': HistogramSpec(0.0, 1.5),
+                   'sr': HistogramSpec(0.0, 5.0)}
+
+
+def nir_window(crop: tuple) -> tuple:
+    """
+    :param crop: tuple - (top, bottom, left, right) window in the side-by-side stereo frame, e.g. a layout's crop
+    :return: tuple - The same window on the NoIR view on its own, as the capture service stores it
+    """
+    shift = stereo_crop[2] - nir_crop[2]
+    return crop[0], crop[1], crop[2] - shift, crop[3] - shift
+
+
+def read_frame(frame) -> np.ndarray:
+    """
+    Returns the frame as a BGR array, reading it from disk only when given a path
+    :param frame: np.ndarray or str - In-memory BGR frame or the path of an image file
+    :return: np.ndarray - BGR frame
+    """
+    if isinstance(frame, np.ndarray):
+        return frame
+    img = read_frame_file(os.fspath(frame))
+    if img is None:
+        raise ValueError(f"Could not read image {frame}")
+    return img
+
+
+def compute_ndvi(img: np.ndarray) -> np.ndarray:
+    """
+    Calculates the calibrated ndvi of a cropped BGR frame
+    :param img: np.ndarray - Cropped BGR frame
+    :return: np.ndarray - ndvi image
+    """
+    # Split the color band
+    b, g, r = cv2.split(img)
+    return ((1.664 * (b.astype(float))) / (0.953 * (r.astype(float)))) - 1
+
+
+def segment_frame(ndvi: np.ndarray, img: np.ndarray, segmenter: Segmenter, polygons: list = plot_polygons) -> tuple:
+    """
+    Classifies the plot pixels of one frame into vegetation and background, with one threshold for the frame
+    :param ndvi: np.ndarray - ndvi image of the crop
+    :param img: np.ndarray - Cropped BGR frame, used by the excess green method
+    :param segmenter: Segmenter - Segmentation method
+    :param polygons: list - Plot polygons in cropped image coordinates
+    :return: tuple - (bool per gathered plot pixel, threshold), pass it to extract_plot_stats and extract_indices
+    """
+    groups = plot_groups(polygons, ndvi.shape)
+    pixels = img.reshape(-1, img.shape[2])[groups.index] if segmenter.method == "exg" else None
+    return segmenter.classify(groups.gather(ndvi), pixels)
+
+
+def extract_plot_stats(ndvi: np.ndarray, timestamp: str, polygons: list = plot_polygons,
+                       names: list = plot_names, histogram: HistogramSpec = None, segmentation: tuple = None) -> dict:
+    """
+    Summarizes the ndvi inside every plot polygon. The polygons are rasterized once per layout and crop size
+    into a label image; every frame then costs one gather of the plot pixels and grouped reductions, however
+    many plots there are. Non-positive and NaN values are left out like in the original extraction.
+    :param ndvi: np.ndarray - ndvi image
+    :param timestamp: str - Timestamp stored with every plot
+    :param polygons: list - Plot polygons in cropped image coordinates
+    :param names: list[str] - Plot name of every polygon
+    :param histogram: HistogramSpec - When given, each plot also gets its histogram under "hist", computed in the
+                                      same pass as the statistics
+    :param segmentation: tuple - From segment_frame: the statistics cover vegetation pixels only and each plot
+                                 gets its canopy "cover" and the frame's "threshold"
+    :return: dict - Plot name -> dict of the stat_header values
+    """
+    groups = plot_groups(polygons, ndvi.shape)
+    vegetation, threshold = segmentation or (None, None)
+    stats = grouped_stats(groups.gather(ndvi), groups.plot_ids, groups.count, histogram=histogram,
+                          vegetation=vegetation)
+    if segmentation is not None:
+        stats["threshold"] = np.full(groups.count, threshold)
+    return plot_dicts(stats, timestamp, names, histogram)
+
+
+def plot_dicts(stats: dict, timestamp: str, names: list, histogram: HistogramSpec = None) -> dict:
+    """
+    :param stats: dict - Per-plot statistic arrays from grouped_stats or tiled_stats
+    :param timestamp: str - Timestamp stored with every plot
+    :param names: list[str] - Plot name of every polygon
+    :param histogram: HistogramSpec - Bins of stats["hist"], when histograms were computed
+    :return: dict - Plot name -> dict of the stat_header values and "min", plus "cover" and "threshold" when
+                    segmented and "clipped" from the fixed-point path
+    """
+    nd = []
+    for plot in range(len(names)):
+        data = [timestamp] + [round(float(stats[name][plot]), 5) for name in stat_header[1:]]
+        nd.append(dict(zip(stat_header, data)))
+        for name in ('min', 'cover', 'threshold', 'clipped'):
+            if name in stats:
+                nd[-1][name] = round(float(stats[name][plot]), 5)
+        if histogram is not None:
+            nd[-1]['hist'] = histogram.to_dict(stats['hist'][plot])
+    # Match each ndvi dict with their plot's name
+    return dict(zip(names, nd))
+
+
+def prepare_crop(frame, crop: tuple = stereo_crop, tracker=None, gated: bool = False) -> np.ndarray:
+    """
+    Reads, crops and optionally aligns a frame
+    :param frame: np.ndarray or str - BGR frame or image path
+    :param crop: tuple - (top, bottom, left, right) crop window of the NoIR image
+    :param tracker: DriftTracker - Aligns the crop to the sensor's reference frame when given
+    :param gated: bool - The frame passed the quality gate, it may become the tracker's reference
+    :return: np.ndarray - Cropped BGR frame, a view of the frame unless aligned
+    """
+    top, bottom, left, right = crop
+    img = read_frame(frame)[top:bottom, left:right]  # A view, the crop is not copied
+    if tracker is not None:
+        img, _ = tracker.align(img, gated)
+    return img
+
+
+def extract_ndvi(frame, timestamp: str, crop: tuple = stereo_crop, polygons: list = plot_polygons,
+                 names: list = plot_names, tracker=None, histogram: HistogramSpec = None,
+                 memory_budget: int = None) -> dict:
+    """
+    Extracts per-plot ndvi statistics from one frame, given either as an array (live capture) or a path
+    (offline reprocessing)
+    :param frame: np.ndarray or str - BGR frame or image path
+    :param timestamp: str - Timestamp stored with every plot
+    :param crop: tuple - (top, bottom, left, right) crop window of the NoIR image
+    :param polygons: list - Plot polygons in cropped image coordinates
+    :param names: list[str] - Plot name of every polygon
+    :param tracker: DriftTracker - Aligns the crop to the sensor's reference frame before masking when given
+    :param histogram: HistogramSpec - Adds a per-plot ndvi histogram when given
+    :param memory_budget: int - When given, the plots are summarized from band-pair counts within this many bytes,
+                                instead of from one full-size float64 ndvi image
+    :return: dict - Plot name -> dict of the stat_header values
+    """
+    img = prepare_crop(frame, crop, tracker)
+    if memory_budget is None:
+        return extract_plot_stats(compute_ndvi(img), timestamp, polygons, names, histogram)
+    return extract_tiled(img, compute_ndvi, timestamp, memory_budget, polygons, names, histogram)
+
+
+def extract_tiled(img: np.ndarray, index_fn, timestamp: str, memory_budget: int, polygons: list = plot_polygons,
+                  names: list = plot_names, histogram: HistogramSpec = None) -> dict:
+    """
+    Memory-bounded extraction: the index is evaluated on every pair of its two bands and each plot is summarized
+    from how often the pairs occur in it, with the same results as the full-size path
+    :param img: np.ndarray - Cropped (and aligned) BGR frame
+    :param index_fn: callable - Index image of a BGR image, e.g. compute_ndvi, a function of the ndvi bands only
+    :param timestamp: str - Timestamp stored with every plot
+    :param memory_budget: int - Bytes the extraction may allocate, besides the frame and the cached plot groups
+    :param polygons: list - Plot polygons in cropped image coordinates
+    :param names: list[str] - Plot name of every polygon
+    :param histogram: HistogramSpec - Adds a per-plot histogram when given
+    :return: dict - Plot name -> dict of the stat_header values
+    """
+    stats = tiled_stats(img, index_fn, polygons, memory_budget, histogram)
+    return plot_dicts(stats, timestamp, names, histogram)
+
+
+def extract_indices(img: np.ndarray, timestamp: str, engine: VIEngine = None, polygons: list = plot_polygons,
+                    names: list = plot_names, histograms: bool = True, segmentation: tuple = None,
+                    memory_budget: int = None) -> dict:
+    """
+    Extracts per-plot statistics, and histograms, of several vegetation indices from one cropped frame
+    :param img: np.ndarray - Cropped (and aligned) BGR frame, see prepare_crop
+    :param timestamp: str - Timestamp stored with every plot
+    :param engine: VIEngine - Engine with the indices to compute, all of them by default; pass the same engine
+                              for every frame so its buffers are reused
+    :param polygons: list - Plot polygons in cropped image coordinates
+    :param names: list[str] - Plot name of every polygon
+    :param histograms: bool - Add the per-plot histogram of every index
+    :param segmentation: tuple - From segment_frame: every index is summarized over the same vegetation pixels
+    :param memory_budget: int - When given, the plots are summarized from band-pair counts within this many bytes,
+                                instead of from one full-size cube; needs segmentation None
+    :return: dict - Index name -> plot name -> dict of the stat_header values
+    """
+    engine = engine or VIEngine(vi_names)
+    if memory_budget is not None:
+        if segmentation is not None:
+            raise ValueError("Segmentation needs the full-size index images, it cannot be used with memory_budget")
+        specs = {name: histogram_specs[name] if histograms else None for name in engine.names}
+        stats = tiled_cube_stats(img, engine, polygons, memory_budget, specs)
+        return {name: plot_dicts(stats[name], timestamp, names, specs[name]) for name in engine.names}
+    results = {}
+    for name, image in engine.compute(img).items():
+        spec = histogram_specs[name] if histograms else None
+        results[name] = extract_plot_stats(image, timestamp, polygons, names, spec, segmentation)
+    return results
+
+
+def extract_layouts(frame, timestamp: str, layouts: list, masks: MaskCache = None, index_fn=compute_ndvi,
+                    trackers: dict = None, histogram: HistogramSpec = None) -> dict:
+    """
+    Extracts per-plot statistics of several plot layouts from one frame. The frame is read once, layouts sharing
+    a crop window share one index image, and every layout's compiled masks come from the mask cache.
+    :param frame: np.ndarray or str - BGR frame or image path
+    :param timestamp: str - Timestamp stored with every plot
+    :param layouts: list[PlotLayout] - Layouts to extract, see Helpers/plot_layouts.load_layouts
+    :param masks: MaskCache - Compiled masks of the layouts, kept in memory only when not given
+    :param index_fn: callable - Index image of a cropped BGR frame, compute_ndvi by default
+    :param trackers: dict - Layout name -> DriftTracker aligning that layout's crop, when given
+    :param histogram: HistogramSpec - Adds a per-plot histogram when given
+    :return: dict - Layout name -> plot ID -> dict of the stat_header values
+    """
+    masks = masks or MaskCache()
+    trackers = trackers or {}
+    img = read_frame(frame)
+    images = {}
+    results = {}
+    for layout in layouts:
+        key = (layout.crop, layout.name if layout.name in trackers else None)
+        if key not in images:
+            images[key] = index_fn(prepare_crop(img, layout.crop, trackers.get(layout.name)))
+        index = images[key]
+        groups = masks.groups(layout, index.shape)
+        stats = grouped_stats(groups.gather(index), groups.plot_ids, groups.count, histogram=histogram)
+        results[layout.name] = plot_dicts(stats, timestamp, layout.plot_ids, histogram)
+    return results
@@ -0,0 +1,161 @@
+import hashlib
+import inspect
+import os
+
+import numpy as np
+
+from Helpers.vi_engine import VIEngine, nir_gain, pair_grid, red_gain, vi_channels, vi_names
+from Helpers.vi_extractor import compute_ndvi, index_version
+
+# Source of the formulas the tables are built from, part of every cache file name with the band gains and
+# index_version: an edited formula or a version bump builds new tables instead of loading stale ones
+formula_source = inspect.getsource(VIEngine) + inspect.getsource(compute_ndvi)
+
+
+def build_table(name: str) -> np.ndarray:
+    """
+    Evaluates an index for every pair of 8-bit band values with the arithmetic engine, so both paths share
+    one definition of the formulas
+    :param name: str - Index name
+    :return: np.ndarray - float32 table of 65536 values, entry (first << 8) | second
+    """
+    return VIEngine([name]).cube(pair_grid(vi_channels[name]))[0].reshape(-1).copy()
+
+
+def pair_key(img: np.ndarray, channels: tuple, out: np.ndarray = None) -> np.ndarray:
+    """
+    :param img: np.ndarray - BGR uint8 frame
+    :param channels: tuple - The two channel numbers a table is indexed by
+    :param out: np.ndarray - Optional uint16 array of the frame size to write into
+    :return: np.ndarray - uint16 table entry of every pixel, (first << 8) | second
+    """
+    if out is None:
+        out = np.empty(img.shape[:2], dtype=np.uint16)
+    np.left_shift(img[:, :, channels[0]], 8, out=out, dtype=np.uint16)
+    np.bitwise_or(out, img[:, :, channels[1]], out=out)
+    return out
+
+
+def save_table(path: str, table: np.ndarray) -> None:
+    """
+    Writes a cached table through a temporary file and an atomic rename, like MaskCache, so a power cut or a
+    second process never leaves a half written table to be loaded
+    :param path: str - .npy path of the table
+    :param table: np.ndarray - Table
+    :return: None
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path[:-len(".npy")] + f".{os.getpid()}.tmp.npy"
+    np.save(tmp_path, table)
+    os.replace(tmp_path, path)
+
+
+def ndvi_table(folder: str = None) -> np.ndarray:
+    """
+    float64 ndvi table built with compute_ndvi itself, so a lookup gives exactly the values of the arithmetic
+    path and ndvi.json does not change; cached on disk like the LUTEngine tables
+    :param folder: str - Cache folder, no disk cache when None
+    :return: np.ndarray - float64 table of 65536 values indexed by (B << 8) | R
+    """
+    path = os.path.join(folder, LUTEngine.table_id("ndvi64") + ".npy") if folder else None
+    if path and os.path.exists(path):
+        return np.load(path)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        table = compute_ndvi(pair_grid(vi_channels["ndvi"])).reshape(-1)
+    if path:
+        save_table(path, table)
+    return table
+
+
+def lookup_ndvi(img: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """
+    :param img: np.ndarray - Cropped BGR uint8 frame
+    :param table: np.ndarray - Table from ndvi_table
+    :return: np.ndarray - float64 ndvi image, identical to compute_ndvi(img)
+    """
+    return np.take(table, pair_key(img, vi_channels["ndvi"]), mode="clip")
+
+
+class LUTEngine:
+    """
+    Computes vegetation indices of 8-bit frames by table lookup: every index is a function of two 8-bit bands,
+    so one 256 x 256 float32 table (256 KB) per index replaces all per-pixel arithmetic and division.
+    A frame costs one 16-bit key per band pair, shared by the indices of that pair, and one gather per index,
+    done in strips of block_rows rows so the keys stay in cache between gathers.
+    Tables are built once per formula, calibration and index_version and cached on disk as .npy files.
+    Same interface as VIEngine, and the same float32 values.
+    """
+    def __init__(self, names: list = vi_names, folder: str = None, block_rows: int = 64):
+        unknown = set(names) - set(vi_names)
+        if unknown:
+            raise ValueError(f"Unknown vegetation indices {sorted(unknown)}")
+        self.names: list = list(names)
+        self.folder: str = folder  # No disk cache when None
+        self.block_rows: int = block_rows
+        self.tables: dict = {name: self.load_table(name) for name in self.names}
+        self.buffer: np.ndarray = None
+        self.keys: dict = {}
+
+    def __repr__(self):
+        return f"LUTEngine(names={self.names}, folder={self.folder})"
+
+    @staticmethod
+    def table_id(name: str) -> str:
+        """
+        :param name: str - Index name
+        :return: str - Cache file stem, changes with the band gains, the formulas and index_version
+        """
+        key = f"{name}:{nir_gain}:{red_gain}:{index_version}:{formula_source}"
+        digest = hashlib.sha1(key.encode()).hexdigest()[:10]
+        return f"{name}_{digest}"
+
+    def load_table(self, name: str) -> np.ndarray:
+        """
+        :param name: str - Index name
+        :return: np.ndarray - Lookup table of the index, read from the cache or built and written to it
+        """
+        if self.folder is None:
+            return build_table(name)
+        path = os.path.join(self.folder, self.table_id(name) + ".npy")
+        if os.path.exists(path):
+            return np.load(path)
+        table = build_table(name)
+        save_table(path, table)
+        return table
+
+    def cube(self, img: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Computes the requested indices of a cropped frame
+        :param img: np.ndarray - Cropped BGR (or BGRA) uint8 frame
+        :param out: np.ndarray - Optional float32 array of shape (len(names), height, width) to write into;
+                                 by default the engine's own buffer, overwritten by the next call
+        :return: np.ndarray - float32 cube, one plane per index in the order of names
+        """
+        height, width = img.shape[:2]
+        shape = (len(self.names), height, width)
+        if out is None:
+            if self.buffer is None or self.buffer.shape != shape:
+                self.buffer = np.empty(shape, dtype=np.float32)
+            out = self.buffer
+        pairs = {vi_channels[name] for name in self.names}
+        if self.keys.get("width") != width:
+            self.keys = {pair: np.empty((self.block_rows, width), dtype=np.uint16) for pair in pairs}
+            self.keys["width"] = width
+        for top in range(0, height, self.block_rows):
+            bottom = min(top + self.block_rows, height)
+            strip = img[top:bottom]
+            for pair in pairs:
+                pair_key(strip, pair, self.keys[pair][:bottom - top])
+            for plane, name in enumerate(self.names):
+                # Keys are always in range, "clip" only skips numpy's bounds checking
+                np.take(self.tables[name], self.keys[vi_channels[name]][:bottom - top], out=out[plane, top:bottom],
+                        mode="clip")
+        return out
+
+    def compute(self, img: np.ndarray) -> dict:
+        """
+        :param img: np.ndarray - Cropped BGR uint8 frame
+        :return: dict - Index name -> float32 image, views into the engine's cube
+        """
+        cube = self.cube(img)
+        return {name: cube[plane] for plane, name in enumerate(self.names)}
@@ -0,0 +1,8 @@
+# Tests of the Raspberry Pi programs
+# Run from anywhere:  python3 -m pytest 1_Camera_Development/2_Program_on_RasPi/tests
+
+import os
+import sys
+
+# The programs import Helpers and DataStructures from 2_Program_on_RasPi
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
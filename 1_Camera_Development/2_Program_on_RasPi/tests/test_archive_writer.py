@@ -0,0 +1,44 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from Helpers.archive_writer import ArchiveWriter
+from Helpers.camera import synthetic_field_frame
+from Helpers.vi_extractor import extract_ndvi, stereo_crop
+
+
+def test_in_memory_extraction_matches_a_lossless_file(tmp_path):
+    frame = synthetic_field_frame((2560, 1248), np.random.default_rng(0))
+    path = str(tmp_path / "frame.png")
+    cv2.imwrite(path, frame)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        in_memory = extract_ndvi(frame, "t", crop=stereo_crop)
+        from_file = extract_ndvi(path, "t", crop=stereo_crop)
+    assert in_memory
+    assert json.dumps(in_memory, sort_keys=True) == json.dumps(from_file, sort_keys=True)
+
+
+def test_every_submitted_frame_is_archived_unchanged(tmp_path):
+    frames = [synthetic_field_frame((640, 312), np.random.default_rng(seed)) for seed in range(4)]
+    written = []
+    archiver = ArchiveWriter(max_pending=2)
+    for number, frame in enumerate(frames):
+        archiver.submit(str(tmp_path / "day" / f"frame_{number}.png"), frame, on_written=written.append)
+    archiver.close()
+    assert archiver.written == len(frames) and not archiver.errors
+    assert sorted(written) == sorted(str(tmp_path / "day" / f"frame_{number}.png") for number in range(len(frames)))
+    for number, frame in enumerate(frames):
+        assert np.array_equal(cv2.imread(os.path.join(str(tmp_path), "day", f"frame_{number}.png")), frame)
+
+
+def test_a_failed_write_is_recorded_and_the_writer_goes_on(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("not a folder")
+    frame = synthetic_field_frame((640, 312), np.random.default_rng(0))
+    archiver = ArchiveWriter()
+    archiver.submit(str(blocker / "frame.png"), frame)
+    archiver.submit(str(tmp_path / "frame.png"), frame)
+    archiver.close()
+    assert archiver.written == 1 and len(archiver.errors) == 1
@@ -0,0 +1,75 @@
+import csv
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from DataStructures.encoder_settings import EncoderSettings
+from Helpers.backfill import ResultWriter, frame_timestamp, iter_archive, run_backfill
+from Helpers.camera import synthetic_field_frame
+from Helpers.encoders import write_frame
+from Helpers.vi_extractor import layout_file
+
+frames = 6
+
+
+@pytest.fixture(scope="module")
+def archive(tmp_path_factory):
+    folder = str(tmp_path_factory.mktemp("image"))
+    frame = synthetic_field_frame((2560, 1248), np.random.default_rng(0))
+    for number in range(frames):
+        write_frame(os.path.join(folder, f"01-05-2026_{8 + number:02d}-00-00_1"), frame,
+                    EncoderSettings("jpeg", quality=95))
+    return folder
+
+
+def read_rows(folder: str) -> list:
+    rows = []
+    for name in sorted(os.listdir(folder)):
+        if name.startswith("part-"):
+            with open(os.path.join(folder, name), newline="") as f:
+                rows.extend(list(csv.reader(f))[1:])
+    return rows
+
+
+def test_frame_timestamps_of_both_archive_layouts():
+    assert frame_timestamp("image/01-05-2026_08-30-00_2.png") == datetime(2026, 5, 1, 8, 30)
+    assert frame_timestamp("nir/2026-05-01/nir_083000.jpg") == datetime(2026, 5, 1, 8, 30)
+
+
+def test_interrupted_run_resumes_without_losing_or_duplicating_rows(archive, tmp_path):
+    complete = str(tmp_path / "complete")
+    assert run_backfill(archive, complete, "test", workers=1, part_frames=2, report_every=0)["frames"] == frames
+
+    # Only the first part was logged, a half written part is left behind
+    output = str(tmp_path / "resume")
+    writer = ResultWriter(output)
+    first = iter_archive(archive)[:2]
+    writer.write_part([row for row in read_rows(complete) if row[2] in first], first)
+    with open(os.path.join(output, "part-00002.csv.tmp"), "w") as f:
+        f.write("half written")
+    summary = run_backfill(archive, output, "test", workers=1, part_frames=2, report_every=0)
+    assert summary["skipped"] == 2 and summary["frames"] == frames - 2 and not summary["failed"]
+    assert run_backfill(archive, output, "test", workers=1, part_frames=2, report_every=0)["frames"] == 0
+    assert not any(name.endswith(".tmp") for name in os.listdir(output))
+    assert sorted(read_rows(output)) == sorted(read_rows(complete))
+
+
+def test_plots_come_from_the_layout_file(archive, tmp_path):
+    with open(layout_file) as f:
+        values = json.load(f)
+    plots = values["layouts"][0]["plots"]
+    values["layouts"][0]["plots"] = {"north": plots["vr1_1"], "south": plots["vr4_1"]}
+    path = str(tmp_path / "layout.json")
+    with open(path, "w") as f:
+        json.dump(values, f)
+    output = str(tmp_path / "out")
+    run_backfill(archive, output, "test", workers=1, report_every=0, layout_path=path)
+    rows = read_rows(output)
+    assert {row[3] for row in rows} == {"north", "south"}
+    default = str(tmp_path / "default")
+    run_backfill(archive, default, "test", workers=1, report_every=0)
+    by_plot = {(row[2], row[3], row[4]): row[5:] for row in read_rows(default)}
+    assert all(row[5:] == by_plot[(row[2], {"north": "vr1_1", "south": "vr4_1"}[row[3]], row[4])] for row in rows)
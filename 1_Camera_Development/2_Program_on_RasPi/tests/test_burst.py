@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from Helpers.burst import fuse_mean
+
+
+def test_fuse_mean_rounds_to_nearest():
+    frames = np.array([[[[0]]], [[[1]]], [[[1]]], [[[1]]]], dtype=np.uint8)
+    assert fuse_mean(frames)[0, 0, 0] == 1  # 0.75
+
+
+def test_fuse_mean_of_256_saturated_frames_does_not_wrap():
+    frames = np.full((256, 2, 2, 3), 255, dtype=np.uint8)
+    assert (fuse_mean(frames) == 255).all()
+    out = np.empty((2, 2, 3), dtype=np.uint8)
+    assert fuse_mean(frames, out) is out and (out == 255).all()
+
+
+def test_fuse_mean_rejects_more_than_256_frames():
+    with pytest.raises(ValueError):
+        fuse_mean(np.full((257, 1, 1, 3), 255, dtype=np.uint8))
@@ -0,0 +1,144 @@
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+from DataStructures.plot_rollup import PlotRollup
+from Helpers.camera import synthetic_field_frame
+from Helpers.daily_rollup import DailyRollups, schema
+from Helpers.plot_labels import plot_groups
+from Helpers.vi_extractor import extract_indices, plot_polygons, prepare_crop
+from Helpers.vi_lut import LUTEngine
+
+sessions = 4
+frames_per_session = 3
+
+
+def state(rollups: dict) -> dict:
+    """Everything a rollup holds, for exact comparison"""
+    return {(vi, plot): (rollup.frames, rollup.total, rollup.squares, rollup.minimum, rollup.maximum,
+                         tuple(rollup.counts), rollup.skipped)
+            for vi, plots in rollups.items() for plot, rollup in plots.items()}
+
+
+@pytest.fixture(scope="module")
+def day():
+    """One day of frames, the last one with red = 0 pixels in the first plot, and the valid ndvi of every plot"""
+    engine = LUTEngine()
+    frames, pixels = [], {}
+    groups = None
+    for number in range(sessions * frames_per_session):
+        img = prepare_crop(synthetic_field_frame((2560, 1248), np.random.default_rng(number))).copy()
+        if number == sessions * frames_per_session - 1:
+            x, y = plot_polygons[0][0]
+            img[y + 20, x:x + 4, 0] = 200
+            img[y + 20, x:x + 4, 2] = 0
+        timestamp = f"01-06-2026_{number // frames_per_session:02d}-00-00"
+        frames.append({"frame": f"frame_{number:03d}.png", "vi": extract_indices(img, timestamp, engine)})
+        groups = groups or plot_groups(plot_polygons, img.shape)
+        values = groups.gather(engine.compute(img)["ndvi"]).astype(np.float64)
+        for plot in range(groups.count):
+            segment = values[groups.plot_ids == plot]
+            pixels.setdefault(plot, []).append(segment[segment > 0])
+    return frames, pixels
+
+
+def test_frames_added_in_any_order_or_grouping_give_the_same_rollups(day, tmp_path):
+    frames, _ = day
+    random.seed(0)
+    ordered = DailyRollups(str(tmp_path / "ordered.sqlite"))
+    shuffled = DailyRollups(str(tmp_path / "shuffled.sqlite"))
+    for result in frames:
+        assert ordered.add(result, result["frame"], "layout")
+    for result in random.sample(frames, len(frames)):
+        shuffled.add(result, result["frame"], "layout")
+    assert not ordered.add(frames[0], frames[0]["frame"], "layout")
+    rollups = ordered.get("2026-06-01")
+    assert state(rollups) == state(shuffled.get("2026-06-01"))
+
+    parts = []
+    for session in range(sessions):
+        part = {}
+        for result in frames[session * frames_per_session:(session + 1) * frames_per_session]:
+            for vi, plots in result["vi"].items():
+                for plot, stats in plots.items():
+                    part.setdefault(vi, {}).setdefault(plot, PlotRollup.empty(stats["hist"])).add(stats)
+        parts.append(part)
+    while len(parts) > 1:
+        first, second = parts.pop(random.randrange(len(parts))), parts.pop(random.randrange(len(parts)))
+        for vi, plots in second.items():
+            for plot, rollup in plots.items():
+                first[vi][plot].merge(rollup)
+        parts.append(first)
+    assert state(rollups) == state(parts[0])
+    ordered.close()
+    shuffled.close()
+
+
+def test_non_finite_frames_are_skipped_and_counted(day, tmp_path):
+    frames, pixels = day
+    rollups = DailyRollups(str(tmp_path / "rollups.sqlite"))
+    for result in frames:
+        rollups.add(result, result["frame"], "layout")
+    ndvi = rollups.get("2026-06-01")["ndvi"]
+    first, *others = ndvi
+    assert frames[-1]["vi"]["ndvi"][first]["mean"] == np.inf
+    assert ndvi[first].skipped == 1 and ndvi[first].frames == len(frames) - 1
+    assert all(ndvi[plot].skipped == 0 and ndvi[plot].frames == len(frames) for plot in others)
+    summary = rollups.payload(["2026-06-01"])["2026-06-01"]["ndvi"][first]
+    assert summary["skipped"] == 1 and np.isfinite(summary["mean"]) and np.isfinite(summary["std"])
+
+    # Mean and std of the finite frames against all their pixels: rebuilt from 5-decimal frame statistics
+    for plot, name in enumerate(ndvi):
+        values = np.concatenate(pixels[plot][:-1] if name == first else pixels[plot])
+        assert ndvi[name].count == len(values)
+        assert abs(ndvi[name].mean - values.mean()) <= 0.5e-5 + 1e-9
+        assert abs(ndvi[name].std - values.std()) <= 5e-5
+        # Percentiles from the histogram, which has empty bins below and above the plot's values
+        width = (ndvi[name].high - ndvi[name].low) / (len(ndvi[name].counts) - 1)
+        assert ndvi[name].counts[0] == 0
+        for q in (0, 5, 50, 95, 100):
+            expected = np.percentile(values, q)
+            if expected < ndvi[name].high:
+                assert abs(ndvi[name].percentile(q) - expected) <= width, (name, q)
+            else:
+                assert ndvi[name].percentile(q) == ndvi[name].high  # In the overflow bin
+    rollups.close()
+
+
+def test_a_re_extracted_frame_replaces_its_contribution(day, tmp_path):
+    frames, _ = day
+    rollups = DailyRollups(str(tmp_path / "rollups.sqlite"))
+    reference = DailyRollups(str(tmp_path / "reference.sqlite"))
+    for result in frames[1:]:
+        rollups.add(result, result["frame"], "layout")
+        reference.add(result, result["frame"], "layout")
+    without_first = state(rollups.get("2026-06-01"))
+    assert rollups.add(frames[0], "first", "layout")
+    assert not rollups.add(dict(frames[0], frame="renamed.png"), "first", "layout")  # Same content, other name
+    rollups.mark_queued(["2026-06-01"])
+
+    # Re-extracted with another layout, here giving the statistics of the second frame
+    assert rollups.add(dict(frames[0], vi=frames[1]["vi"]), "first", "edited layout")
+    assert rollups.dirty_days(before="2026-06-02") == ["2026-06-01"]
+    reference.add(frames[1], "copy of the second", "layout")
+    assert state(rollups.get("2026-06-01")) == state(reference.get("2026-06-01"))
+
+    # Rejected when extracted again: its contribution is withdrawn
+    assert rollups.add({"frame": "first", "quality": {"passed": False}}, "first", "layout")
+    assert state(rollups.get("2026-06-01")) == without_first
+    assert not rollups.add({"frame": "other", "quality": {"passed": False}}, "other", "layout")
+    rollups.close()
+    reference.close()
+
+
+def test_stores_without_the_skipped_column_are_upgraded(day, tmp_path):
+    path = str(tmp_path / "old.sqlite")
+    db = sqlite3.connect(path)
+    db.executescript(schema.replace("    skipped INTEGER NOT NULL DEFAULT 0,\n", ""))
+    db.close()
+    rollups = DailyRollups(path)
+    assert rollups.add(day[0][0], "frame", "layout")
+    assert rollups.get("2026-06-01")["ndvi"]["vr1_1"].skipped == 0
+    rollups.close()
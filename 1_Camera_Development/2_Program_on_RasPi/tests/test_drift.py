@@ -0,0 +1,48 @@
+import cv2
+import numpy as np
+import pytest
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.drift import DriftTracker, shift_image
+from Helpers.vi_extractor import prepare_crop
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return prepare_crop(synthetic_field_frame((2560, 1248), np.random.default_rng(0))).copy()
+
+
+def test_a_known_shift_is_estimated_and_undone(reference, tmp_path):
+    tracker = DriftTracker(str(tmp_path), "IOT11")
+    tracker.set_reference(reference)
+    aligned, report = tracker.align(shift_image(reference, 7.3, -4.1))
+    assert report["method"] == "phase" and not report["reused"]
+    assert abs(report["dx"] - 7.3) < 0.3 and abs(report["dy"] + 4.1) < 0.3
+    inner = (slice(20, -20), slice(20, -20))
+    error = np.abs(aligned[inner].astype(np.int16) - reference[inner]).mean()
+    moved = np.abs(shift_image(reference, 7.3, -4.1)[inner].astype(np.int16) - reference[inner]).mean()
+    assert error < moved / 2  # Not 0: the shift and its undoing both interpolate
+
+
+def test_a_turned_camera_falls_back_to_orb_features(reference, tmp_path):
+    tracker = DriftTracker(str(tmp_path), "IOT11")
+    tracker.set_reference(reference)
+    height, width = reference.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), 4, 1.0)
+    matrix[:, 2] += (12, -7)
+    _, report = tracker.align(cv2.warpAffine(reference, matrix, (width, height)))
+    assert report["response"] < tracker.min_response and report["method"] == "orb"
+    assert abs(report["dx"] - 12) < 1.5 and abs(report["dy"] + 7) < 1.5
+
+
+def test_the_reference_is_only_taken_from_a_frame_that_passed_the_gate(reference, tmp_path, capsys):
+    tracker = DriftTracker(str(tmp_path), "IOT11")
+    frame = shift_image(reference, 3, 2)
+    aligned, report = tracker.align(frame)
+    assert aligned is frame and not report["new_reference"] and not tracker.has_reference
+    assert "No drift reference" in capsys.readouterr().out
+    _, report = tracker.align(reference, gated=True)
+    assert report["new_reference"] and tracker.has_reference
+    assert "Drift reference of IOT11 set" in capsys.readouterr().out
+    _, report = DriftTracker(str(tmp_path), "IOT11").align(frame)
+    assert abs(report["dx"] - 3) < 0.3 and abs(report["dy"] - 2) < 0.3
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from Helpers.camera import FakeCamera
+from Helpers.exposure_cache import ExposureCache, settle_cameras
+
+
+def test_cached_controls_hold_with_ae_off_until_applied_then_ae_follows_the_light(tmp_path):
+    when = datetime(2026, 6, 1, 10, 5)
+    cache = ExposureCache(str(tmp_path / "exposure_cache.json"))
+    cold = FakeCamera(0, resolution=(64, 48), startup_delay=0.0)
+    cold.start()
+    assert not settle_cameras({"nir": cold}, cache, when)["nir"]["from_cache"]
+    cold.stop()
+    saved = cache.get("nir", when)
+
+    camera = FakeCamera(0, resolution=(64, 48), startup_delay=0.0)
+    camera.start()
+    calls, set_controls = [], camera.set_controls
+    camera.set_controls = lambda controls: calls.append(dict(controls)) or set_controls(controls)
+    frames, capture_metadata = [], camera.capture_metadata
+    camera.capture_metadata = lambda: frames.append(capture_metadata()) or frames[-1]
+    report = settle_cameras({"nir": camera}, ExposureCache(cache.path), when)["nir"]
+    camera.stop()
+    assert report["from_cache"] and report["converged"]
+    assert calls[0]["AeEnable"] is False and calls[0]["AwbEnable"] is False
+    assert calls[0]["ExposureTime"] == saved["ExposureTime"]
+    assert frames[0]["ExposureTime"] == saved["ExposureTime"]  # The first frame is exposed with the cached values
+    assert calls[1:] == [{"AeEnable": True, "AwbEnable": True}]
+    assert camera.ae_enabled
@@ -0,0 +1,157 @@
+import json
+import os
+import random
+
+import Helpers.quality_gate
+import Helpers.vi_extractor
+from Helpers.camera import FakeCamera
+from Helpers.field_chain import FieldChain, chain_stages, replicate
+from Helpers.job_runner import JobRunner
+from Helpers.quality_gate import QualityGate
+from Helpers.result_codec import decode_payload
+from Helpers.segmentation import Segmenter
+from Helpers.vi_extractor import layout_file
+
+captures = 4
+
+
+def make_chain(folder: str) -> FieldChain:
+    camera = FakeCamera(0, resolution=(2560, 1248), startup_delay=0.0)
+    camera.start()
+    return FieldChain(camera, folder, os.path.join(folder, "image"), layout_file, "IOT11",
+                      segmenter=Segmenter("otsu"), gate=QualityGate())
+
+
+def close_chain(chain: FieldChain) -> None:
+    chain.close()
+    chain.camera.stop()
+
+
+def jsonl_frames(folder: str) -> list:
+    with open(os.path.join(folder, "ndvi_frames.jsonl")) as frames_file:
+        return [json.loads(line)["frame"] for line in frames_file]
+
+
+def flaky(fn, rng: random.Random):
+    def run(payload):
+        if rng.random() < 0.3:
+            raise OSError("injected failure")
+        return fn(payload)
+    return run
+
+
+def test_failed_stage_runs_are_retried_and_every_frame_extracted_once(tmp_path):
+    folder = str(tmp_path)
+    chain = make_chain(folder)
+    stages = chain_stages(chain)
+    rng = random.Random(0)
+    for stage in stages:
+        stage.fn = flaky(stage.fn, rng)
+    runner = JobRunner(os.path.join(folder, "jobs.sqlite"), stages, 3.0, 6.0, base_delay=0.01, max_delay=0.05)
+    for _ in range(captures):
+        runner.submit("capture", {})
+    assert runner.run_until_idle(timeout=300)
+    metrics = runner.metrics()
+    runner.close()
+    close_chain(chain)
+    assert sum(stage["retries"] for stage in metrics.values()) > 0
+    assert all(stage["failed"] == 0 for stage in metrics.values())
+    frames = jsonl_frames(folder)
+    assert len(frames) == captures and len(set(frames)) == captures
+
+
+def test_jobs_left_running_by_a_power_cut_are_resumed(tmp_path):
+    folder = str(tmp_path)
+    chain = make_chain(folder)
+    stages = chain_stages(chain)
+    db_path = os.path.join(folder, "jobs.sqlite")
+    runner = JobRunner(db_path, stages, 3.0, 6.0, base_delay=0.01, max_delay=0.05)
+    for _ in range(captures):
+        runner.submit("capture", {})
+    while runner.metrics()["capture"]["done"] < captures // 2:
+        runner.step()
+    while runner.running:
+        runner.wake.wait(0.01)
+    with runner.db:
+        runner.db.execute("UPDATE jobs SET state = 'running' WHERE state = 'pending'")
+    runner.close()
+    close_chain(chain)
+
+    chain = make_chain(folder)
+    runner = JobRunner(db_path, chain_stages(chain), 3.0, 6.0, base_delay=0.01, max_delay=0.05)
+    assert runner.recover() > 0
+    assert runner.run_until_idle(timeout=300)
+    metrics = runner.metrics()
+    runner.close()
+    close_chain(chain)
+    frames = jsonl_frames(folder)
+    assert len(frames) == captures and len(set(frames)) == captures
+    assert metrics["upload"]["done"] == captures
+
+
+def test_a_retried_extract_adds_the_frame_once(tmp_path):
+    folder = str(tmp_path)
+    chain = make_chain(folder)
+    payload = chain.quality(chain.capture({}))
+    first = chain.extract(payload)
+    second = chain.extract(payload)
+    close_chain(chain)
+    assert first["drift"] is not None and first["vi"] and first["level"] == 1
+    assert json.dumps(first["ndvi"], sort_keys=True) == json.dumps(second["ndvi"], sort_keys=True)
+    assert jsonl_frames(folder) == [first["frame"]]
+    with open(os.path.join(folder, "ndvi.json")) as json_file:
+        assert json.load(json_file)["frames"] == [first["frame"]]
+
+
+def test_a_png_frame_is_decoded_once_for_the_gate_and_the_extraction(tmp_path, monkeypatch):
+    folder = str(tmp_path)
+    chain = make_chain(folder)
+    payload = chain.capture({})
+    decodes = []
+    read_frame_file = Helpers.vi_extractor.read_frame_file
+    monkeypatch.setattr(Helpers.vi_extractor, "read_frame_file", lambda path: decodes.append(path) or
+                        read_frame_file(path))
+    monkeypatch.setattr(Helpers.quality_gate, "read_reduced", lambda path, factor: decodes.append(path))
+    result = chain.extract(chain.quality(payload))
+    close_chain(chain)
+    assert payload["path"].endswith(".png") and decodes == [payload["path"]]
+    assert result["ndvi"] and chain.decoded is None
+
+
+def test_a_restarted_chain_goes_on_from_the_latest_frames(tmp_path):
+    folder = str(tmp_path)
+    chain = make_chain(folder)
+    payloads = [chain.quality(chain.capture({})) for _ in range(len(replicate) + 1)]
+    for payload in payloads:
+        chain.extract(payload)
+    latest = [result["frame"] for result in chain.latest]
+    close_chain(chain)
+    assert len(latest) == len(replicate)
+    with open(os.path.join(folder, "ndvi_frames.jsonl"), "a") as frames_file:
+        frames_file.write('{"ndvi":{"plot')  # Line cut by a power loss
+
+    chain = make_chain(folder)
+    assert [result["frame"] for result in chain.latest] == latest
+    assert chain.written == {os.path.basename(payload["path"]) for payload in payloads}
+    chain.extract(payloads[-1])
+    close_chain(chain)
+    assert jsonl_frames(folder) == [os.path.basename(payload["path"]) for payload in payloads]
+    with open(os.path.join(folder, "ndvi.json")) as json_file:
+        assert json.load(json_file)["frames"] == latest
+
+
+def test_uploads_follow_the_link_budget_and_a_retry_queues_the_frame_once(tmp_path):
+    folder = str(tmp_path)
+    chain = make_chain(folder)
+    chain.link_budget = 1
+    payload = chain.extract(chain.quality(chain.capture({})))
+    chain.upload(payload)
+    assert chain.queue.depth() == 0  # Over the budget: the frame stays on the device
+    chain.link_budget = None
+    chain.upload(payload)
+    chain.upload(payload)
+    kinds = [kind for _, kind, _ in chain.queue.peek(10)]
+    record = decode_payload(chain.queue.peek(10)[0][2])
+    close_chain(chain)
+    assert kinds == ["frame"]
+    assert record["frame"] == payload["frame"] and "ndvi" in record and "vi" not in record and "path" not in record
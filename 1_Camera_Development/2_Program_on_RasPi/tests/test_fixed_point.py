@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.fixed_point import error_bound, fixed_max, fixed_ndvi_table, fixed_plot_stats, lookup_fixed, scale
+from Helpers.vi_extractor import compute_ndvi, default_layout, extract_plot_stats, prepare_crop, stat_header
+from Helpers.vi_lut import ndvi_table
+
+# Both outputs are rounded to 5 decimals, which adds up to 1e-5
+tolerance = error_bound + 1e-5
+
+
+@pytest.fixture(scope="module")
+def tables():
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return fixed_ndvi_table(), ndvi_table()
+
+
+def stats_of(img: np.ndarray, fixed_table: np.ndarray) -> tuple:
+    layout = default_layout
+    with np.errstate(divide="ignore", invalid="ignore"):
+        exact = extract_plot_stats(compute_ndvi(img), "t", layout.polygons, layout.plot_ids)
+    return exact, fixed_plot_stats(lookup_fixed(img, fixed_table), "t", layout.polygons, layout.plot_ids)
+
+
+def test_table_keeps_the_float_pixels_within_the_bound(tables):
+    fixed, reference = tables
+    assert np.array_equal(fixed > 0, reference > 0)
+    exact = np.isfinite(reference) & (fixed < fixed_max)
+    assert np.abs(fixed[exact] / scale - reference[exact]).max() <= error_bound
+    assert np.all(reference[fixed == fixed_max] >= fixed_max / scale - error_bound)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_unclipped_plot_stats_within_the_bound(tables, seed):
+    frame = synthetic_field_frame((2560, 1248), np.random.default_rng(seed))
+    frame[..., 2] = np.maximum(frame[..., 2], 8)  # Red >= 8 keeps every ndvi below the clipping value
+    exact, fixed = stats_of(prepare_crop(frame, default_layout.crop), tables[0])
+    for plot in exact:
+        assert fixed[plot]["clipped"] == 0
+        for name in stat_header[1:]:
+            assert abs(fixed[plot][name] - exact[plot][name]) <= tolerance, (plot, name)
+
+
+def test_clipped_plots_are_flagged(tables):
+    frame = synthetic_field_frame((2560, 1248), np.random.default_rng(0))
+    frame[..., 2] = np.maximum(frame[..., 2], 8)
+    img = prepare_crop(frame, default_layout.crop).copy()
+    first, *others = default_layout.plot_ids
+    x, y = default_layout.polygons[0][0]
+    img[y + 20, x:x + 4, 2] = 0  # Four red = 0 pixels (ndvi inf) just inside the first plot
+    img[y + 20, x:x + 4, 0] = 200
+    exact, fixed = stats_of(img, tables[0])
+    assert 0 < fixed[first]["clipped"] < 0.01
+    assert exact[first]["max"] == np.inf and fixed[first]["max"] == round(fixed_max / scale, 5)
+    assert all(fixed[plot]["clipped"] == 0 for plot in others)
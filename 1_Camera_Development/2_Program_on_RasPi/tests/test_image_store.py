@@ -0,0 +1,62 @@
+import os
+from datetime import datetime, timedelta
+
+from Helpers.image_store import ImageStore
+from Helpers.upload_queue import UploadQueue
+
+now = datetime(2026, 5, 15, 12, 30)
+
+
+def write(path, size: int = 1000) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    return str(path)
+
+
+def test_uploaded_frames_are_evicted_first_and_recent_frames_kept(tmp_path):
+    store = ImageStore(str(tmp_path / "index.sqlite"), quota_bytes=10 ** 6, keep_recent_hours=48)
+    old = [write(tmp_path / "old" / f"{number}.png") for number in range(4)]
+    for day, path in enumerate(old):
+        store.register(path, "stereo", now - timedelta(days=10 - day))
+    recent = write(tmp_path / "recent.png")
+    store.register(recent, "stereo", now - timedelta(hours=1))
+    store.mark_uploaded(old[2])
+    store.mark_uploaded(old[3])
+    store.quota_bytes = 2500
+    evicted = store.enforce_quota(now)
+    assert evicted == [old[2], old[3], old[0]]  # Uploaded frames first, oldest first, then the oldest of the rest
+    assert not any(os.path.exists(path) for path in evicted) and os.path.exists(old[1]) and os.path.exists(recent)
+    store.quota_bytes = 0
+    assert store.enforce_quota(now) == [old[1]]  # Recent frames stay even beyond the quota
+    assert store.used_bytes() == 1000
+    store.close()
+
+
+def test_the_hour_lookup_returns_the_hour_in_capture_order(tmp_path):
+    store = ImageStore(str(tmp_path / "index.sqlite"), quota_bytes=10 ** 9)
+    times = {"a.png": now.replace(minute=59), "b.png": now.replace(minute=0), "c.png": now + timedelta(hours=1),
+             "d.png": now.replace(minute=0) - timedelta(seconds=1), "e.jpg": now.replace(minute=10)}
+    for name, when in times.items():
+        store.register(write(tmp_path / name), "nir" if name == "e.jpg" else "stereo", when)
+    assert [os.path.basename(path) for path in store.frames_in_hour(now, camera="stereo")] == ["b.png", "a.png"]
+    assert [os.path.basename(path) for path in store.frames_in_hour(now)] == ["b.png", "e.jpg", "a.png"]
+    store.close()
+
+
+def test_every_encoder_format_is_imported(tmp_path):
+    for name in ("a.png", "b.jpg", "c.jpeg", "d.webp", "e.npy", "notes.txt"):
+        write(tmp_path / "day" / name)
+    store = ImageStore(str(tmp_path / "index.sqlite"), quota_bytes=10 ** 9)
+    assert store.import_folder(str(tmp_path / "day"), "stereo") == 5
+    assert store.import_folder(str(tmp_path / "day"), "stereo") == 0
+    store.close()
+
+
+def test_acknowledged_records_give_their_frames(tmp_path):
+    queue = UploadQueue(str(tmp_path / "queue.sqlite"))
+    first = queue.put("ndvi", {"rep1": {}}, ["/data/a.png", "/data/b.png"])
+    second = queue.put("rollup", {"days": []})
+    assert queue.ack([first, second]) == ["/data/a.png", "/data/b.png"]
+    assert queue.depth() == 0
+    queue.close()
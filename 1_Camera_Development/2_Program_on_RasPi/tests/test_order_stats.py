@@ -0,0 +1,74 @@
+import json
+import math
+import warnings
+
+import numpy as np
+import pytest
+
+from Helpers.order_stats import counted_order_stats, order_stats, summarize
+
+stats = ["mean", "median", "std", "max", "p95", "p90", "p85"]
+
+
+def nan_calls(m: np.ndarray) -> list:
+    """The original per-plot statistics"""
+    m = m.copy()
+    m[m <= 0] = np.nan
+    with warnings.catch_warnings():  # Empty plots and infinite values warn in np.nan*
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return [round(np.nanmean(m), 5), round(np.nanmedian(m), 5), round(np.nanstd(m), 5), round(np.nanmax(m), 5),
+                round(np.nanpercentile(m, 95), 5), round(np.nanpercentile(m, 90), 5),
+                round(np.nanpercentile(m, 85), 5)]
+
+
+def kernel(m: np.ndarray) -> list:
+    summary = summarize(m)
+    return [round(float(summary[name]), 5) for name in stats]
+
+
+def plot_values(size: int, rng: np.random.Generator, red_low: int) -> np.ndarray:
+    """ndvi-like values with soil (<= 0), NaN pixels and ties from 8-bit bands; red_low = 0 adds inf pixels"""
+    b = rng.integers(0, 256, size)
+    r = rng.integers(red_low, 256, size)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = (1.664 * b) / (0.953 * r) - 1
+    values[rng.random(size) < 0.01] = np.nan
+    return values
+
+
+def same(a: list, b: list) -> bool:
+    return all(x == y or (math.isnan(x) and math.isnan(y)) for x, y in zip(a, b))
+
+
+@pytest.mark.filterwarnings("error")
+@pytest.mark.parametrize("red_low", [1, 0])
+@pytest.mark.parametrize("size", [1, 2, 5000, 20001])
+def test_summary_matches_the_nan_calls(size, red_low):
+    rng = np.random.default_rng(size)
+    for _ in range(5):
+        values = plot_values(size, rng, red_low)
+        assert same(kernel(values), nan_calls(values))
+
+
+@pytest.mark.filterwarnings("error")
+def test_infinite_values_keep_min_max_and_ranks():
+    result = order_stats(np.array([1.0, 2.0, np.inf]))
+    assert result["min"] == 1.0 and result["max"] == np.inf and result["median"] == 2.0
+    summary = summarize(np.array([np.inf, 3.0, -1.0, np.nan]))
+    assert summary["count"] == 2 and summary["mean"] == np.inf and math.isnan(summary["std"])
+    assert summary["max"] == np.inf and summary["min"] == 3.0
+
+
+def test_no_values_give_nan():
+    assert all(math.isnan(value) for value in order_stats(np.array([])).values())
+
+
+@pytest.mark.filterwarnings("error")
+@pytest.mark.parametrize("size", [1, 2, 5000])
+def test_counted_values_give_the_order_stats_of_the_repeated_values(size):
+    rng = np.random.default_rng(size)
+    values = np.append(np.sort(rng.integers(1, 50, size) / 7), np.inf)
+    counts = rng.integers(1, 4, len(values))
+    counts[0] = 0  # A value that does not occur
+    expected = order_stats(np.repeat(values, counts))
+    assert json.dumps(counted_order_stats(values, counts), sort_keys=True) == json.dumps(expected, sort_keys=True)
@@ -0,0 +1,54 @@
+import cv2
+import numpy as np
+import pytest
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.plot_labels import PlotGroups, grid_layout, plot_groups, rasterize_plots
+from Helpers.vi_extractor import compute_ndvi, extract_plot_stats, plot_names, plot_polygons, stat_header, \
+    stereo_crop
+
+
+def reference_stats(ndvi: np.ndarray, polygons: list, names: list) -> dict:
+    """Per-polygon extraction of the original script, with a fresh mask per plot"""
+    nd = []
+    for pl in polygons:
+        blank = np.zeros(ndvi.shape[:2], dtype='uint8')
+        pl_m = cv2.fillPoly(blank, np.array([pl]), 255)
+        m = cv2.bitwise_and(ndvi, ndvi, mask=pl_m)
+        m[m <= 0] = np.nan
+        data = ["t", round(np.nanmean(m), 5), round(np.nanmedian(m), 5), round(np.nanstd(m), 5),
+                round(np.nanmax(m), 5), round(np.nanpercentile(m, 95), 5), round(np.nanpercentile(m, 90), 5),
+                round(np.nanpercentile(m, 85), 5)]
+        nd.append(dict(zip(stat_header, data)))
+    return dict(zip(names, nd))
+
+
+@pytest.fixture(scope="module")
+def ndvi():
+    top, bottom, left, right = stereo_crop
+    frame = synthetic_field_frame((2560, 1248), np.random.default_rng(0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return compute_ndvi(frame[top:bottom, left:right])
+
+
+@pytest.mark.parametrize("plots", [None, 40])
+def test_label_stats_match_the_per_polygon_reference(ndvi, plots):
+    polygons, names = (plot_polygons, plot_names) if plots is None else grid_layout(plots, ndvi.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stats, reference = extract_plot_stats(ndvi, "t", polygons, names), reference_stats(ndvi, polygons, names)
+    assert {name: {key: stats[name][key] for key in stat_header} for name in stats} == reference
+
+
+def test_later_polygon_owns_overlapping_pixels():
+    labels = rasterize_plots([[(0, 0), (9, 0), (9, 9), (0, 9)], [(5, 0), (9, 0), (9, 9), (5, 9)]], (10, 10))
+    assert (labels[:, :5] == 1).all() and (labels[:, 5:] == 2).all()
+
+
+def test_saved_groups_load_identical(tmp_path, ndvi):
+    groups = plot_groups(plot_polygons, ndvi.shape)
+    groups.save(str(tmp_path / "groups.npz"))
+    loaded = PlotGroups.load(str(tmp_path / "groups.npz"))
+    assert loaded.shape == groups.shape and loaded.count == groups.count
+    assert np.array_equal(loaded.index, groups.index) and np.array_equal(loaded.plot_ids, groups.plot_ids)
+    with pytest.raises(ValueError):
+        groups.gather(ndvi[1:])
@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+import pytest
+
+from DataStructures.plot_layout import PlotLayout
+from Helpers.camera import synthetic_field_frame
+from Helpers.plot_labels import PlotGroups, grid_layout
+from Helpers.plot_layouts import MaskCache, load_layouts
+from Helpers.vi_extractor import compute_ndvi, extract_layouts, extract_plot_stats, layout_file, nir_crop, \
+    nir_window, plot_names, plot_polygons, prepare_crop, stereo_crop
+
+
+@pytest.fixture(scope="module")
+def layout():
+    return load_layouts(layout_file)[0]
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return synthetic_field_frame((2560, 1248), np.random.default_rng(0))
+
+
+def test_default_plots_come_from_the_layout_file(layout):
+    assert plot_polygons == layout.polygons and plot_names == layout.plot_ids
+
+
+def test_layout_crop_on_the_nir_frame(layout):
+    assert nir_window(stereo_crop) == nir_crop
+    frame = synthetic_field_frame((2560, 1248), np.random.default_rng(1))
+    stereo = prepare_crop(frame, layout.crop)
+    assert np.array_equal(prepare_crop(frame[:, 1280:], nir_window(layout.crop)), stereo)
+
+
+def test_cached_masks_match_fresh_ones_and_follow_edits(layout, tmp_path):
+    shape = (layout.crop[1] - layout.crop[0], layout.crop[3] - layout.crop[2])
+    MaskCache(str(tmp_path)).groups(layout, shape)
+    loaded = MaskCache(str(tmp_path)).groups(layout, shape)  # A fresh cache reads the stored file
+    compiled = PlotGroups(layout.polygons, shape)
+    assert np.array_equal(loaded.index, compiled.index) and np.array_equal(loaded.plot_ids, compiled.plot_ids)
+
+    moved = PlotLayout(layout.name, layout.crop, layout.plot_ids,
+                       [[(x + 10, y) for x, y in polygon] for polygon in layout.polygons], layout.sensor)
+    assert moved.digest != layout.digest
+    assert MaskCache(str(tmp_path)).path(moved, shape) != MaskCache(str(tmp_path)).path(layout, shape)
+    assert not np.array_equal(MaskCache(str(tmp_path)).groups(moved, shape).index, compiled.index)
+
+
+def test_layouts_from_one_frame_match_separate_extraction(layout, frame, tmp_path):
+    img = prepare_crop(frame, layout.crop)
+    polygons, names = grid_layout(40, img.shape)
+    second = PlotLayout("grid40", layout.crop, names, polygons, layout.sensor)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        results = extract_layouts(frame, "t", [layout, second], MaskCache(str(tmp_path)))
+        ndvi = compute_ndvi(img)
+        expected = {layout.name: extract_plot_stats(ndvi, "t", layout.polygons, layout.plot_ids),
+                    "grid40": extract_plot_stats(ndvi, "t", polygons, names)}
+    assert json.dumps(results, sort_keys=True) == json.dumps(expected, sort_keys=True)
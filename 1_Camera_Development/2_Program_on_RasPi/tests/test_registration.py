@@ -0,0 +1,43 @@
+import cv2
+import numpy as np
+import pytest
+
+from Helpers.registration import FrameAligner, RemapCache, apply_remap, calibrate_pair
+
+size = (1640, 1232)
+
+
+def textured_scene(rng: np.random.Generator) -> np.ndarray:
+    noise = rng.integers(0, 256, size=(size[1] // 8, size[0] // 8), dtype=np.uint8)
+    grey = cv2.GaussianBlur(cv2.resize(noise, size, interpolation=cv2.INTER_CUBIC), (5, 5), 0)
+    return cv2.merge([grey, (grey * 0.8).astype(np.uint8), (255 - grey)])
+
+
+def known_warp(angle: float, shift: tuple) -> np.ndarray:
+    rotation = cv2.getRotationMatrix2D((size[0] / 2, size[1] / 2), angle, 1.0)
+    rotation[:, 2] += shift
+    return np.vstack([rotation, [0, 0, 1]])
+
+
+def corner_error(estimated: np.ndarray, truth: np.ndarray) -> float:
+    corners = np.float32([[0, 0], [size[0], 0], [0, size[1]], [size[0], size[1]]]).reshape(-1, 1, 2)
+    return float(np.abs(cv2.perspectiveTransform(corners, estimated) -
+                        cv2.perspectiveTransform(corners, truth)).max())
+
+
+@pytest.mark.parametrize("angle, shift", [(0.0, (12, -7)), (1.5, (0, 0)), (-2.0, (25, 14))])
+def test_calibrated_warp_matches_the_known_warp(tmp_path, angle, shift):
+    rgb = textured_scene(np.random.default_rng(0))
+    truth = known_warp(angle, shift)
+    nir = cv2.warpPerspective(rgb, truth, size)
+    cache = RemapCache(str(tmp_path))
+    assert corner_error(calibrate_pair(rgb, nir, "rgb_to_nir", cache), truth) < 1.0
+
+    aligned = apply_remap(rgb, RemapCache(str(tmp_path)).load("rgb_to_nir", size))
+    inner = (slice(60, -60), slice(60, -60))
+    assert np.abs(aligned[inner].astype(int) - nir[inner].astype(int)).mean() < 4.0
+
+
+def test_aligner_leaves_frames_of_an_uncalibrated_pair_unchanged(tmp_path):
+    frames = {"rgb": np.zeros((size[1], size[0], 3), np.uint8), "nir": np.ones((size[1], size[0], 3), np.uint8)}
+    assert FrameAligner(RemapCache(str(tmp_path))).align(frames) is frames
@@ -0,0 +1,93 @@
+import json
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.plot_labels import grid_layout
+from Helpers.segmentation import Segmenter
+from Helpers.vi_engine import VIEngine
+from Helpers.vi_extractor import compute_ndvi, extract_indices, extract_ndvi, histogram_specs, segment_frame
+from Helpers.vi_lut import LUTEngine
+
+resolution = (1640, 1232)
+crop = (0, resolution[1], 0, resolution[0])
+mib = 1024 ** 2
+# The smaller budget gathers a plot in one chunk for the ndvi, in several for all indices
+budgets = [64 * mib, 12 * mib]
+
+
+def same(results: dict, reference: dict) -> bool:
+    """Equal as written to ndvi.json and vi.json, where NaN (the std of a plot with an infinite pixel) equals NaN"""
+    return json.dumps(results, sort_keys=True) == json.dumps(reference, sort_keys=True)
+
+
+@pytest.fixture(scope="module")
+def frame():
+    frame = synthetic_field_frame(resolution, np.random.default_rng(0))
+    frame[600, 200:260, 2] = 0  # Infinite ndvi pixels, inside a plot
+    return frame
+
+
+@pytest.fixture(scope="module")
+def layout():
+    return grid_layout(12, (crop[1], crop[3]))
+
+
+@pytest.mark.filterwarnings("error")
+@pytest.mark.parametrize("budget", budgets)
+def test_tiled_ndvi_matches_the_full_size_path(frame, layout, budget):
+    polygons, names = layout
+    with np.errstate(divide="ignore", invalid="ignore"):
+        reference = extract_ndvi(frame, "t", crop, polygons, names, histogram=histogram_specs["ndvi"])
+    tiled = extract_ndvi(frame, "t", crop, polygons, names, histogram=histogram_specs["ndvi"], memory_budget=budget)
+    assert same(tiled, reference)
+
+
+@pytest.mark.filterwarnings("error")
+@pytest.mark.parametrize("engine", [VIEngine(), LUTEngine()], ids=["float32", "lut"])
+@pytest.mark.parametrize("budget", budgets)
+def test_tiled_indices_match_the_full_size_cube(frame, layout, engine, budget):
+    polygons, names = layout
+    reference = extract_indices(frame, "t", engine, polygons, names)
+    assert same(extract_indices(frame, "t", engine, polygons, names, memory_budget=budget), reference)
+    assert same(extract_indices(frame, "t", engine, polygons, names, histograms=False, memory_budget=budget),
+                extract_indices(frame, "t", engine, polygons, names, histograms=False))
+
+
+def test_segmentation_is_refused_with_a_memory_budget(frame, layout):
+    polygons, names = layout
+    with np.errstate(divide="ignore", invalid="ignore"):
+        segmentation = segment_frame(compute_ndvi(frame), frame, Segmenter("otsu"), polygons)
+    with pytest.raises(ValueError):
+        extract_indices(frame, "t", LUTEngine(), polygons, names, segmentation=segmentation, memory_budget=2 ** 20)
+
+
+def peak_bytes(fn) -> int:
+    """Peak of the memory allocated by fn, after a first call has built the cached plot groups and engine buffers"""
+    fn()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("engine", [VIEngine(), LUTEngine()], ids=["float32", "lut"])
+def test_peak_memory_stays_within_the_budget(frame, layout, engine):
+    polygons, names = layout
+    budget = 12 * mib
+    assert peak_bytes(lambda: extract_indices(frame, "t", engine, polygons, names, memory_budget=budget)) <= budget
+    budget = 6 * mib
+    assert peak_bytes(lambda: extract_ndvi(frame, "t", crop, polygons, names, histogram=histogram_specs["ndvi"],
+                                           memory_budget=budget)) <= budget
+
+
+def test_a_budget_below_the_fixed_memory_is_refused(frame, layout):
+    polygons, names = layout
+    with pytest.raises(ValueError):
+        extract_ndvi(frame, "t", crop, polygons, names, memory_budget=mib)
+    with pytest.raises(ValueError):
+        extract_indices(frame, "t", VIEngine(), polygons, names, memory_budget=6 * mib)
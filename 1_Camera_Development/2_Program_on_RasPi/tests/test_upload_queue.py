@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.result_codec import decode_payload, encode_payload, fold_tables, msgpack
+from Helpers.upload_queue import UploadQueue, Uploader, pack_batch, unpack_batch
+from Helpers.vi_extractor import extract_ndvi
+
+
+def session(number: int) -> dict:
+    plots = {f"plot{plot}": {"mean": 0.1 * plot + number, "std": float("nan") if plot == 2 else 0.01,
+                             "count": 100 + plot, "hist": {"low": -1.0, "high": 1.0, "counts": [plot, 0, 3]}}
+             for plot in range(1, 5)}
+    return {"rep1": plots, "rep2": plots, "drift": [{"drift": 0.4, "maintenance": False}], "frames": ["a.png"]}
+
+
+@pytest.mark.parametrize("use_msgpack", [False, True])
+def test_payloads_decode_to_what_was_encoded(use_msgpack):
+    if use_msgpack and msgpack is None:
+        pytest.skip("msgpack not installed")
+    payload = session(0)
+    data = encode_payload(payload, use_msgpack=use_msgpack)
+    # NaN != NaN, so the payloads are compared in their JSON form
+    assert json.dumps(decode_payload(data), sort_keys=True) == json.dumps(payload, sort_keys=True)
+    assert len(json.dumps(fold_tables(payload))) < len(json.dumps(payload))
+
+
+@pytest.mark.parametrize("use_msgpack", [False, True])
+def test_a_session_payload_is_smaller_than_the_original_ndvi_json(use_msgpack):
+    if use_msgpack and msgpack is None:
+        pytest.skip("msgpack not installed")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payload = {f"rep{rep}": extract_ndvi(synthetic_field_frame((2560, 1248), np.random.default_rng(rep)),
+                                             "15-05-2026_12-00-00") for rep in range(1, 6)}
+    payload.update(drift=[{"drift": 0.4, "maintenance": False}] * 5, frames=[f"{rep}.png" for rep in range(1, 6)],
+                   quality=[{"passed": True, "reasons": []}] * 5, levels=[1] * 5, rejected=[])
+    # What 2_extract_ndvi.py queues per session by default, against ndvi.json as it was written before
+    assert len(encode_payload(payload, use_msgpack=use_msgpack)) < len(json.dumps(payload, indent=6))
+
+
+def test_batches_unpack_to_their_records():
+    records = [(1, "ndvi", b"abc"), (2, "vi", b""), (7, "rollup", bytes(range(256)))]
+    assert unpack_batch(pack_batch(records)) == records
+
+
+class Receiver(BaseHTTPRequestHandler):
+    received = []  # (sensor, record id, kind, payload) in arrival order
+    refuse = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if Receiver.refuse > 0:
+            Receiver.refuse -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        for record_id, kind, data in unpack_batch(body):
+            Receiver.received.append((self.headers["X-Sensor"], record_id, kind, decode_payload(data)))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_records_stay_queued_through_an_outage_and_arrive_once_in_order(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Receiver)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    Receiver.received, Receiver.refuse = [], 2
+    queue = UploadQueue(str(tmp_path / "queue.sqlite"))
+    ids = [queue.put("ndvi", session(number)) for number in range(7)]
+    uploader = Uploader(queue, f"http://127.0.0.1:{server.server_address[1]}/agicam", "IOT11", batch_size=3,
+                        base_delay=0.01, max_delay=0.05)
+    assert not uploader.drain()
+    assert queue.depth() == len(ids)
+    while not uploader.drain():
+        time.sleep(max(0.0, uploader.next_attempt - time.monotonic()))
+    server.shutdown()
+    server.server_close()
+    assert uploader.stats["failures"] == 2 and uploader.stats["batches"] == 3
+    assert queue.depth() == 0 and queue.queued_bytes() == 0
+    queue.close()
+    assert [(sensor, record_id, kind) for sensor, record_id, kind, _ in Receiver.received] == \
+        [("IOT11", record_id, "ndvi") for record_id in ids]
+    assert [json.dumps(payload, sort_keys=True) for *_, payload in Receiver.received] == \
+        [json.dumps(session(number), sort_keys=True) for number in range(7)]
+
+
+def test_records_wait_while_the_server_is_unreachable(tmp_path):
+    queue = UploadQueue(str(tmp_path / "queue.sqlite"))
+    queue.put("vi", session(0))
+    uploader = Uploader(queue, "http://127.0.0.1:9/agicam", "IOT11", timeout=1.0, base_delay=60.0)
+    assert not uploader.drain()
+    assert not uploader.drain()  # Still in the backoff, nothing is sent
+    assert uploader.stats["failures"] == 1 and queue.depth() == 1
+    queue.close()
+
+
+def test_a_keyed_payload_is_queued_once_even_after_its_upload(tmp_path):
+    queue = UploadQueue(str(tmp_path / "queue.sqlite"))
+    first = queue.put("frame", session(0), key="a.png")
+    assert queue.put("frame", session(0), key="a.png") == first and queue.depth() == 1
+    queue.ack([first])
+    assert queue.queued("a.png") and not queue.queued("b.png")
+    assert queue.put("frame", session(0), key="a.png") == first and queue.depth() == 0
+    queue.close()
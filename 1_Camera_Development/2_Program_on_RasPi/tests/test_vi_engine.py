@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from Helpers.camera import synthetic_field_frame
+from Helpers.vi_engine import VIEngine, nir_gain, red_gain, vi_names
+
+
+def frame() -> np.ndarray:
+    img = synthetic_field_frame((320, 240), np.random.default_rng(0))
+    img[0, :256, 0], img[1, :256, 2] = np.arange(256), np.arange(256)  # Every value of the bands, zeros included
+    img[2, :256, 1] = np.arange(256)
+    return img
+
+
+def reference(img: np.ndarray, name: str) -> np.ndarray:
+    """The float64 formulas of the VIEngine docstring, one index at a time"""
+    b, g, r = [img[..., channel].astype(float) for channel in range(3)]
+    nir, red, green = nir_gain * b / 255, red_gain * r / 255, g / 255
+    formulas = {"ndvi": lambda: nir / red - 1,
+                "sr": lambda: nir / red,
+                "gndvi": lambda: (nir - green) / (nir + green),
+                "gndvi0": lambda: (b - g) / (b + g),
+                "cigreen": lambda: nir / green - 1,
+                "cigreen0": lambda: b / g - 1,
+                "evi2": lambda: 2.5 * (nir - red) / (nir + 2.4 * red + 1),
+                "rdvi": lambda: (nir - red) / np.sqrt(nir + red),
+                "savi": lambda: 1.5 * (nir - red) / (nir + red + 0.5)}
+    return formulas[name]()
+
+
+def test_every_index_matches_the_float64_formula():
+    img = frame()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cube = VIEngine(vi_names).cube(img)
+        for plane, name in enumerate(vi_names):
+            expected = reference(img, name)
+            assert np.array_equal(np.isfinite(cube[plane]), np.isfinite(expected)), name
+            finite = np.isfinite(expected)
+            assert np.allclose(cube[plane][finite], expected[finite], rtol=1e-5, atol=1e-6), name  # float32 rounding
+
+
+def test_strips_subsets_and_order_give_the_same_planes():
+    img = frame()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        whole = VIEngine(vi_names, block_rows=img.shape[0]).cube(img).copy()
+        assert np.array_equal(VIEngine(vi_names, block_rows=7).cube(img), whole, equal_nan=True)
+        subset = ["savi", "ndvi"]
+        cube = VIEngine(subset).cube(img)
+        for plane, name in enumerate(subset):
+            assert np.array_equal(cube[plane], whole[vi_names.index(name)], equal_nan=True)
+
+
+def test_unknown_index_is_rejected():
+    with pytest.raises(ValueError):
+        VIEngine(["ndvi", "ndwi"])
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pytest
+
+from Helpers import vi_lut
+from Helpers.camera import synthetic_field_frame
+from Helpers.vi_engine import VIEngine, vi_names
+from Helpers.vi_extractor import compute_ndvi
+from Helpers.vi_lut import LUTEngine, lookup_ndvi, ndvi_table
+
+
+def frame() -> np.ndarray:
+    img = synthetic_field_frame((320, 240), np.random.default_rng(0))
+    img[0, :256, 0], img[1, :256, 2] = np.arange(256), np.arange(256)  # Every value of the bands, zeros included
+    return img
+
+
+def test_lookup_matches_the_arithmetic_paths():
+    img = frame()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        assert np.array_equal(LUTEngine().cube(img), VIEngine(vi_names).cube(img), equal_nan=True)
+        assert np.array_equal(lookup_ndvi(img, ndvi_table()), compute_ndvi(img), equal_nan=True)
+
+
+def test_cached_tables_are_reused(tmp_path):
+    folder = str(tmp_path)
+    LUTEngine(["ndvi"], folder)
+    ndvi_table(folder)
+    files = sorted(os.listdir(folder))
+    assert len(files) == 2
+    LUTEngine(["ndvi"], folder)
+    ndvi_table(folder)
+    assert sorted(os.listdir(folder)) == files
+
+
+def test_a_write_cut_short_leaves_no_table_behind(tmp_path, monkeypatch):
+    folder = str(tmp_path)
+    save = np.save
+
+    def cut_short(path, table):
+        save(path, table[:10])
+        raise OSError("power cut")
+
+    monkeypatch.setattr(np, "save", cut_short)
+    with pytest.raises(OSError):
+        ndvi_table(folder)
+    monkeypatch.setattr(np, "save", save)
+    assert not any(name.endswith(".npy") and ".tmp." not in name for name in os.listdir(folder))
+    assert len(ndvi_table(folder)) == 65536
+
+
+def test_formula_edit_or_version_bump_builds_new_tables(tmp_path, monkeypatch):
+    folder = str(tmp_path)
+    stale = np.zeros(65536, dtype=np.float32)
+    np.save(os.path.join(folder, LUTEngine.table_id("ndvi") + ".npy"), stale)
+    assert np.array_equal(LUTEngine(["ndvi"], folder).tables["ndvi"], stale)
+
+    monkeypatch.setattr(vi_lut, "formula_source", vi_lut.formula_source + "# edited formula")
+    assert not np.array_equal(LUTEngine(["ndvi"], folder).tables["ndvi"], stale)
+    edited = LUTEngine.table_id("ndvi")
+    monkeypatch.setattr(vi_lut, "index_version", vi_lut.index_version + 1)
+    assert LUTEngine.table_id("ndvi") != edited
+    assert len(os.listdir(folder)) == 2
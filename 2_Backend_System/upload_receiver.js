@@ -0,0 +1,88 @@
+/**
+ * AGIcam Upload Receiver Function
+ * Decodes the batches posted by the Raspberry Pi upload queue (Helpers/upload_queue.py on the camera)
+ *
+ * Node-RED setup of the function node:
+ *   - Setup > Modules: zlib (built in), and msgpack from the @msgpack/msgpack package when the sensors have
+ *     msgpack installed; without it they send zlib compressed JSON, which needs zlib only
+ *   - Outputs: 3, wired to the ndvi transformation, to the other records (vi, rollup, frame) and to http response
+ *   - Input: an "http in" node, POST /agicam; the sensor name comes in the X-Sensor header
+ */
+
+// Batch layout: records one after the other, each a header followed by its kind and its body
+//   header: record id (uint64), kind length (uint16), body length (uint32), all big-endian
+//   body: one tag byte, "M" for msgpack or "J" for JSON, then the zlib compressed payload
+const headerSize = 8 + 2 + 4;
+
+// Tables folded by the camera (Helpers/result_codec.py): {"~k": [statistic names], "~r": {plot: [values]}}
+function unfoldTables(value) {
+    if (Array.isArray(value)) {
+        return value.map(unfoldTables);
+    }
+    if (value === null || typeof value !== "object") {
+        return value;
+    }
+    const result = {};
+    if ("~k" in value && "~r" in value) {
+        for (const [name, row] of Object.entries(value["~r"])) {
+            result[name] = {};
+            value["~k"].forEach((key, i) => { result[name][key] = unfoldTables(row[i]); });
+        }
+        return result;
+    }
+    for (const [key, child] of Object.entries(value)) {
+        result[key] = unfoldTables(child);
+    }
+    return result;
+}
+
+function decodePayload(body) {
+    const data = zlib.inflateSync(body.subarray(1));
+    const tag = String.fromCharCode(body[0]);
+    if (tag === "M") {
+        if (typeof msgpack === "undefined") {
+            throw new Error("Payload is msgpack encoded, add the @msgpack/msgpack module to this node");
+        }
+        return unfoldTables(msgpack.decode(data));
+    }
+    // Python writes NaN and Infinity (e.g. the std of a plot with an infinite ndvi pixel), which JSON.parse refuses
+    const text = data.toString("utf8").replace(/\bNaN\b|-?\bInfinity\b/g, "null");
+    return unfoldTables(JSON.parse(text));
+}
+
+const sensor = msg.req.headers["x-sensor"] || "unknown";
+const batch = Buffer.isBuffer(msg.payload) ? msg.payload : Buffer.from(msg.payload);
+// Highest record id stored per sensor: a batch repeated after a lost acknowledgement is stored once
+const lastIds = Object.assign({}, flow.get("lastIds") || {});
+const ndviRecords = [];
+const otherRecords = [];
+let offset = 0;
+try {
+    while (offset < batch.length) {
+        const recordId = Number(batch.readBigUInt64BE(offset));
+        const kindSize = batch.readUInt16BE(offset + 8);
+        const bodySize = batch.readUInt32BE(offset + 10);
+        offset += headerSize;
+        const kind = batch.toString("utf8", offset, offset + kindSize);
+        offset += kindSize;
+        const body = batch.subarray(offset, offset + bodySize);
+        offset += bodySize;
+        if (recordId <= (lastIds[sensor] || 0)) {
+            continue;
+        }
+        const record = {topic: sensor, sensor: sensor, recordId: recordId, kind: kind, payload: decodePayload(body)};
+        (kind === "ndvi" ? ndviRecords : otherRecords).push(record);
+        lastIds[sensor] = recordId;
+    }
+} catch (e) {
+    // Nothing is acknowledged: the camera keeps the batch queued and sends it again
+    node.error(`Bad batch from ${sensor}: ${e.message}`, msg);
+    msg.statusCode = 400;
+    msg.payload = e.message;
+    return [null, null, msg];
+}
+flow.set("lastIds", lastIds);
+// 2xx tells the camera to drop the batch from its queue
+msg.statusCode = 204;
+msg.payload = "";
+return [ndviRecords, otherRecords, msg];
@@ -0,0 +1,44 @@
+import numpy as np
+
+
+class PlotHistogram:
+    """
+    Fixed-bin histogram of one vegetation index over one plot, as sent by the edge device: equal bins over
+    [low, high) followed by one overflow bin counting every value >= high
+    """
+    def __init__(self, low: float, high: float, counts: list):
+        self.low: float = low
+        self.high: float = high
+        self.counts: np.ndarray = np.asarray(counts, dtype=np.int64)
+
+    def __repr__(self):
+        return f"PlotHistogram(low={self.low}, high={self.high}, bins={self.bins}, total={self.total})"
+
+    @property
+    def bins(self) -> int:
+        """
+        :return: int - Number of regular bins, without the overflow bin
+        """
+        return len(self.counts) - 1
+
+    @property
+    def width(self) -> float:
+        """
+        :return: float - Width of one regular bin
+        """
+        return (self.high - self.low) / self.bins
+
+    @property
+    def total(self) -> int:
+        """
+        :return: int - Number of pixels counted
+        """
+        return int(self.counts.sum())
+
+    @classmethod
+    def from_dict(cls, entry: dict):
+        """
+        :param entry: dict - {"low", "high", "counts"} as found under "hist" in the edge output
+        :return: PlotHistogram - Histogram object
+        """
+        return cls(entry["low"], entry["high"], entry["counts"])
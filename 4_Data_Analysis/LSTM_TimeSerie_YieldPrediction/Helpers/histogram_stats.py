@@ -0,0 +1,95 @@
+import json
+
+import numpy as np
+
+from DataStructures.plot_histogram import PlotHistogram
+
+
+def load_histograms(file_path: str) -> dict:
+    """
+    Reads the per-plot histograms of one edge output file (vi.json)
+    :param file_path: str - Path of the json file, {replicate: {index: {plot: {..., "hist": {...}}}}}
+    :return: dict - (replicate, plot, index) -> PlotHistogram
+    """
+    with open(file_path) as f:
+        data = json.load(f)
+    histograms = {}
+    for replicate, indices in data.items():
+        if not isinstance(indices, dict):
+            continue
+        for index, plots in indices.items():
+            for plot, stats in plots.items():
+                if "hist" in stats:
+                    histograms[(replicate, plot, index)] = PlotHistogram.from_dict(stats["hist"])
+    return histograms
+
+
+def merge_histograms(histograms: list) -> PlotHistogram:
+    """
+    Merges histograms of the same bins, e.g. one plot across replicates or days; the result is exactly the
+    histogram of all their pixels together
+    :param histograms: list[PlotHistogram] - Histograms to merge
+    :return: PlotHistogram - Merged histogram
+    """
+    first = histograms[0]
+    for histogram in histograms[1:]:
+        if (histogram.low, histogram.high, histogram.bins) != (first.low, first.high, first.bins):
+            raise ValueError(f"Cannot merge {histogram} into {first}: the bins differ")
+    return PlotHistogram(first.low, first.high, np.sum([histogram.counts for histogram in histograms], axis=0))
+
+
+def histogram_percentile(histogram: PlotHistogram, percentile: float) -> float:
+    """
+    Estimates a percentile assuming the values are spread evenly inside each bin; the error is at most one bin
+    width, and a percentile falling into the overflow bin is reported as the upper edge
+    :param histogram: PlotHistogram - Histogram of the plot
+    :param percentile: float - Percentile in 0-100
+    :return: float - Estimated value, NaN for an empty histogram
+    """
+    total = histogram.total
+    if total == 0:
+        return np.nan
+    target = percentile / 100 * total
+    cumulative = np.cumsum(histogram.counts)
+    # The first bin whose pixels pass the target, so empty bins are never chosen: p0 is the lower edge of the
+    # first non-empty bin, not low; p100 reaches the end of the last non-empty bin
+    index = int(np.searchsorted(cumulative, target, side="right"))
+    if index == len(cumulative):
+        index = int(np.searchsorted(cumulative, target))
+    if index >= histogram.bins:
+        return histogram.high
+    before = cumulative[index - 1] if index > 0 else 0
+    return histogram.low + (index + (target - before) / histogram.counts[index]) * histogram.width
+
+
+def histogram_mean(histogram: PlotHistogram) -> float:
+    """
+    Estimates the mean from the bin centres, within half a bin width; overflow values count as the upper edge,
+    which underestimates the mean when the overflow bin is not empty
+    :param histogram: PlotHistogram - Histogram of the plot
+    :return: float - Estimated mean, NaN for an empty histogram
+    """
+    total = histogram.total
+    if total == 0:
+        return np.nan
+    centres = histogram.low + (np.arange(histogram.bins) + 0.5) * histogram.width
+    values = np.append(centres, histogram.high)
+    return float(np.dot(values, histogram.counts) / total)
+
+
+def fraction_above(histogram: PlotHistogram, threshold: float) -> float:
+    """
+    Fraction of the plot pixels above a threshold, splitting the bin containing the threshold proportionally
+    :param histogram: PlotHistogram - Histogram of the plot
+    :param threshold: float - Index value, e.g. 0.6 for the share of dense canopy
+    :return: float - Fraction in 0-1, NaN for an empty histogram
+    """
+    total = histogram.total
+    if total == 0:
+        return np.nan
+    if threshold >= histogram.high:
+        return histogram.counts[-1] / total
+    position = max((threshold - histogram.low) / histogram.width, 0.0)
+    index = int(position)
+    above = histogram.counts[index + 1:].sum() + histogram.counts[index] * (1 - (position - index))
+    return float(above / total)
@@ -0,0 +1,8 @@
+# Tests of the yield prediction helpers
+# Run from anywhere:  python3 -m pytest 4_Data_Analysis/LSTM_TimeSerie_YieldPrediction/tests
+
+import os
+import sys
+
+# The modules import Helpers and DataStructures from LSTM_TimeSerie_YieldPrediction
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
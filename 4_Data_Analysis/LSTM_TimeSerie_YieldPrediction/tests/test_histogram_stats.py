@@ -0,0 +1,47 @@
+import math
+
+import numpy as np
+import pytest
+
+from DataStructures.plot_histogram import PlotHistogram
+from Helpers.histogram_stats import histogram_mean, histogram_percentile, merge_histograms
+
+percentiles = [0, 1, 5, 25, 50, 75, 95, 99, 100]
+
+
+def histogram_of(values: np.ndarray, low: float = -1.0, high: float = 1.0, bins: int = 200) -> PlotHistogram:
+    """Binned like the edge device: values below low in the first bin, values >= high in the overflow bin"""
+    position = np.clip((values - low) * (bins / (high - low)), 0, bins).astype(np.int64)
+    return PlotHistogram(low, high, np.bincount(position, minlength=bins + 1))
+
+
+@pytest.mark.parametrize("values", [np.random.default_rng(0).uniform(0.35, 0.8, 50000),  # Empty bins both sides
+                                    np.random.default_rng(1).normal(0.2, 0.15, 50000),
+                                    np.random.default_rng(2).uniform(0.6, 0.62, 300)],  # A few bins of pixels
+                         ids=["uniform", "normal", "narrow"])
+def test_percentiles_are_within_one_bin_of_numpy(values):
+    histogram = histogram_of(values)
+    for q in percentiles:
+        assert abs(histogram_percentile(histogram, q) - np.percentile(values, q)) <= histogram.width, q
+
+
+def test_leading_and_trailing_empty_bins_are_skipped():
+    histogram = PlotHistogram(0.0, 1.0, [0, 0, 0, 4, 0, 0, 0, 0, 0, 0, 0])
+    assert histogram_percentile(histogram, 0) == pytest.approx(0.3)
+    assert histogram_percentile(histogram, 50) == pytest.approx(0.35)
+    assert histogram_percentile(histogram, 100) == pytest.approx(0.4)
+
+
+def test_overflow_and_empty_histograms():
+    histogram = PlotHistogram(0.0, 1.0, [1, 0, 3])
+    assert histogram_percentile(histogram, 90) == 1.0
+    assert math.isnan(histogram_percentile(PlotHistogram(0.0, 1.0, [0, 0, 0]), 50))
+
+
+def test_merged_histograms_count_all_pixels():
+    rng = np.random.default_rng(2)
+    parts = [rng.uniform(0.1, 0.9, 1000) for _ in range(3)]
+    merged = merge_histograms([histogram_of(part) for part in parts])
+    every = np.concatenate(parts)
+    assert np.array_equal(merged.counts, histogram_of(every).counts)
+    assert abs(histogram_mean(merged) - every.mean()) <= merged.width / 2